@@ -0,0 +1,264 @@
+"""
+Benchmark the editor's hot paths in a running PyNoteApp.
+
+For each generated file size (1 KB to 500 MB by default) the app opens the
+file, types into it, scrolls it and saves it, recording the latency of
+every event:
+
+- open_file: from ``load_file`` until the text has loaded (for files past
+  ``huge_file_threshold``, until the read-only viewer shows the first page)
+- save_file: from ``save_file`` until the background save has finished
+- keystroke, scroll: from the synthetic event until Tk is idle again
+- _update_status, _update_gutter: every run of these refresh tasks
+
+Percentiles per size and event are written as JSON and compared with a
+stored baseline: a p50 or p99 more than ``--tolerance`` (and ``--slack-ms``)
+above the baseline is a regression, and the exit status is 1. Without a
+baseline the script stops with status 2 before running anything; create
+one on the reference machine with ``--update-baseline``. Without
+$DISPLAY an Xvfb server is started. The app runs with a temporary home
+directory, so the user's settings and journals are not touched.
+
+Usage:
+    python benchmarks/bench_app.py [--sizes 1K,1M,10M] [--output results.json]
+        [--baseline benchmarks/baseline_app.json] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+SIZES = '1K,100K,1M,10M,100M,500M'
+BASELINE = os.path.join(HERE, 'baseline_app.json')
+KEYSTROKES = 200
+SCROLLS = 100
+SAVES = 3
+PERCENTILES = (50, 90, 99)
+_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(label):
+    label = label.strip().upper()
+    if label[-1] in _UNITS:
+        return int(float(label[:-1]) * _UNITS[label[-1]])
+    return int(label)
+
+
+def make_file(path, size):
+    """Write ``size`` bytes of varied text lines."""
+    lines = [
+        'The quick brown fox jumps over the lazy dog.\n',
+        '    def handler(self, event):  # indented code-like line\n',
+        '\n',
+        'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor.\n',
+    ]
+    block = ''.join(lines * 256).encode('utf-8')
+    with open(path, 'wb') as f:
+        written = 0
+        while written < size:
+            data = block[:size - written]
+            f.write(data)
+            written += len(data)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Recorder:
+    """Latency samples in milliseconds, grouped by size label and event."""
+
+    def __init__(self):
+        self.samples = {}
+        self.label = None
+
+    def add(self, event, ms):
+        self.samples.setdefault(self.label, {}).setdefault(event, []).append(ms)
+
+    def wrap(self, event, fn):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(event, (time.perf_counter() - started) * 1000)
+        return timed
+
+    def summary(self):
+        out = {}
+        for label, events in self.samples.items():
+            out[label] = {}
+            for event, values in sorted(events.items()):
+                stats = {f'p{p}': round(percentile(values, p), 3) for p in PERCENTILES}
+                stats['max'] = round(max(values), 3)
+                stats['count'] = len(values)
+                out[label][event] = stats
+        return out
+
+
+def instrument(app, recorder):
+    """Time every call of the status and gutter refreshes."""
+    for task, method in (('status', '_update_status'), ('gutter', '_update_gutter')):
+        timed = recorder.wrap(method, getattr(app, method))
+        setattr(app, method, timed)
+        # The scheduler holds the bound method it was registered with
+        app.refresh.register(task, timed, app.refresh._tasks[task][0])
+
+
+def pump(app, done, timeout=600.0):
+    """Process events until done() is true or the timeout passes."""
+    deadline = time.perf_counter() + timeout
+    while not done():
+        app.update()
+        if time.perf_counter() > deadline:
+            raise TimeoutError('benchmark step did not finish')
+        time.sleep(0.0005)
+
+
+def settle(app, seconds=0.3):
+    """Let debounced refreshes run."""
+    deadline = time.perf_counter() + seconds
+    pump(app, lambda: time.perf_counter() > deadline)
+
+
+def bench_size(app, recorder, path):
+    started = time.perf_counter()
+    doc = app.load_file(path)
+    pump(app, lambda: doc.loader is None)
+    app.update_idletasks()
+    recorder.add('open_file', (time.perf_counter() - started) * 1000)
+    settle(app)
+
+    text = app.text
+    if doc.huge is None:
+        text.focus_force()
+        middle = max(1, doc.stats.line_count // 2)
+        text.mark_set('insert', f'{middle}.0')
+        text.see('insert')
+        app.update()
+        for i in range(KEYSTROKES):
+            keysym = 'Return' if i % 40 == 39 else 'x'
+            started = time.perf_counter()
+            text.event_generate('<KeyPress>', keysym=keysym)
+            text.event_generate('<KeyRelease>', keysym=keysym)
+            app.update()
+            recorder.add('keystroke', (time.perf_counter() - started) * 1000)
+        settle(app)
+
+    for i in range(SCROLLS):
+        amount = 5 if i % 20 < 10 else -5
+        started = time.perf_counter()
+        app._on_scrollbar('scroll', amount, 'units')
+        app.update()
+        recorder.add('scroll', (time.perf_counter() - started) * 1000)
+    settle(app)
+
+    if doc.huge is None:
+        for _ in range(SAVES):
+            # A real change, so the save is not skipped as unchanged
+            text.insert('1.0', 'x')
+            started = time.perf_counter()
+            app.save_file(doc)
+            pump(app, lambda: not app._save_jobs)
+            recorder.add('save_file', (time.perf_counter() - started) * 1000)
+        settle(app)
+    app.close_tab(doc)
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    """Print results against the baseline; return the regressions."""
+    regressions = []
+    print(f'{"size":>6} {"event":<16} {"p50":>9} {"p99":>9} {"base p50":>9} {"base p99":>9}')
+    for label, events in results.items():
+        for event, stats in events.items():
+            base = baseline.get(label, {}).get(event)
+            row = f'{label:>6} {event:<16} {stats["p50"]:9.2f} {stats["p99"]:9.2f}'
+            if base is None:
+                print(row)
+                continue
+            print(f'{row} {base["p50"]:9.2f} {base["p99"]:9.2f}')
+            for key in ('p50', 'p99'):
+                limit = base[key] * (1 + tolerance) + slack_ms
+                if stats[key] > limit:
+                    regressions.append(f'{label} {event} {key}: {stats[key]:.2f} ms > {limit:.2f} ms')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--sizes', default=SIZES, help='comma-separated sizes, e.g. 1K,10M')
+    parser.add_argument('--output', default='bench_app_results.json')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown, 0.5 = 50%%')
+    parser.add_argument('--slack-ms', type=float, default=2.0, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}; run with --update-baseline to store one', file=sys.stderr)
+        sys.exit(2)
+
+    from bench_startup import start_xvfb
+    server, display = start_xvfb()
+    if display is None:
+        print('skipping app benchmark: no display and no Xvfb')
+        return
+    os.environ['DISPLAY'] = display
+    home = tempfile.mkdtemp(prefix='pynote-bench-')
+    os.environ['HOME'] = os.environ['APPDATA'] = home
+    try:
+        from pynote.main import PyNoteApp
+        app = PyNoteApp()
+        app.update()
+        recorder = Recorder()
+        instrument(app, recorder)
+        for label in args.sizes.split(','):
+            label = label.strip().upper()
+            path = os.path.join(home, f'bench_{label}.txt')
+            make_file(path, parse_size(label))
+            recorder.label = label
+            started = time.perf_counter()
+            bench_size(app, recorder, path)
+            print(f'{label}: done in {time.perf_counter() - started:.1f} s')
+            os.remove(path)
+        app.destroy()
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results = recorder.summary()
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'results written to {args.output}')
+
+    if args.update_baseline:
+        compare(results, {}, args.tolerance, args.slack_ms)
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'baseline updated: {args.baseline}')
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance, args.slack_ms)
+    for regression in regressions:
+        print(f'REGRESSION: {regression}')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Microbenchmarks for the rope text model.
+
+Builds a buffer of the given size (default 20 MB of short lines) and times,
+headlessly through ``buffer.TextBuffer``:
+
+- building the tree from a string,
+- single-character inserts and deletes at random offsets (typing),
+- replacing a line as ``EditorWidget`` does when mirroring an edit,
+- offset -> line and line -> offset lookups,
+- taking a snapshot and flattening it (what a worker thread does),
+- listing the chunks handed to a save,
+
+and compares the inserts with the same edit on a plain ``str``. With a
+display available it also times a keystroke in a Text widget with and
+without the mirror.
+
+Usage:
+    python benchmarks/bench_buffer.py [megabytes]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pynote import buffer  # noqa: E402
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def timed(fn, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1e6)
+    return times
+
+
+def report(name, times):
+    print(f'{name:<34} p50 {percentile(times, 50):9.1f} us   p99 {percentile(times, 99):9.1f} us')
+
+
+def make_text(megabytes):
+    rng = random.Random(0)
+    words = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta']
+    line = ' '.join(rng.choice(words) for _ in range(10)) + '\n'
+    return line * (megabytes * 1024 * 1024 // len(line))
+
+
+def bench_model(text):
+    started = time.perf_counter()
+    buf = buffer.TextBuffer(text)
+    print(f'build {len(text) / 1e6:.0f}M chars: {(time.perf_counter() - started) * 1000:.0f} ms, '
+          f'{len(buf.chunks()):,} leaves, height {buf.height}')
+
+    rng = random.Random(1)
+    size = len(buf)
+    report('insert 1 char', timed(lambda: buf.insert(rng.randrange(size), 'x'), 5000))
+    size = len(buf)
+
+    def delete():
+        offset = rng.randrange(size - 1)
+        buf.delete(offset, offset + 1)
+    report('delete 1 char', timed(delete, 5000))
+    lines = buf.line_count
+
+    def mirror():
+        line = rng.randint(1, lines - 1)
+        buf.replace_lines(line, line, buf.lines(line, line) + 'x')
+    report('mirror a one-line edit', timed(mirror, 5000))
+    report('line_start(line)', timed(lambda: buf.line_start(rng.randint(1, lines)), 5000))
+    report('line_of(offset)', timed(lambda: buf.line_of(rng.randrange(len(buf))), 5000))
+    report('snapshot', timed(buf.snapshot, 5000))
+    report('chunks (save snapshot)', timed(buf.chunks, 5))
+    snap = buf.snapshot()
+    report('flatten snapshot (worker side)', timed(lambda: str(snap), 5))
+
+    plain = text
+    times = []
+    for _ in range(20):
+        offset = rng.randrange(len(plain))
+        started = time.perf_counter()
+        plain = plain[:offset] + 'x' + plain[offset:]
+        times.append((time.perf_counter() - started) * 1e6)
+    report('insert 1 char into a str', times)
+
+
+def bench_tk(text):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f'skipping Tk benchmark: {e}')
+        return
+    from pynote import editor
+    for mirrored in (False, True):
+        if mirrored:
+            widget = editor.EditorWidget(root)
+            target = widget.text
+        else:
+            target = tk.Text(root)
+        target.insert('1.0', text)
+        root.update()
+        rng = random.Random(2)
+        lines = int(target.index('end-1c').split('.')[0])
+        times = timed(lambda: target.insert(f'{rng.randint(1, lines)}.3', 'x'), 2000)
+        report('Tk keystroke' + (' + mirror' if mirrored else ''), times)
+        target.destroy()
+    root.destroy()
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    text = make_text(megabytes)
+    bench_model(text)
+    bench_tk(text)
+
+
+if __name__ == '__main__':
+    main()
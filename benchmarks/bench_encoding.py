@@ -0,0 +1,83 @@
+"""
+Benchmark encoding detection and decoding on large files.
+
+Compares the previous whole-file ``detect_encoding`` (read as UTF-8, then
+again as Latin-1, then once more to actually open the file) with the
+sampled, single-pass ``utils.open_decoded``.
+
+Usage:
+    python benchmarks/bench_encoding.py [size_mb]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pynote import utils  # noqa: E402
+
+
+def legacy_detect_encoding(filepath):
+    """The detector this benchmark replaces, kept for comparison."""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            f.read()
+        return 'utf-8'
+    except UnicodeDecodeError:
+        try:
+            with open(filepath, 'r', encoding='latin-1') as f:
+                f.read()
+            return 'latin-1'
+        except Exception:
+            return 'utf-8'
+
+
+def legacy_open(filepath):
+    encoding = legacy_detect_encoding(filepath)
+    with open(filepath, 'r', encoding=encoding) as f:
+        return f.read()
+
+
+def new_open(filepath):
+    return utils.read_text(filepath)[0]
+
+
+def make_files(tmpdir, size):
+    line_utf8 = 'Grüße aus Köln – naïve café déjà vu\n'
+    line_ascii = 'The quick brown fox jumps over the lazy dog\n'
+    repeat = size // len(line_utf8.encode('utf-8'))
+    files = {
+        'utf-8': (line_utf8 * repeat).encode('utf-8'),
+        'latin-1': ('Grüße aus Köln, naïve café\n' * repeat).encode('latin-1'),
+        # Valid UTF-8 for most of the file, a stray Latin-1 byte at the end
+        'mixed': (line_ascii * repeat).encode('utf-8') + 'fin é\n'.encode('latin-1'),
+    }
+    paths = {}
+    for name, data in files.items():
+        path = os.path.join(tmpdir, f'{name}.txt')
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths[name] = path
+    return paths
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = make_files(tmpdir, int(size_mb * 1024 * 1024))
+        print(f'{"file":<8} | {"detect old":>11} | {"detect new":>11} | {"open old":>10} | {"open new":>10}')
+        for name, path in paths.items():
+            print(f'{name:<8} | {timed(legacy_detect_encoding, path):9.1f}ms | '
+                  f'{timed(utils.detect_encoding, path):9.1f}ms | '
+                  f'{timed(legacy_open, path):8.1f}ms | {timed(new_open, path):8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
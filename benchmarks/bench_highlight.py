@@ -0,0 +1,131 @@
+"""
+Benchmark incremental syntax highlighting on a large Python file.
+
+Generates a 50,000-line module and measures, headlessly through
+``highlight.SyntaxModel``:
+
+- the initial full lex,
+- per-keystroke re-lex cost when typing inside a line,
+- the worst case of opening and closing a triple-quoted string near the top,
+
+compared with re-lexing the whole buffer on every keystroke. With a display
+available it also times ``Highlighter`` tagging the viewport in a Text widget.
+
+Usage:
+    python benchmarks/bench_highlight.py [lines]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pynote import highlight  # noqa: E402
+
+
+FUNCTION = '''\
+@decorator
+def function_{n}(value, items=None):
+    """Docstring for function {n}."""
+    total = 0  # running total
+    for i in range(len(items or [])):
+        total += i * {n} + 0x1F
+    return str(total) + 'done'
+'''
+
+
+def make_source(lines):
+    chunks = []
+    n = 0
+    while sum(c.count('\n') for c in chunks) < lines:
+        chunks.append(FUNCTION.format(n=n))
+        n += 1
+    return ''.join(chunks).split('\n')[:lines]
+
+
+def settle(model, lines):
+    get = lambda first, count: lines[first - 1:first - 1 + count]
+    lexed = 0
+    while model.first_pending is not None:
+        lexed += len(model.step(get, 200))
+    return lexed
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def bench_model(lines):
+    model = highlight.SyntaxModel(highlight.lex_python, len(lines))
+    started = time.perf_counter()
+    settle(model, lines)
+    print(f'initial lex of {len(lines):,} lines: {(time.perf_counter() - started) * 1000:.1f} ms')
+
+    rng = random.Random(0)
+    times, lexed = [], []
+    for _ in range(2000):
+        line = rng.randint(1, len(lines))
+        lines[line - 1] += 'x'
+        started = time.perf_counter()
+        model.replace_lines(line, line, line)
+        lexed.append(settle(model, lines))
+        times.append((time.perf_counter() - started) * 1e6)
+    print(f'keystroke re-lex: p50 {percentile(times, 50):.1f} us, p99 {percentile(times, 99):.1f} us, '
+          f'max {max(lexed)} lines')
+
+    # Typing the opening quotes turns the rest of the file into a string
+    for text in ('"""', 'x = 1'):
+        lines[9] = text
+        started = time.perf_counter()
+        model.replace_lines(10, 10, 10)
+        count = settle(model, lines)
+        print(f'set line 10 to {text!r}: {count:,} lines in {(time.perf_counter() - started) * 1000:.1f} ms')
+
+    started = time.perf_counter()
+    state = None
+    for line in lines:
+        _, state = highlight.lex_python(line, state)
+    print(f'full re-lex per keystroke (no incremental model): {(time.perf_counter() - started) * 1000:.1f} ms')
+
+
+def bench_tk(lines):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f'skipping Tk benchmark: {e}')
+        return
+    from pynote import editor, themes
+    text = tk.Text(root, width=100, height=50)
+    text.pack()
+    text.insert('1.0', '\n'.join(lines))
+    changes = editor.ChangeHook(text)
+    highlighter = highlight.Highlighter(text, themes.get_theme('light'))
+    changes.add_listener(highlighter.on_change)
+    highlighter.set_lexer(highlight.lex_python)
+    root.update()
+
+    text.see('25000.0')
+    root.update_idletasks()
+    times = []
+    for i in range(200):
+        started = time.perf_counter()
+        text.insert(f'{25000 + i % 40}.0', 'x')
+        highlighter._run()
+        times.append((time.perf_counter() - started) * 1000)
+    print(f'Tk keystroke + viewport highlight: p50 {percentile(times, 50):.2f} ms, '
+          f'p99 {percentile(times, 99):.2f} ms')
+    root.destroy()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    lines = make_source(count)
+    bench_model(list(lines))
+    bench_tk(lines)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark the incremental Markdown preview on a 1 MB document.
+
+Generates about 1 MB of Markdown (headings, paragraphs with inline markup,
+lists, quotes and fenced code) and measures, headlessly:
+
+- the first render of the whole document,
+- per-edit latency - split, hash, render the changed block and work out
+  which preview lines to replace - for single-character edits,
+
+compared with splitting and rendering the whole document again on each
+edit. With a display available it also times ``PreviewPane`` applying an
+edit to its Text.
+
+Usage:
+    python benchmarks/bench_preview.py [bytes]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pynote import preview  # noqa: E402
+
+
+SECTION = '''\
+## Section {n}
+
+Some **bold** text, some *emphasis* and `inline code` with a [link](https://example.com/{n}).
+The paragraph goes on for a second line so it is joined with the first.
+
+- First item with `code`
+- Second item with **strong** words
+  1. Nested ordered item
+  2. Another one
+
+> A quote about section {n},
+> spread over two lines.
+
+```python
+def section_{n}():
+    return {n} * 2
+```
+
+---
+
+'''
+
+
+def make_document(size):
+    chunks = []
+    total = 0
+    n = 0
+    while total < size:
+        chunk = SECTION.format(n=n)
+        chunks.append(chunk)
+        total += len(chunk)
+        n += 1
+    return ''.join(chunks).split('\n')
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def edit(lines, rng):
+    """Type a character into a random non-blank line."""
+    while True:
+        line = rng.randrange(len(lines))
+        if lines[line].strip():
+            lines[line] += 'x'
+            return
+
+
+def bench_model(lines):
+    splitter = preview.BlockSplitter(preview.RenderCache())
+    layout = preview.PreviewLayout()
+    heights = lambda key: preview.height(splitter.runs[key])
+    started = time.perf_counter()
+    keys, firsts, rendered = splitter.update('\n'.join(lines))
+    layout.update(keys, firsts, heights)
+    size = len('\n'.join(lines).encode())
+    print(f'first render of {size / 1e6:.2f} MB ({len(keys):,} blocks): '
+          f'{(time.perf_counter() - started) * 1000:.1f} ms')
+
+    rng = random.Random(0)
+    times, counts = [], []
+    for _ in range(200):
+        edit(lines, rng)
+        started = time.perf_counter()
+        keys, firsts, rendered = splitter.update('\n'.join(lines))
+        layout.update(keys, firsts, heights)
+        times.append((time.perf_counter() - started) * 1000)
+        counts.append(rendered)
+    print(f'per edit (split + changed blocks + diff): p50 {percentile(times, 50):.1f} ms, '
+          f'p99 {percentile(times, 99):.1f} ms, max {max(counts)} block(s) rendered')
+
+    started = time.perf_counter()
+    for _, block in preview.split_blocks('\n'.join(lines)):
+        preview.render_block(block)
+    print(f'full re-render per edit (no cache): {(time.perf_counter() - started) * 1000:.1f} ms')
+
+
+def wait(root, pane):
+    """Run the event loop until the pane has shown its last render."""
+    count = len(pane.latencies)
+    while len(pane.latencies) == count:
+        root.update()
+        time.sleep(0.001)
+    root.update_idletasks()
+
+
+def bench_tk(lines):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f'skipping Tk benchmark: {e}')
+        return
+    pane = preview.PreviewPane(root)
+    pane.pack(fill='both', expand=True)
+    pane.render(['\n'.join(lines)])
+    wait(root, pane)
+
+    rng = random.Random(1)
+    times = []
+    for _ in range(100):
+        edit(lines, rng)
+        started = time.perf_counter()
+        pane.render(['\n'.join(lines)])
+        wait(root, pane)
+        times.append((time.perf_counter() - started) * 1000)
+    print(f'Tk edit to preview updated (incl. {pane.POLL_MS} ms polling): p50 {percentile(times, 50):.1f} ms, '
+          f'p99 {percentile(times, 99):.1f} ms')
+    root.destroy()
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1024 * 1024
+    lines = make_document(size)
+    bench_model(list(lines))
+    bench_tk(lines)
+
+
+if __name__ == '__main__':
+    main()
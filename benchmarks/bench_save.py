@@ -0,0 +1,55 @@
+"""
+Benchmark the save pipeline: UI-thread blocking time and write throughput.
+
+The UI-thread cost is the snapshot a save takes - ``TextBuffer.chunks``,
+which is what the editor's ``softbreaks.chunks()`` returns when no line is
+split for display; everything else runs in the worker. Runs headless.
+
+Usage:
+    python benchmarks/bench_save.py [size_mb ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pynote import buffer, saver  # noqa: E402
+
+
+def make_text(size_bytes):
+    line = 'The quick brown fox jumps over the lazy dog 0123456789\n'
+    return line * (size_bytes // len(line))
+
+
+def bench(size_mb):
+    buf = buffer.TextBuffer(make_text(int(size_mb * 1024 * 1024)))
+    # A typed character, so the rope is not a single balanced build
+    buf.insert(len(buf) // 2, 'x')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'bench.txt')
+        started = time.perf_counter()
+        chunks = buf.chunks()
+        blocked = time.perf_counter() - started
+        job = saver.SaveJob(path, chunks)
+        job.start()
+        job.wait()
+        size = os.path.getsize(path)
+        unchanged = saver.SaveJob(path, buf.chunks(), previous=(job.digest, job.stamp))
+        unchanged.start()
+        unchanged.wait()
+    print(f'{size_mb:>8.1f} MB | UI blocked {blocked * 1000:8.1f} ms ({len(chunks):,} chunks) | '
+          f'worker {job.seconds * 1000:8.1f} ms | '
+          f'{size / job.seconds / 1e6 if job.seconds else 0:8.1f} MB/s | '
+          f'unchanged check {unchanged.seconds * 1000:8.1f} ms ({unchanged.status})')
+
+
+def main():
+    sizes = [float(a) for a in sys.argv[1:]] or [1, 10, 50]
+    for size_mb in sizes:
+        bench(size_mb)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark Find & Replace on a 10MB buffer.
+
+Compares the ``Text.search`` loop a Tk editor would otherwise use (one Tcl
+round-trip per match, plus one ``tag_add`` and one ``replace`` per match
+for highlight-all and replace-all) with ``search.SearchJob`` scanning a
+snapshot in a worker thread and ``search.replace_all`` applied as a single
+edit. The Tk part needs a display; the engine timings run headless.
+
+Usage:
+    python benchmarks/bench_search.py [size_mb]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pynote import search  # noqa: E402
+
+
+WORDS = ('alpha', 'beta', 'gamma', 'delta', 'needle', 'epsilon', 'zeta', 'theta')
+
+CASES = (
+    # (label, pattern, regex, Tcl pattern for Text.search)
+    ('literal', 'needle', False, 'needle'),
+    ('regex', r'\b(?:beta|zeta)\d+', True, r'\m(?:beta|zeta)\d+'),
+    ('rare', 'needle9999x', False, 'needle9999x'),
+)
+
+
+def make_text(size):
+    rng = random.Random(0)
+    lines = []
+    total = 0
+    while total < size:
+        line = ' '.join(f'{rng.choice(WORDS)}{rng.randint(0, 99) if rng.random() < 0.1 else ""}'
+                        for _ in range(12))
+        lines.append(line)
+        total += len(line) + 1
+    return '\n'.join(lines)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def engine_search(text, pattern):
+    job = search.SearchJob(text, pattern)
+    first_batch = None
+    started = time.perf_counter()
+    job.start()
+    count = 0
+    while True:
+        finished = job.done
+        for batch in job.batches():
+            if first_batch is None:
+                first_batch = (time.perf_counter() - started) * 1000
+            count += len(batch)
+        if finished:
+            return count, first_batch
+        time.sleep(0.001)
+
+
+def bench_engine(text):
+    print(f'{"engine":<8} | {"matches":>8} | {"first batch":>11} | {"all":>9} | {"replace-all":>11}')
+    for label, source, regex, _ in CASES:
+        pattern = search.compile_pattern(source, regex=regex)
+        ms, (count, first) = timed(engine_search, text, pattern)
+        replace_ms, _ = timed(search.replace_all, text, pattern, 'X')
+        first = f'{first:9.1f}ms' if first is not None else f'{"-":>11}'
+        print(f'{label:<8} | {count:>8,} | {first} | {ms:7.1f}ms | {replace_ms:9.1f}ms')
+
+
+def tk_search_all(text_widget, tcl_pattern, regex):
+    positions = []
+    count = __import__('tkinter').IntVar(text_widget)
+    index = '1.0'
+    while True:
+        index = text_widget.search(tcl_pattern, index, 'end', regexp=regex, count=count)
+        if not index:
+            return positions
+        end = f'{index}+{count.get()}c'
+        positions.append((index, end))
+        index = end
+
+
+def bench_tk(text):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f'skipping Tk benchmark: {e}')
+        return
+    widget = tk.Text(root)
+    widget.insert('1.0', text)
+    print(f'{"Tk":<8} | {"matches":>8} | {"search":>9} | {"tag all":>9} | {"replace-all":>11} | {"engine edit":>11}')
+    for label, source, regex, tcl_pattern in CASES:
+        ms, positions = timed(tk_search_all, widget, tcl_pattern, regex)
+        tag_ms, _ = timed(lambda: [widget.tag_add('found', a, b) for a, b in positions])
+        widget.tag_remove('found', '1.0', 'end')
+
+        def tk_replace():
+            for a, b in reversed(positions):
+                widget.replace(a, b, 'X')
+        replace_ms, _ = timed(tk_replace)
+        widget.delete('1.0', 'end')
+        widget.insert('1.0', text)
+
+        result = search.replace_all(text, search.compile_pattern(source, regex=regex), 'X')
+        if result is not None:
+            first, last, new_text, _ = result
+            edit_ms, _ = timed(widget.replace, f'{first}.0', f'{last}.end', new_text)
+            widget.delete('1.0', 'end')
+            widget.insert('1.0', text)
+        else:
+            edit_ms = 0.0
+        print(f'{label:<8} | {len(positions):>8,} | {ms:7.1f}ms | {tag_ms:7.1f}ms | '
+              f'{replace_ms:9.1f}ms | {edit_ms:9.1f}ms')
+    root.destroy()
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    text = make_text(int(size_mb * 1024 * 1024))
+    bench_engine(text)
+    bench_tk(text)
+
+
+if __name__ == '__main__':
+    main()
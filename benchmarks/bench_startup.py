@@ -0,0 +1,172 @@
+"""
+Benchmark PyNote's cold start and fail on regressions.
+
+Measures, each in a fresh interpreter:
+
+- the cumulative import time of ``pynote.main`` from ``python -X importtime``,
+  with the slowest modules listed,
+- time to first paint: from launching the process to the first Expose event
+  of the editor's Text widget, plus the import and construction times that
+  make it up. This needs a display; without $DISPLAY an ``Xvfb`` server is
+  started if one is installed, otherwise this part is skipped.
+
+Sources are byte-compiled first, so the numbers do not include compiling
+``main.py`` when its cached bytecode is stale. The app runs with a
+temporary home directory so no settings, journals or swap files of the
+user are touched. The exit status is 1 if a median exceeds its threshold.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--max-import-ms MS] [--max-paint-ms MS]
+"""
+
+import argparse
+import compileall
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Regression thresholds for the medians, in milliseconds
+MAX_IMPORT_MS = 150
+MAX_PAINT_MS = 1000
+
+# Runs in the child: report timings at the first paint of the text widget
+CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+from pynote.main import PyNoteApp
+imported = time.perf_counter()
+app = PyNoteApp()
+built = time.perf_counter()
+
+def on_expose(event):
+    if event.widget is not app.text:
+        return
+    app.unbind('<Expose>')
+    print(json.dumps({
+        'paint_clock': time.monotonic(),
+        'import_ms': (imported - started) * 1000,
+        'construct_ms': (built - imported) * 1000,
+        'paint_ms': (time.perf_counter() - started) * 1000,
+    }), flush=True)
+    app.after_idle(app.destroy)
+
+app.bind('<Expose>', on_expose, add='+')
+app.after(20000, app.destroy)
+app.mainloop()
+'''
+
+
+def _env(home):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SRC + os.pathsep + env.get('PYTHONPATH', '')
+    env['HOME'] = home
+    env['APPDATA'] = home
+    return env
+
+
+def measure_imports(runs, env):
+    totals = []
+    selfs = {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import pynote.main'],
+                                env=env, capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            own, cumulative, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            selfs.setdefault(name, []).append(int(own))
+            if name == 'pynote.main':
+                totals.append(int(cumulative) / 1000)
+    slowest = sorted(selfs.items(), key=lambda item: -statistics.median(item[1]))[:10]
+    print('slowest imports (median self time):')
+    for name, values in slowest:
+        print(f'  {statistics.median(values) / 1000:7.1f} ms  {name}')
+    median = statistics.median(totals)
+    print(f'import pynote.main: median {median:.1f} ms, min {min(totals):.1f} ms over {runs} runs')
+    return median
+
+
+def start_xvfb():
+    """Return (server process or None, display), starting Xvfb if needed."""
+    if os.environ.get('DISPLAY'):
+        return None, os.environ['DISPLAY']
+    if shutil.which('Xvfb') is None:
+        return None, None
+    for number in range(90, 110):
+        if not os.path.exists(f'/tmp/.X11-unix/X{number}'):
+            break
+    server = subprocess.Popen(['Xvfb', f':{number}', '-screen', '0', '1280x800x24', '-nolisten', 'tcp'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(f'/tmp/.X11-unix/X{number}'):
+        if server.poll() is not None or time.monotonic() > deadline:
+            server.kill()
+            return None, None
+        time.sleep(0.05)
+    return server, f':{number}'
+
+
+def measure_paint(runs, env):
+    server, display = start_xvfb()
+    if display is None:
+        print('skipping first-paint benchmark: no display and no Xvfb')
+        return None
+    env = dict(env, DISPLAY=display)
+    results = []
+    try:
+        for _ in range(runs):
+            launched = time.monotonic()
+            result = subprocess.run([sys.executable, '-c', CHILD], env=env,
+                                    capture_output=True, text=True, timeout=60)
+            lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+            if not lines:
+                print(f'app failed to paint:\n{result.stderr}')
+                return None
+            data = json.loads(lines[0])
+            data['total_ms'] = (data['paint_clock'] - launched) * 1000
+            results.append(data)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    for key in ('import_ms', 'construct_ms', 'paint_ms', 'total_ms'):
+        values = [r[key] for r in results]
+        print(f'{key:<13} median {statistics.median(values):7.1f} ms   min {min(values):7.1f} ms')
+    return statistics.median(r['total_ms'] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-import-ms', type=float, default=MAX_IMPORT_MS)
+    parser.add_argument('--max-paint-ms', type=float, default=MAX_PAINT_MS)
+    args = parser.parse_args()
+
+    compileall.compile_dir(SRC, quiet=1)
+    home = tempfile.mkdtemp(prefix='pynote-startup-')
+    try:
+        env = _env(home)
+        failures = []
+        import_ms = measure_imports(args.runs, env)
+        if import_ms > args.max_import_ms:
+            failures.append(f'import time {import_ms:.1f} ms > {args.max_import_ms:.0f} ms')
+        paint_ms = measure_paint(args.runs, env)
+        if paint_ms is not None and paint_ms > args.max_paint_ms:
+            failures.append(f'time to first paint {paint_ms:.1f} ms > {args.max_paint_ms:.0f} ms')
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+"""
+Run the headless batch commands: ``python -m pynote <command> ...``.
+"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
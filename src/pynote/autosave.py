@@ -0,0 +1,310 @@
+"""
+Autosave journal for PyNote.
+
+Instead of rewriting the document every interval, edits are appended to a
+journal of line-range replacements in the config directory. A background
+thread flushes the journal and periodically compacts it, so I/O scales with
+the edits made rather than the document size. After a crash, replaying the
+journal onto the last saved file recovers the unsaved work.
+
+Journal format (JSON lines): a header object followed by one
+``[first, old_last, text]`` entry per edit, meaning "lines
+``first..old_last`` were replaced by ``text``". The header records the
+``saver.file_stamp`` of the base file, so a file changed after the crash
+is not silently replayed onto.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .saver import file_stamp
+
+
+def compact(entries):
+    """
+    Merge entries whose range fully covers the lines an earlier entry wrote.
+
+    Typing on a line produces one entry per keystroke that each replace the
+    previous one's result; those collapse into a single entry.
+
+    Args:
+        entries: List of ``[first, old_last, text]`` entries
+
+    Returns:
+        list: Equivalent, usually much shorter, list of entries
+    """
+    out = []
+    for first, old_last, text in entries:
+        while out:
+            p_first, p_old_last, p_text = out[-1]
+            p_new_last = p_first + p_text.count('\n')
+            if not (first <= p_first and p_new_last <= old_last):
+                break
+            # The new entry overwrites everything the previous one wrote
+            out.pop()
+            old_last += p_old_last - p_new_last
+        out.append([first, old_last, text])
+    return out
+
+
+def replay(base, entries):
+    """
+    Apply journal entries to a base text.
+
+    Args:
+        base: Content of the last saved file
+        entries: List of ``[first, old_last, text]`` entries
+
+    Returns:
+        str: Recovered content
+    """
+    lines = base.split('\n')
+    for first, old_last, text in entries:
+        lines[first - 1:old_last] = text.split('\n')
+    return '\n'.join(lines)
+
+
+def base_changed(header):
+    """
+    Return True if a journal's base file is no longer the version it recorded.
+
+    A journal started while its base was still being saved has no stamp
+    and counts as changed.
+    """
+    if not header.get('base'):
+        return False
+    stamp = file_stamp(header['base'])
+    return stamp is None or list(stamp) != header.get('base_stamp')
+
+
+def pid_alive(pid):
+    """Return True if a process with this pid may still be running."""
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def read_journal(path):
+    """
+    Read a journal file.
+
+    Returns:
+        tuple: ``(header, entries)``; a truncated last line is ignored
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        entries = []
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+    return header, entries
+
+
+def find_recoverable(journal_dir):
+    """
+    List journals left behind by instances that are no longer running.
+
+    Returns:
+        list: ``(journal_path, header, entries)`` tuples, newest first
+    """
+    found = []
+    try:
+        names = os.listdir(journal_dir)
+    except OSError:
+        return found
+    for name in names:
+        if not name.endswith('.jnl'):
+            continue
+        path = os.path.join(journal_dir, name)
+        try:
+            header, entries = read_journal(path)
+        except (OSError, ValueError):
+            continue
+        if entries and not pid_alive(header.get('pid', 0)):
+            found.append((path, header, entries))
+    found.sort(key=lambda item: item[1].get('created', 0), reverse=True)
+    return found
+
+
+class EditJournal:
+    """
+    Append-only edit journal written by a background thread.
+
+    ``record`` is called on the Tk thread and only appends to a list; the
+    writer thread flushes every ``interval`` seconds and compacts the file
+    once ``COMPACT_EVERY`` entries have been written since the last
+    compaction.
+
+    Args:
+        journal_dir: Directory for journal files
+        interval: Seconds between flushes
+    """
+
+    COMPACT_EVERY = 500
+
+    def __init__(self, journal_dir, interval=300):
+        self.journal_dir = journal_dir
+        self.interval = max(1, interval)
+        self.path = None
+        self._header = None
+        self._pending = []
+        self._entries = []
+        self._since_compact = 0
+        self._reset = False
+        self._lock = threading.Lock()
+        # Serialises file I/O so a flush never recreates a journal that
+        # begin() just replaced
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        os.makedirs(journal_dir, exist_ok=True)
+
+    def start(self):
+        """Start the writer thread."""
+        self._thread.start()
+
+    def begin(self, doc_path, base_path=None, base_stamp=None):
+        """
+        Start a fresh journal for a buffer.
+
+        Args:
+            doc_path: Path of the document, or None for an untitled buffer
+            base_path: File holding the content the journal applies to, or
+                None when the journal starts from an empty buffer
+            base_stamp: ``saver.file_stamp`` of that content, or None while
+                it is still being written (see ``set_base_stamp``)
+        """
+        header = {
+            'path': doc_path,
+            'base': base_path,
+            'base_stamp': list(base_stamp) if base_stamp else None,
+            'pid': os.getpid(),
+            'created': time.time(),
+        }
+        key = doc_path or f'untitled-{os.getpid()}-{id(self)}'
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.jnl'
+        self._switch(os.path.join(self.journal_dir, name), header)
+
+    def set_base_stamp(self, stamp):
+        """Record the stamp of the base once a save has written it."""
+        with self._lock:
+            if self._header is None:
+                return
+            self._header = dict(self._header, base_stamp=list(stamp) if stamp else None)
+            # The header is the first line, so the journal is rewritten
+            self._reset = True
+
+    def end(self):
+        """Stop journaling the current buffer and remove its journal."""
+        self._switch(None, None)
+
+    def _switch(self, path, header):
+        with self._lock:
+            old_path = self.path
+            self.path = path
+            self._header = header
+            self._pending = []
+            self._entries = []
+            self._since_compact = 0
+            self._reset = True
+        if old_path and old_path != path:
+            with self._io_lock:
+                self._remove(old_path)
+
+    def record(self, first, old_last, text):
+        """Record that lines first..old_last were replaced by text."""
+        if self.path is None:
+            return
+        with self._lock:
+            self._pending.append([first, old_last, text])
+
+    def flush(self):
+        """Write pending entries now (from the calling thread)."""
+        with self._io_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            path, header = self.path, self._header
+            pending, self._pending = self._pending, []
+            reset, self._reset = self._reset, False
+            if path is None:
+                return
+            pending = compact(pending)
+            self._entries = compact(self._entries + pending)
+            self._since_compact += len(pending)
+            rewrite = reset or self._since_compact >= self.COMPACT_EVERY
+            if rewrite:
+                self._since_compact = 0
+                entries = list(self._entries)
+        if rewrite:
+            if entries:
+                self._rewrite(path, header, entries)
+            else:
+                self._remove(path)
+        elif pending:
+            self._append(path, header, pending)
+
+    def close(self, discard=True):
+        """Stop the writer; by default remove the journal (clean exit)."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if discard and self.path:
+            with self._io_lock:
+                self._remove(self.path)
+        else:
+            self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _append(self, path, header, entries):
+        new = not os.path.exists(path)
+        with open(path, 'a', encoding='utf-8') as f:
+            if new:
+                f.write(json.dumps(header) + '\n')
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite(self, path, header, entries):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header) + '\n')
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
@@ -0,0 +1,290 @@
+"""
+Headless text model for PyNote.
+
+``TextBuffer`` is a rope: a height-balanced (AVL) tree whose leaves hold
+short strings and whose nodes cache their length and newline count. Edits,
+offset and line lookups are O(log n). Nodes are never modified once built -
+an edit copies only the path it touches - so ``snapshot`` is O(1) and a
+snapshot can be read from a worker thread while the editor keeps changing.
+
+Offsets count characters; lines are 1-based and columns 0-based, as in a
+Tk Text index. Line breaks are always stored as ``'\\n'``.
+"""
+
+LEAF_SIZE = 2048    # characters per leaf when building from a string
+LEAF_MAX = 4096     # an edit that keeps a leaf below this rewrites it in place
+
+
+class _Leaf:
+    __slots__ = ('text', 'length', 'newlines', 'height')
+
+    def __init__(self, text):
+        self.text = text
+        self.length = len(text)
+        self.newlines = text.count('\n')
+        self.height = 0
+
+
+class _Node:
+    __slots__ = ('left', 'right', 'length', 'newlines', 'height')
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.length = left.length + right.length
+        self.newlines = left.newlines + right.newlines
+        self.height = max(left.height, right.height) + 1
+
+
+def _build(text):
+    """Build a balanced tree from a string (None for '')."""
+    if not text:
+        return None
+    level = [_Leaf(text[i:i + LEAF_SIZE]) for i in range(0, len(text), LEAF_SIZE)]
+    while len(level) > 1:
+        paired = [_Node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired[-1] = _join(paired[-1], level[-1])
+        level = paired
+    return level[0]
+
+
+def _rotate(left, right):
+    """Join two trees whose heights differ by exactly two."""
+    if right.height > left.height:
+        if right.right.height >= right.left.height:
+            return _Node(_Node(left, right.left), right.right)
+        inner = right.left
+        return _Node(_Node(left, inner.left), _Node(inner.right, right.right))
+    if left.left.height >= left.right.height:
+        return _Node(left.left, _Node(left.right, right))
+    inner = left.right
+    return _Node(_Node(left.left, inner.left), _Node(inner.right, right))
+
+
+def _join(a, b):
+    """Concatenate two trees, keeping the result balanced."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.length + b.length <= LEAF_MAX and a.height == 0 and b.height == 0:
+        return _Leaf(a.text + b.text)
+    if a.height > b.height + 1:
+        right = _join(a.right, b)
+        if right.height <= a.left.height + 1:
+            return _Node(a.left, right)
+        return _rotate(a.left, right)
+    if b.height > a.height + 1:
+        left = _join(a, b.left)
+        if left.height <= b.right.height + 1:
+            return _Node(left, b.right)
+        return _rotate(left, b.right)
+    return _Node(a, b)
+
+
+def _split(node, offset):
+    """Split a tree at a character offset into (left, right)."""
+    if node is None:
+        return None, None
+    if offset <= 0:
+        return None, node
+    if offset >= node.length:
+        return node, None
+    if node.height == 0:
+        return _Leaf(node.text[:offset]), _Leaf(node.text[offset:])
+    if offset < node.left.length:
+        a, b = _split(node.left, offset)
+        return a, _join(b, node.right)
+    a, b = _split(node.right, offset - node.left.length)
+    return _join(node.left, a), b
+
+
+def _replace_in_leaf(node, start, end, text):
+    """
+    Rewrite a range inside a single leaf, copying only the path to it.
+
+    Returns None if the range spans leaves, or the leaf would become empty
+    or grow too big. Heights do not change, so no rebalancing is needed.
+    """
+    if node.height == 0:
+        if node.length - (end - start) + len(text) > LEAF_MAX:
+            return None
+        new = node.text[:start] + text + node.text[end:]
+        return _Leaf(new) if new else None
+    left = node.left
+    if end <= left.length:
+        # An edit at the boundary goes to the end of the left leaf
+        sub = _replace_in_leaf(left, start, end, text)
+        return _Node(sub, node.right) if sub is not None else None
+    if start >= left.length:
+        sub = _replace_in_leaf(node.right, start - left.length, end - left.length, text)
+        return _Node(left, sub) if sub is not None else None
+    return None
+
+
+class TextBuffer:
+    """
+    Persistent rope of text with line lookups.
+
+    Args:
+        text: Initial content
+    """
+
+    def __init__(self, text=''):
+        self._root = _build(text)
+
+    @classmethod
+    def _from_root(cls, root):
+        buf = cls.__new__(cls)
+        buf._root = root
+        return buf
+
+    def __len__(self):
+        return self._root.length if self._root is not None else 0
+
+    def __str__(self):
+        return ''.join(self.chunks())
+
+    def text(self):
+        """Return the whole content."""
+        return str(self)
+
+    @property
+    def line_count(self):
+        """Number of lines (an empty buffer has one)."""
+        return (self._root.newlines if self._root is not None else 0) + 1
+
+    @property
+    def height(self):
+        """Height of the tree, for tests and benchmarks."""
+        return self._root.height if self._root is not None else 0
+
+    def snapshot(self):
+        """Return an immutable copy in O(1); safe to read from any thread."""
+        return TextBuffer._from_root(self._root)
+
+    def chunks(self):
+        """Return the content as a list of leaf strings, in order."""
+        out = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            if node.height == 0:
+                out.append(node.text)
+            else:
+                stack.append(node.right)
+                stack.append(node.left)
+        return out
+
+    def get(self, start=0, end=None):
+        """Return the characters in [start, end)."""
+        size = len(self)
+        end = size if end is None else min(end, size)
+        start = max(0, start)
+        if start >= end:
+            return ''
+        out = []
+        self._collect(self._root, start, end, out)
+        return ''.join(out)
+
+    def _collect(self, node, start, end, out):
+        while node.height:
+            left = node.left
+            if end <= left.length:
+                node = left
+            elif start >= left.length:
+                start -= left.length
+                end -= left.length
+                node = node.right
+            else:
+                self._collect(left, start, left.length, out)
+                start, end, node = 0, end - left.length, node.right
+        out.append(node.text[start:end])
+
+    def replace(self, start, end, text):
+        """Replace the characters in [start, end) with text."""
+        size = len(self)
+        start = max(0, min(start, size))
+        end = max(start, min(end, size))
+        if start == end and not text:
+            return
+        root = self._root
+        if root is not None:
+            node = _replace_in_leaf(root, start, end, text)
+            if node is not None or (start == 0 and end == size and not text):
+                self._root = node
+                return
+        left, rest = _split(root, start)
+        _, right = _split(rest, end - start)
+        self._root = _join(_join(left, _build(text)), right)
+
+    def insert(self, offset, text):
+        """Insert text at an offset."""
+        self.replace(offset, offset, text)
+
+    def delete(self, start, end):
+        """Delete the characters in [start, end)."""
+        self.replace(start, end, '')
+
+    def line_start(self, line):
+        """Offset of the first character of a line (clamped to the buffer)."""
+        if line <= 1 or self._root is None:
+            return 0
+        if line > self.line_count:
+            return len(self)
+        # Find the (line - 1)th newline and step past it
+        k = line - 1
+        node, offset = self._root, 0
+        while node.height:
+            left = node.left
+            if left.newlines >= k:
+                node = left
+            else:
+                k -= left.newlines
+                offset += left.length
+                node = node.right
+        pos = -1
+        for _ in range(k):
+            pos = node.text.index('\n', pos + 1)
+        return offset + pos + 1
+
+    def line_end(self, line):
+        """Offset just before the newline ending a line."""
+        if line >= self.line_count:
+            return len(self)
+        return self.line_start(line + 1) - 1
+
+    def line_of(self, offset):
+        """Line containing an offset."""
+        offset = max(0, min(offset, len(self)))
+        node, line = self._root, 1
+        if node is None:
+            return 1
+        while node.height:
+            left = node.left
+            if offset < left.length:
+                node = left
+            else:
+                offset -= left.length
+                line += left.newlines
+                node = node.right
+        return line + node.text.count('\n', 0, offset)
+
+    def index(self, line, col=0):
+        """Offset of a (line, column) position, clamped to the line."""
+        start = self.line_start(line)
+        return min(start + col, self.line_end(line)) if line <= self.line_count else start
+
+    def position(self, offset):
+        """(line, column) of an offset."""
+        line = self.line_of(offset)
+        return line, max(0, min(offset, len(self))) - self.line_start(line)
+
+    def lines(self, first, last):
+        """Text of lines first..last, like Text.get('first.0', 'last.end')."""
+        return self.get(self.line_start(first), self.line_end(last))
+
+    def replace_lines(self, first, last, text):
+        """Replace lines first..last (without the final newline) with text."""
+        self.replace(self.line_start(first), self.line_end(last), text)
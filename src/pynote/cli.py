@@ -0,0 +1,289 @@
+"""
+Headless batch commands for PyNote: ``python -m pynote <command> ...``.
+
+Runs the editor's text logic - ``utils.count_words``/``count_chars``,
+encoding detection and ``search`` - over many files without the GUI. Files
+are spread over a process pool and one JSON object per file (or per match,
+for ``find``) is written to stdout as soon as it is ready. Large files are
+read through ``mmap``. Nothing here imports tkinter.
+
+Commands:
+    stats      word, character and line counts, encoding and line ending
+    encoding   detected encoding and line ending
+    normalize  rewrite files with one encoding and line ending
+    find       list matches of a pattern
+    replace    replace matches of a pattern in place
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import json
+import mmap
+import os
+import re
+import sys
+
+from . import saver, search, utils
+
+
+# Files at least this big are decoded straight from a memory map
+MMAP_THRESHOLD = 4 * 1024 * 1024
+# Bytes checked for NUL to detect binary files
+BINARY_SAMPLE = 8192
+
+_NEWLINES = {'lf': '\n', 'crlf': '\r\n', 'cr': '\r'}
+_NEWLINE_NAMES = {v: k.upper() for k, v in _NEWLINES.items()}
+
+
+class BinaryFile(Exception):
+    """Raised for files that look binary; they are skipped."""
+
+
+def check_binary(path):
+    """
+    Raise ``BinaryFile`` if a file looks binary.
+
+    A file with a byte order mark is text - UTF-16 and UTF-32 are full of
+    NUL bytes - so only files without one are checked for NUL.
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(BINARY_SAMPLE)
+    if b'\0' in sample and not any(sample.startswith(bom) for bom, _ in utils._BOMS):
+        raise BinaryFile(path)
+
+
+def read_file(path):
+    """
+    Read and decode a file like the editor does.
+
+    Line endings are translated to ``'\\n'``. Files of ``MMAP_THRESHOLD``
+    bytes or more are decoded from a memory map, without first copying them
+    into a bytes object. A UTF-8 file with invalid bytes is decoded as
+    Latin-1 from the first of them on, as ``utils.DecodedFile`` does, and
+    like the editor it is reported as UTF-8, the encoding it is written
+    back in.
+
+    Returns:
+        tuple: (text, encoding, newline, fallback) where fallback is True
+        for such mixed files
+    """
+    check_binary(path)
+    if os.path.getsize(path) < MMAP_THRESHOLD:
+        with utils.open_decoded(path) as f:
+            text = f.read_all()
+            encoding = 'utf-8' if f.fallback else f.encoding
+            return text, encoding, f.newline, f.fallback
+    encoding = utils.detect_encoding(path)
+    fallback = False
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        try:
+            text = str(mm, encoding)
+        except UnicodeDecodeError as e:
+            if encoding != 'utf-8':
+                raise
+            with memoryview(mm) as view:
+                text = str(view[:e.start], 'utf-8') + str(view[e.start:], 'latin-1')
+            fallback = True
+    newline = utils.newline_style(text[:utils.SAMPLE_SIZE])
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text, encoding, newline, fallback
+
+
+def _guarded(task):
+    """Turn a per-file task's exceptions into error records."""
+    @functools.wraps(task)
+    def run(path, *args, **kwargs):
+        try:
+            return task(path, *args, **kwargs)
+        except BinaryFile:
+            return [{'path': path, 'skipped': 'binary'}]
+        except (OSError, UnicodeError, ValueError) as e:
+            return [{'path': path, 'error': str(e)}]
+    return run
+
+
+@_guarded
+def stats_task(path):
+    text, encoding, newline, fallback = read_file(path)
+    return [{
+        'path': path,
+        'words': utils.count_words(text),
+        'chars': utils.count_chars(text),
+        'lines': text.count('\n') + 1,
+        'bytes': os.path.getsize(path),
+        'encoding': encoding,
+        'newline': _NEWLINE_NAMES[newline],
+        'mixed': fallback,
+    }]
+
+
+@_guarded
+def encoding_task(path):
+    check_binary(path)
+    with utils.open_decoded(path) as f:
+        return [{'path': path, 'encoding': f.encoding, 'newline': _NEWLINE_NAMES[f.newline]}]
+
+
+@_guarded
+def normalize_task(path, encoding, newline, dry_run):
+    text, old_encoding, old_newline, fallback = read_file(path)
+    newline = newline or old_newline
+    # A mixed file is never in the target encoding already
+    changed = fallback or (encoding, newline) != (old_encoding, old_newline)
+    if changed and not dry_run:
+        saver.write_atomic(path, [text], encoding, newline)
+    return [{
+        'path': path,
+        'from': [old_encoding, _NEWLINE_NAMES[old_newline]],
+        'to': [encoding, _NEWLINE_NAMES[newline]],
+        'changed': changed,
+    }]
+
+
+@_guarded
+def find_task(path, pattern):
+    text = read_file(path)[0]
+    out = []
+    lines = None
+    for batch in search.iter_matches(text, pattern):
+        if lines is None:
+            lines = text.split('\n')
+        for line, col, end_line, end_col in batch:
+            out.append({'path': path, 'line': line, 'col': col, 'end_line': end_line,
+                        'end_col': end_col, 'text': lines[line - 1]})
+    return out
+
+
+@_guarded
+def replace_task(path, pattern, replacement, literal, dry_run):
+    text, encoding, newline, _ = read_file(path)
+    result = search.replace_all(text, pattern, replacement, literal)
+    if result is None:
+        return [{'path': path, 'replaced': 0}]
+    first, last, segment, count = result
+    if not dry_run:
+        lines = text.split('\n')
+        lines[first - 1:last] = [segment]
+        saver.write_atomic(path, ['\n'.join(lines)], encoding, newline)
+    return [{'path': path, 'replaced': count}]
+
+
+def iter_paths(paths):
+    """Yield files from the arguments, walking directories (skipping hidden ones)."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for name in sorted(files):
+                    if not name.startswith('.'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def run(task, paths, jobs=None, out=None):
+    """
+    Run a per-file task over paths and write its records as JSON lines.
+
+    Args:
+        task: Picklable function ``path -> list of dicts``
+        paths: File paths
+        jobs: Worker processes (default: CPU count); 1 runs in this process
+        out: Stream for the output (default: stdout)
+
+    Returns:
+        int: Number of files that failed
+    """
+    out = out or sys.stdout
+    paths = list(paths)
+    jobs = jobs or os.cpu_count() or 1
+    failed = 0
+    if jobs == 1 or len(paths) < 2:
+        results = map(task, paths)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        # Batch small files so each worker round-trip does real work
+        chunksize = max(1, min(64, len(paths) // (jobs * 4)))
+        results = executor.map(task, paths, chunksize=chunksize)
+    try:
+        for records in results:
+            for record in records:
+                failed += 'error' in record
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return failed
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='python -m pynote', description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add(name, help_text):
+        return commands.add_parser(name, help=help_text)
+
+    def add_paths(command):
+        command.add_argument('paths', nargs='+', help='files or directories')
+
+    def add_pattern(command):
+        command.add_argument('pattern')
+        command.add_argument('-e', '--regex', action='store_true', help='pattern is a regular expression')
+        command.add_argument('-i', '--ignore-case', action='store_true')
+        command.add_argument('-w', '--word', action='store_true', help='match whole words only')
+
+    add_paths(add('stats', 'word, character and line counts'))
+    add_paths(add('encoding', 'detected encoding and line ending'))
+    command = add('normalize', 'rewrite files with one encoding and line ending')
+    command.add_argument('--to', default='utf-8', help='target encoding (default: utf-8)')
+    command.add_argument('--newline', choices=sorted(_NEWLINES) + ['keep'], default='keep')
+    command.add_argument('-n', '--dry-run', action='store_true', help='report without writing')
+    add_paths(command)
+    command = add('find', 'list matches of a pattern')
+    add_pattern(command)
+    add_paths(command)
+    command = add('replace', 'replace matches of a pattern in place')
+    add_pattern(command)
+    command.add_argument('replacement')
+    command.add_argument('-n', '--dry-run', action='store_true', help='count without writing')
+    add_paths(command)
+    return parser
+
+
+def main(argv=None, out=None):
+    """
+    Entry point.
+
+    Args:
+        argv: Arguments (default: sys.argv[1:])
+        out: Stream for the JSON lines (default: stdout)
+
+    Returns:
+        int: Exit status; 1 if any file failed, 2 for a bad pattern
+    """
+    args = _parser().parse_args(argv)
+    if args.command == 'stats':
+        task = stats_task
+    elif args.command == 'encoding':
+        task = encoding_task
+    elif args.command == 'normalize':
+        newline = None if args.newline == 'keep' else _NEWLINES[args.newline]
+        task = functools.partial(normalize_task, encoding=args.to, newline=newline, dry_run=args.dry_run)
+    else:
+        try:
+            pattern = search.compile_pattern(args.pattern, args.regex, not args.ignore_case, args.word)
+        except re.error as e:
+            print(f'invalid pattern: {e}', file=sys.stderr)
+            return 2
+        if args.command == 'find':
+            task = functools.partial(find_task, pattern=pattern)
+        else:
+            task = functools.partial(replace_task, pattern=pattern, replacement=args.replacement,
+                                     literal=not args.regex, dry_run=args.dry_run)
+    failed = run(task, iter_paths(args.paths), args.jobs, out)
+    return 1 if failed else 0
@@ -3,36 +3,242 @@
 Editor widget wrapper for PyNote.
 """
 
+import bisect
+import os
 import tkinter as tk
 from tkinter import ttk
 
+from . import buffer, history, longlines
+
+
+def _line_of(index):
+    """Return the line number part of a Tk text index."""
+    return int(index.split('.')[0])
+
+
+class ChangeHook:
+    """
+    Route a Text widget's Tcl command through a proxy that reports edits.
+
+    Every insert, delete or replace - whether typed, pasted or issued from
+    Python - is reported to the listeners as ``(first, old_last, new_last)``:
+    lines ``first..old_last`` of the old buffer became lines
+    ``first..new_last`` of the new one.
+
+    The widget's ``edit undo``, ``redo``, ``separator``, ``reset``,
+    ``canundo`` and ``canredo`` subcommands - including those run by Tk's
+    own bindings - go to the handlers in ``edit_commands`` instead of Tk's
+    undo stack.
+    """
+
+    _EDITS = ('insert', 'delete', 'replace')
+    _EDIT_SUBCOMMANDS = ('undo', 'redo', 'separator', 'reset', 'canundo', 'canredo')
+
+    # The widget command becomes a Tcl proc: edits go to Python, everything
+    # else straight to the original command so that its errors reach Tcl
+    # callers - Tk's bindings rely on `catch {$w get sel.first sel.last}`
+    _PROXY = """
+        proc %(widget)s {args} {
+            set op [lindex $args 0]
+            if {$op in {%(edits)s}
+                    || ($op eq "edit" && [lindex $args 1] in {%(subcommands)s})} {
+                return [%(hook)s {*}$args]
+            }
+            return [%(orig)s {*}$args]
+        }
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.listeners = []
+        # Handlers for 'edit' subcommands, by name
+        self.edit_commands = {}
+        self._orig = text._w + '_orig'
+        self._hook = text._w + '_hook'
+        text.tk.call('rename', text._w, self._orig)
+        text.tk.createcommand(self._hook, self._dispatch)
+        text.tk.eval(self._PROXY % {
+            'widget': text._w, 'orig': self._orig, 'hook': self._hook,
+            'edits': ' '.join(self._EDITS), 'subcommands': ' '.join(self._EDIT_SUBCOMMANDS),
+        })
+
+    @property
+    def command(self):
+        """Name of the original Tcl widget command, bypassing the proxy."""
+        return self._orig
+
+    def add_listener(self, callback):
+        """Register callback(first, old_last, new_last) for edits."""
+        self.listeners.append(callback)
+
+    def close(self):
+        """Remove the proxy and restore the widget's own command."""
+        self.listeners = []
+        self.text.tk.call('rename', self.text._w, '')
+        self.text.tk.deletecommand(self._hook)
+        self.text.tk.call('rename', self._orig, self.text._w)
+
+    def _call(self, *args):
+        return self.text.tk.call((self._orig,) + args)
+
+    def _last_line(self):
+        return _line_of(self._call('index', 'end-1c'))
+
+    def _dispatch(self, operation, *args):
+        try:
+            if operation in self._EDITS:
+                return self._edit(operation, args)
+            if args[0] in self.edit_commands:
+                return self.edit_commands[args[0]]()
+            return self._call(operation, *args)
+        except tk.TclError:
+            # Tk's own bindings wrap edits in `catch`; an error raised in a
+            # Python command would resurface later in mainloop, so a failed
+            # edit is a no-op instead
+            return ''
+
+    def _edit(self, operation, args):
+        before = self._last_line()
+        if operation == 'insert':
+            first = last = _line_of(self._call('index', args[0]))
+        else:
+            if operation == 'replace':
+                bounds = args[:2]
+            elif len(args) == 1:
+                bounds = (args[0], f'{args[0]}+1c')
+            else:
+                bounds = args
+            lines = [_line_of(self._call('index', i)) for i in bounds]
+            first, last = min(lines), max(lines)
+        first = min(first, before)
+        last = min(last, before)
+        result = self._call(operation, *args)
+        self._notify(first, last, last + self._last_line() - before)
+        return result
+
+    def _notify(self, first, old_last, new_last):
+        for callback in self.listeners:
+            callback(first, old_last, new_last)
+
 
 class EditorWidget:
     """
     Wrapper around Tkinter Text widget with additional functionality.
     """
     
-    def __init__(self, parent, **kwargs):
+    def __init__(self, parent, scrollbar=True, **kwargs):
         """
         Initialize editor widget.
         
         Args:
             parent: Parent widget
+            scrollbar: Create a scrollbar of its own (False when the
+                caller shares one scrollbar between several editors)
             **kwargs: Additional arguments for Text widget
         """
         self.parent = parent
-        self.text = tk.Text(parent, wrap='word', undo=True, **kwargs)
-        self.scrollbar = ttk.Scrollbar(parent, orient='vertical', command=self.text.yview)
-        self.text.configure(yscrollcommand=self.scrollbar.set)
+        # Undo is kept in a history.History rather than by Tk
+        self.text = tk.Text(parent, wrap='word', undo=False, **kwargs)
+        # Reports the line range touched by every edit
+        self.changes = ChangeHook(self.text)
+        # Headless copy of the text, updated before any other listener runs
+        # so they can all read from it instead of from Tk
+        self.buffer = buffer.TextBuffer()
+        self.changes.add_listener(self._mirror)
+        # Display-only line breaks inserted into very long lines
+        self.softbreaks = longlines.SoftBreaks(self.text, self.buffer)
+        self.changes.add_listener(self.softbreaks.on_change)
+        # Edits are recorded in _mirror; the owner may swap in its own
+        # History to keep it across editors
+        self.history = history.History()
+        self._applying = False
+        self.changes.edit_commands.update(
+            undo=self.undo, redo=self.redo,
+            separator=lambda: self.history.separator(),
+            reset=lambda: self.history.reset(),
+            canundo=lambda: int(len(self.history) > 0),
+            canredo=lambda: int(self.history.can_redo),
+        )
+        # Set to a hugefile.HugeFileView when showing a file in viewer mode
+        self.view = None
+        self.scrollbar = None
+        if scrollbar:
+            self.scrollbar = ttk.Scrollbar(parent, orient='vertical', command=self.text.yview)
+            self.text.configure(yscrollcommand=self.scrollbar.set)
         
     def pack(self, **kwargs):
         """Pack the editor widgets."""
-        self.scrollbar.pack(side='right', fill='y')
+        if self.scrollbar is not None:
+            self.scrollbar.pack(side='right', fill='y')
         self.text.pack(side='left', fill='both', expand=True, **kwargs)
     
+    def pack_forget(self):
+        """Hide the editor widgets."""
+        if self.scrollbar is not None:
+            self.scrollbar.pack_forget()
+        self.text.pack_forget()
+    
+    def destroy(self):
+        """Destroy the widgets and release the buffer."""
+        self.changes.close()
+        if self.scrollbar is not None:
+            self.scrollbar.destroy()
+        self.text.destroy()
+    
+    def _mirror(self, first, old_last, new_last):
+        new = self.text.get(f'{first}.0', f'{new_last}.end')
+        if self.history.enabled and not self._applying:
+            # Soft breaks are re-created on undo; the listener that tracks
+            # them has not seen this edit yet
+            lines = self.softbreaks.lines
+            lo = bisect.bisect_left(lines, first)
+            hi = bisect.bisect_left(lines, old_last, lo)
+            soft = [line - first for line in lines[lo:hi]]
+            self.history.record(first, self.buffer.lines(first, old_last), new, soft)
+        self.buffer.replace_lines(first, old_last, new)
+
+    def undo(self):
+        """Revert the last edit group; returns False if there was none."""
+        entry = self.history.undo()
+        if entry is None:
+            return False
+        self._apply(entry.first, entry.new, entry.old, entry.soft)
+        return True
+
+    def redo(self):
+        """Repeat the last undone edit group; returns False if there was none."""
+        entry = self.history.redo()
+        if entry is None:
+            return False
+        self._apply(entry.first, entry.old, entry.new, ())
+        return True
+
+    def _apply(self, first, current, replacement, soft):
+        """Replace lines first.. holding current with replacement, unrecorded."""
+        last = first + current.count('\n')
+        if soft:
+            pieces = replacement.split('\n')
+            args = [pieces[0], ()]
+            for i, piece in enumerate(pieces[1:]):
+                args.extend(('\n', (longlines.TAG,) if i in soft else (), piece, ()))
+        else:
+            args = [replacement]
+        self._applying = True
+        try:
+            self.text.replace(f'{first}.0', f'{last}.end', *args)
+        finally:
+            self._applying = False
+        # Put the cursor where the two versions start to differ
+        common = len(os.path.commonprefix((current, replacement)))
+        line = first + replacement.count('\n', 0, common)
+        col = common - (replacement.rfind('\n', 0, common) + 1)
+        self.text.mark_set(tk.INSERT, f'{line}.{col}')
+        self.text.see(tk.INSERT)
+    
     def get_content(self):
         """Get all text content."""
-        return self.text.get('1.0', tk.END)
+        # Like Text.get('1.0', END), with the trailing newline
+        return ''.join(self.softbreaks.chunks()) + '\n'
     
     def set_content(self, content):
         """Set text content."""
@@ -44,12 +250,25 @@ class EditorWidget:
         idx = self.text.index(tk.INSERT).split('.')
         return int(idx[0]), int(idx[1])
     
-    def goto_line(self, line_number):
-        """Move cursor to specified line number."""
+    def goto_line(self, line_number, col=0):
+        """Move cursor to specified line number (and column)."""
+        if self.view is not None:
+            # Line numbers refer to the file, not the lines in the widget
+            self.view.goto_line(line_number)
+            return
         try:
-            line_num = max(1, min(line_number, int(self.text.index('end-1c').split('.')[0])))
-            self.text.mark_set(tk.INSERT, f'{line_num}.0')
+            line_num = max(1, min(line_number, self.line_count))
+            if self.softbreaks:
+                index = self.softbreaks.widget_index(line_num, col)
+            else:
+                index = f'{line_num}.{col}'
+            self.text.mark_set(tk.INSERT, index)
             self.text.see(tk.INSERT)
         except Exception:
             pass
 
+    @property
+    def line_count(self):
+        """Number of lines in the file, not counting soft breaks."""
+        return self.buffer.line_count - len(self.softbreaks.lines)
+
@@ -0,0 +1,386 @@
+"""
+Find in Files for PyNote.
+
+``FileSearch`` walks a folder in a background thread, skipping what its
+``.gitignore`` files exclude, and hands files to a process pool in small
+batches. Workers decode each file like the editor does (large files
+through ``mmap``, binary files skipped) and return the matching lines.
+Results are queued as they arrive; the Tk side collects them with
+``results`` from an ``after`` poll, so the UI never waits on the disk.
+
+Per-file results are kept in a ``ResultCache`` keyed by pattern and file
+mtime, so repeating a search only rescans the files that changed.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
+import os
+import queue
+import re
+import threading
+
+from . import search
+from .cli import BinaryFile, read_file
+
+
+# Files per worker task
+CHUNK_FILES = 32
+# Matches reported per file and characters kept of each matching line
+MAX_MATCHES_PER_FILE = 1000
+MAX_LINE_CHARS = 240
+# Patterns whose results are cached
+CACHED_PATTERNS = 8
+
+# Never searched, whatever the ignore files say
+ALWAYS_IGNORED = frozenset(('.git', '.hg', '.svn', '__pycache__'))
+
+
+def _glob_to_regex(glob):
+    """Translate a gitignore glob (without slashes at the ends) to a regex."""
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if glob.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+            continue
+        if glob.startswith('/**', i) and i + 3 == n:
+            out.append('/.*')
+            i += 3
+            continue
+        if glob.startswith('**', i):
+            out.append('.*')
+            i += 2
+            continue
+        if c == '*':
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = glob.find(']', i + 2)
+            if end < 0:
+                out.append(r'\[')
+            else:
+                body = glob[i + 1:end]
+                if body[0] == '!':
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return re.compile(''.join(out) + r'\Z')
+
+
+class IgnoreRules:
+    """
+    The rules of the ``.gitignore`` files found while walking a tree.
+
+    Supports the common gitignore syntax: ``#`` comments, ``!`` negation,
+    a trailing ``/`` for directories only, a leading or inner ``/`` to
+    anchor a pattern to its file's directory, and ``*``, ``?``, ``[...]``
+    and ``**`` wildcards. As in git, the last matching rule wins.
+    """
+
+    def __init__(self):
+        # (base, regex, negate, dir_only, anchored)
+        self.rules = []
+
+    def add_file(self, path, base=''):
+        """
+        Read an ignore file.
+
+        Args:
+            path: The ``.gitignore`` file
+            base: Its directory relative to the search root, '/'-separated
+        """
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            self.add(line, base)
+
+    def add(self, line, base=''):
+        """Add one ignore file line."""
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            return
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.strip('/') if dir_only else line
+        anchored = '/' in line
+        line = line.lstrip('/')
+        if line:
+            self.rules.append((base, _glob_to_regex(line), negate, dir_only, anchored))
+
+    def ignored(self, rel, is_dir):
+        """
+        Whether a path is excluded.
+
+        Args:
+            rel: Path relative to the search root, '/'-separated
+            is_dir: True for a directory
+        """
+        result = False
+        name = rel.rpartition('/')[2]
+        for base, regex, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel.startswith(base + '/'):
+                    continue
+                sub = rel[len(base) + 1:]
+            else:
+                sub = rel
+            if regex.match(sub if anchored else name):
+                result = not negate
+        return result
+
+
+def walk(root, rules=None):
+    """
+    Yield the files under root that the ignore files do not exclude.
+
+    Ignored directories are not entered, so their files cannot be
+    re-included, as in git.
+
+    Args:
+        root: Folder to walk
+        rules: IgnoreRules to start from (default: none)
+    """
+    rules = rules or IgnoreRules()
+    for dirpath, dirs, files in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        rel_dir = '' if rel_dir == '.' else rel_dir
+        if '.gitignore' in files:
+            rules.add_file(os.path.join(dirpath, '.gitignore'), rel_dir)
+        prefix = rel_dir + '/' if rel_dir else ''
+        dirs[:] = sorted(d for d in dirs
+                         if d not in ALWAYS_IGNORED and not rules.ignored(prefix + d, True))
+        for name in sorted(files):
+            if not rules.ignored(prefix + name, False):
+                yield os.path.join(dirpath, name)
+
+
+def search_file(path, pattern):
+    """
+    Find the lines of a file that match a pattern.
+
+    Returns:
+        dict: ``path``, ``mtime``, ``size`` and one of ``matches`` (a list
+        of ``(line, col, end_col, line_text)``), ``skipped`` or ``error``
+    """
+    result = {'path': path, 'mtime': None, 'size': None}
+    try:
+        st = os.stat(path)
+        result['mtime'], result['size'] = st.st_mtime_ns, st.st_size
+        text = read_file(path)[0]
+    except BinaryFile:
+        result['skipped'] = 'binary'
+        return result
+    except (OSError, UnicodeError, ValueError) as e:
+        result['error'] = str(e)
+        return result
+    matches = []
+    lines = None
+    for batch in search.iter_matches(text, pattern):
+        if lines is None:
+            lines = text.split('\n')
+        for line, col, end_line, end_col in batch:
+            line_text = lines[line - 1]
+            if end_line != line:
+                end_col = len(line_text)
+            matches.append((line, col, end_col, line_text[:MAX_LINE_CHARS]))
+            if len(matches) >= MAX_MATCHES_PER_FILE:
+                break
+        if len(matches) >= MAX_MATCHES_PER_FILE:
+            break
+    result['matches'] = matches
+    return result
+
+
+def search_files(paths, pattern):
+    """Worker task: ``search_file`` over a batch of paths."""
+    return [search_file(path, pattern) for path in paths]
+
+
+class ResultCache:
+    """
+    Per-file results of recent searches, valid while a file's mtime and
+    size are unchanged.
+    """
+
+    def __init__(self, patterns=CACHED_PATTERNS):
+        self.patterns = patterns
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(pattern):
+        return pattern.pattern, pattern.flags
+
+    def get(self, pattern, path, st):
+        """Cached result for a file, or None if it changed or was not searched."""
+        with self._lock:
+            files = self._entries.get(self.key(pattern))
+            result = files.get(path) if files is not None else None
+        if result is None or (result['mtime'], result['size']) != (st.st_mtime_ns, st.st_size):
+            return None
+        return result
+
+    def put(self, pattern, result):
+        """Remember a file's result (results with errors are not kept)."""
+        if 'error' in result or result['mtime'] is None:
+            return
+        key = self.key(pattern)
+        with self._lock:
+            files = self._entries.get(key)
+            if files is None:
+                files = self._entries[key] = {}
+                while len(self._entries) > self.patterns:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            files[result['path']] = result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_executor = None
+
+
+def get_executor():
+    """
+    The process pool shared by all searches, started on first use.
+
+    Workers are spawned rather than forked: the editor process runs Tk and
+    other threads, which a forked child must not inherit.
+    """
+    global _executor
+    if _executor is None:
+        workers = max(1, (os.cpu_count() or 2) - 1)
+        _executor = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def shutdown():
+    """Stop the worker processes, if they were started."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class FileSearch:
+    """
+    Search a folder in the background.
+
+    A thread walks the tree; cached results are queued right away and the
+    other files are sent to the process pool ``CHUNK_FILES`` at a time.
+    Per-file results (see ``search_file``) are collected with ``results``.
+
+    Args:
+        root: Folder to search
+        pattern: Compiled pattern (``search.compile_pattern``)
+        cache: ResultCache to read and fill, or None
+        executor: Executor for the worker tasks (default: ``get_executor()``)
+
+    Attributes:
+        done: True once every file has been searched (or it was cancelled)
+        error: Exception raised while walking, if any
+        files: Files found so far
+        cached: Files answered from the cache
+    """
+
+    def __init__(self, root, pattern, cache=None, executor=None):
+        self.root = root
+        self.pattern = pattern
+        self.cache = cache
+        self.executor = executor
+        self.done = False
+        self.error = None
+        self.files = 0
+        self.cached = 0
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._pending = set()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        """Stop walking and drop the batches that have not started."""
+        self._stop.set()
+        for future in list(self._pending):
+            future.cancel()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+
+    def results(self):
+        """Return the per-file results found since the last call."""
+        out = []
+        while True:
+            try:
+                out.extend(self._queue.get_nowait())
+            except queue.Empty:
+                return out
+
+    def _run(self):
+        try:
+            executor = self.executor or get_executor()
+            batch = []
+            for path in walk(self.root):
+                if self._stop.is_set():
+                    break
+                self.files += 1
+                result = None
+                if self.cache is not None:
+                    try:
+                        result = self.cache.get(self.pattern, path, os.stat(path))
+                    except OSError:
+                        pass
+                if result is not None:
+                    self.cached += 1
+                    self._queue.put([result])
+                    continue
+                batch.append(path)
+                if len(batch) >= CHUNK_FILES:
+                    self._pending.add(executor.submit(search_files, batch, self.pattern))
+                    batch = []
+                    self._collect(timeout=0)
+            if batch and not self._stop.is_set():
+                self._pending.add(executor.submit(search_files, batch, self.pattern))
+            while self._pending and not self._stop.is_set():
+                self._collect(timeout=None)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
+    def _collect(self, timeout):
+        """Queue the results of finished batches, waiting up to timeout for one."""
+        finished, self._pending = wait(self._pending, timeout, return_when=FIRST_COMPLETED)
+        for future in finished:
+            if future.cancelled():
+                continue
+            results = future.result()
+            if self.cache is not None:
+                for result in results:
+                    self.cache.put(self.pattern, result)
+            self._queue.put(results)
@@ -0,0 +1,377 @@
+"""
+Incremental syntax highlighting for PyNote.
+
+Lexers work one line at a time and return the state at the end of the line
+(e.g. "inside a triple-quoted string"). The engine stores that state for
+every line, so after an edit it re-lexes from the first dirty line only
+until the end-of-line state matches what was stored before - from there on
+nothing can have changed. The visible lines are tagged first and the rest
+is filled in during short idle time slices.
+"""
+
+import builtins
+import heapq
+import keyword
+import os
+import re
+import time
+
+
+# Token kinds; each is shown with the tag 'hl_<kind>' coloured from the
+# theme's 'syntax_<kind>' entry
+KINDS = (
+    'keyword', 'builtin', 'string', 'comment', 'number', 'definition',
+    'decorator', 'heading', 'code', 'emphasis', 'link',
+)
+
+_PY_KEYWORDS = frozenset(keyword.kwlist + getattr(keyword, 'softkwlist', []))
+_PY_BUILTINS = frozenset(name for name in dir(builtins) if not name.startswith('_'))
+_PY_TOKEN = re.compile(r'''
+    (?P<comment>\#.*)
+  | (?P<triple>[rRbBuUfF]{0,2}(?:"""|\'\'\'))
+  | (?P<string>[rRbBuUfF]{0,2}(?:"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?))
+  | (?P<number>\b(?:0[xXoObB][0-9a-fA-F_]+|\d[\d_]*(?:\.[\d_]*)?(?:[eE][+-]?\d+)?[jJ]?))
+  | (?P<decorator>@[\w.]+)
+  | (?P<name>[A-Za-z_]\w*)
+''', re.VERBOSE)
+
+
+def _triple_end(line, start, delim):
+    """Return the index just past the closing delimiter, or -1."""
+    while True:
+        i = line.find(delim, start)
+        if i < 0:
+            return -1
+        backslashes = 0
+        while i - backslashes > 0 and line[i - backslashes - 1] == '\\':
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return i + 3
+        start = i + 1
+
+
+def lex_python(line, state):
+    """
+    Lex one line of Python.
+
+    Args:
+        line: Line text without the newline
+        state: None, or the open triple-quote delimiter from the line above
+
+    Returns:
+        tuple: (tokens as (kind, start, end) tuples, state at end of line)
+    """
+    tokens = []
+    pos = 0
+    if state:
+        end = _triple_end(line, 0, state)
+        if end < 0:
+            return [('string', 0, len(line))], state
+        tokens.append(('string', 0, end))
+        pos = end
+    previous = None
+    while True:
+        m = _PY_TOKEN.search(line, pos)
+        if m is None:
+            return tokens, None
+        kind = m.lastgroup
+        start = m.start()
+        if kind == 'triple':
+            delim = m.group()[-3:]
+            end = _triple_end(line, m.end(), delim)
+            if end < 0:
+                tokens.append(('string', start, len(line)))
+                return tokens, delim
+            tokens.append(('string', start, end))
+            pos = end
+            continue
+        if kind == 'name':
+            word = m.group()
+            if previous in ('def', 'class'):
+                tokens.append(('definition', start, m.end()))
+            elif word in _PY_KEYWORDS:
+                tokens.append(('keyword', start, m.end()))
+            elif word in _PY_BUILTINS:
+                tokens.append(('builtin', start, m.end()))
+            previous = word
+        elif kind == 'decorator' and line[:start].strip():
+            # '@' in the middle of a line is the matrix operator
+            pass
+        else:
+            tokens.append((kind, start, m.end()))
+        pos = m.end()
+
+
+_MD_FENCE = re.compile(r'\s*(```|~~~)')
+_MD_HEADING = re.compile(r'#{1,6}(\s|$)')
+_MD_INLINE = re.compile(r'''
+    (?P<code>`[^`]+`)
+  | (?P<emphasis>\*\*[^*]+\*\*|__[^_]+__|\*[^*\s][^*]*\*|_[^_\s][^_]*_)
+  | (?P<link>!?\[[^\]]*\]\([^)]*\))
+''', re.VERBOSE)
+
+
+def lex_markdown(line, state):
+    """
+    Lex one line of Markdown.
+
+    Args:
+        line: Line text without the newline
+        state: None, or the fence string while inside a fenced code block
+
+    Returns:
+        tuple: (tokens as (kind, start, end) tuples, state at end of line)
+    """
+    fence = _MD_FENCE.match(line)
+    if state:
+        closes = fence is not None and fence.group(1) == state
+        return [('code', 0, len(line))], (None if closes else state)
+    if fence:
+        return [('code', 0, len(line))], fence.group(1)
+    if _MD_HEADING.match(line):
+        return [('heading', 0, len(line))], None
+    if line.startswith('>'):
+        return [('comment', 0, len(line))], None
+    tokens = [(m.lastgroup, m.start(), m.end()) for m in _MD_INLINE.finditer(line)]
+    return tokens, None
+
+
+_LEXERS = {
+    '.py': lex_python,
+    '.pyw': lex_python,
+    '.md': lex_markdown,
+    '.markdown': lex_markdown,
+}
+
+
+def lexer_for_path(path):
+    """Return the lexer for a file name, or None if it is not highlighted."""
+    if not path:
+        return None
+    return _LEXERS.get(os.path.splitext(path)[1].lower())
+
+
+# Marks a line whose end state is unknown (edited or never lexed)
+_DIRTY = object()
+
+
+class SyntaxModel:
+    """
+    End-of-line lexer states plus the queue of lines that need re-lexing.
+
+    Independent of Tk, so it can be driven and benchmarked headlessly.
+
+    Args:
+        lexer: Function ``(line, state) -> (tokens, state)``
+        line_count: Number of lines in the buffer
+    """
+
+    def __init__(self, lexer, line_count=1):
+        self.lexer = lexer
+        self._states = [_DIRTY] * line_count
+        self._pending = [1]
+        self.lexed_lines = 0
+
+    @property
+    def line_count(self):
+        return len(self._states)
+
+    @property
+    def first_pending(self):
+        """First line waiting to be re-lexed, or None."""
+        return self._pending[0] if self._pending else None
+
+    def replace_lines(self, first, old_last, new_last):
+        """Lines first..old_last were replaced by first..new_last."""
+        # The last new line keeps the old end state of the block, so lexing
+        # can stop right there if the edit did not change it
+        old_end = self._states[old_last - 1] if old_last <= len(self._states) else _DIRTY
+        self._states[first - 1:old_last] = [_DIRTY] * (new_last - first) + [old_end]
+        if not self._states:
+            self._states = [_DIRTY]
+        delta = new_last - old_last
+        if delta:
+            # Pending lines below the edit moved with their text
+            self._pending = [
+                p + delta if p > old_last else min(p, first) if p >= first else p
+                for p in self._pending
+            ]
+            heapq.heapify(self._pending)
+        heapq.heappush(self._pending, first)
+
+    def start_state(self, line):
+        """Best known state at the start of a line."""
+        if line <= 1:
+            return None
+        state = self._states[line - 2]
+        return None if state is _DIRTY else state
+
+    def step(self, get_lines, limit):
+        """
+        Re-lex up to ``limit`` lines from the pending queue.
+
+        Args:
+            get_lines: Function ``(first, count) -> list of line strings``
+            limit: Maximum number of lines to lex
+
+        Returns:
+            list: ``(line_number, tokens)`` for every line lexed
+        """
+        out = []
+        block, block_first = [], 0
+        while self._pending and len(out) < limit:
+            line = self._pending[0]
+            if line > len(self._states):
+                heapq.heappop(self._pending)
+                continue
+            if not block_first <= line < block_first + len(block):
+                block_first = line
+                block = get_lines(line, min(limit - len(out), len(self._states) - line + 1))
+            tokens, end = self.lexer(block[line - block_first], self.start_state(line))
+            old = self._states[line - 1]
+            self._states[line - 1] = end
+            out.append((line, tokens))
+            self.lexed_lines += 1
+            while self._pending and self._pending[0] == line:
+                heapq.heappop(self._pending)
+            nxt = line + 1
+            if nxt > len(self._states):
+                continue
+            next_dirty = self._states[nxt - 1] is _DIRTY
+            if old is not _DIRTY and old == end and not next_dirty:
+                continue    # converged: the rest of the buffer is unaffected
+            heapq.heappush(self._pending, nxt)
+        return out
+
+
+class Highlighter:
+    """
+    Apply a SyntaxModel's tokens to a Text widget as tags.
+
+    Args:
+        text: Tkinter Text widget
+        theme: Theme dictionary with 'syntax_*' colours
+        buffer: buffer.TextBuffer mirroring the widget; lines are read
+            from it instead of from Tk
+    """
+
+    SLICE_MS = 8
+    LINES_PER_STEP = 200
+
+    def __init__(self, text, theme=None, buffer=None):
+        self.text = text
+        self.buffer = buffer
+        self.model = None
+        self._after_id = None
+        self._visible_done = True
+        if theme:
+            self.set_theme(theme)
+
+    def set_theme(self, theme):
+        """Configure the highlight tags from a theme."""
+        for kind in KINDS:
+            self.text.tag_configure(f'hl_{kind}', foreground=theme.get(f'syntax_{kind}', theme['fg']))
+        # Keep the selection visible above highlight colours
+        self.text.tag_raise('sel')
+
+    @property
+    def lexer(self):
+        """The current lexer, or None."""
+        return self.model.lexer if self.model is not None else None
+
+    def set_lexer(self, lexer):
+        """Switch language; None turns highlighting off."""
+        self._cancel()
+        self._clear(1, int(self.text.index('end-1c').split('.')[0]))
+        self.model = None
+        if lexer is not None:
+            lines = int(self.text.index('end-1c').split('.')[0])
+            self.model = SyntaxModel(lexer, lines)
+            self._schedule()
+
+    def close(self):
+        """Stop highlighting; call before the Text widget is destroyed."""
+        self._cancel()
+        self.model = None
+
+    def on_change(self, first, old_last, new_last):
+        """ChangeHook listener."""
+        if self.model is None:
+            return
+        self.model.replace_lines(first, old_last, new_last)
+        self._visible_done = False
+        self._schedule()
+
+    def on_scroll(self):
+        """Tag newly visible lines right away if the background pass lags."""
+        if self.model is not None and self.model.first_pending is not None:
+            self._visible_done = False
+            self._schedule()
+
+    def _schedule(self):
+        if self._after_id is None:
+            self._after_id = self.text.after_idle(self._run)
+
+    def _cancel(self):
+        if self._after_id is not None:
+            self.text.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _visible_range(self):
+        first = int(self.text.index('@0,0').split('.')[0])
+        last = int(self.text.index(f'@0,{self.text.winfo_height()}').split('.')[0])
+        return first, last
+
+    def _get_lines(self, first, count):
+        if self.buffer is not None:
+            return self.buffer.lines(first, first + count - 1).split('\n')
+        return self.text.get(f'{first}.0', f'{first + count - 1}.end').split('\n')
+
+    def _run(self):
+        self._after_id = None
+        if self.model is None:
+            return
+        deadline = time.perf_counter() + self.SLICE_MS / 1000
+        if not self._visible_done:
+            self._visible_done = True
+            first, last = self._visible_range()
+            pending = self.model.first_pending
+            if pending is not None and pending < first:
+                # The exact pass has not reached the viewport yet; tag it
+                # now from the best known state and let the pass fix it up
+                lines = self._get_lines(first, last - first + 1)
+                state = self.model.start_state(first)
+                results = []
+                for offset, line in enumerate(lines):
+                    tokens, state = self.model.lexer(line, state)
+                    results.append((first + offset, tokens))
+                self._apply(results)
+        while self.model.first_pending is not None and time.perf_counter() < deadline:
+            self._apply(self.model.step(self._get_lines, self.LINES_PER_STEP))
+        if self.model.first_pending is not None:
+            # Let pending UI events run between slices
+            self._after_id = self.text.after(1, self._run)
+
+    def _clear(self, first, last):
+        for kind in KINDS:
+            self.text.tag_remove(f'hl_{kind}', f'{first}.0', f'{last}.end')
+
+    def _apply(self, results):
+        """Retag lexed lines with one tag_remove/tag_add call per tag per run."""
+        if not results:
+            return
+        # A line lexed twice keeps its latest tokens
+        results = sorted(dict(results).items())
+        ranges = {kind: [] for kind in KINDS}
+        run_first = run_last = results[0][0]
+        for line, tokens in results:
+            if line > run_last + 1:
+                self._clear(run_first, run_last)
+                run_first = line
+            run_last = line
+            for kind, start, end in tokens:
+                ranges[kind].extend((f'{line}.{start}', f'{line}.{end}'))
+        self._clear(run_first, run_last)
+        for kind, indices in ranges.items():
+            if indices:
+                self.text.tag_add(f'hl_{kind}', *indices)
@@ -0,0 +1,327 @@
+"""
+Bounded, persistent undo history for PyNote.
+
+Tk's own undo stack grows without limit and is lost on exit, so the editor
+keeps its history here instead. Every edit is recorded as the line range it
+replaced: the old and the new text of lines ``first..``. Typing on the same
+lines within ``COALESCE_SECONDS`` of the previous edit extends that entry,
+so one undo step covers a burst of typing, as in Tk.
+
+Memory is bounded by ``max_bytes``: once the history passes half of it the
+oldest entries are zlib-compressed, and once it passes all of it the oldest
+are dropped. When a document is closed unmodified its history is written
+to the config directory, keyed by the file's path. It is only read back on
+the first undo after reopening, and only if the file is unchanged since.
+"""
+
+from collections import deque
+import hashlib
+import json
+import os
+import time
+import zlib
+
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+# Edits closer together than this extend the previous entry...
+COALESCE_SECONDS = 1.0
+# ...as long as it started less than this long ago and is still small
+GROUP_SECONDS = 5.0
+COALESCE_MAX = 64 * 1024
+STORE_VERSION = 1
+# Persisted histories kept in the store directory (newest first); older
+# or surplus ones are removed at startup
+STORE_MAX_FILES = 200
+STORE_MAX_BYTES = 256 * 1024 * 1024
+STORE_MAX_AGE = 30 * 24 * 3600
+
+
+def store_path(directory, path):
+    """File holding the persisted history of a document."""
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8', 'surrogatepass')).hexdigest()[:20]
+    return os.path.join(str(directory), f'{key}.undo')
+
+
+def clean_store(directory, max_files=STORE_MAX_FILES, max_bytes=STORE_MAX_BYTES,
+                max_age=STORE_MAX_AGE, now=None):
+    """
+    Remove persisted histories that are too old or past the store's caps.
+
+    The newest files are kept until ``max_files`` or ``max_bytes`` is
+    reached; files not written for ``max_age`` seconds always go.
+
+    Returns:
+        int: Number of files removed
+    """
+    now = time.time() if now is None else now
+    stored = []
+    try:
+        with os.scandir(str(directory)) as it:
+            for entry in it:
+                if entry.name.endswith(('.undo', '.undo.tmp')):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    stored.append((st.st_mtime, st.st_size, entry.path))
+    except OSError:
+        return 0
+    stored.sort(reverse=True)
+    removed = kept = total = 0
+    for mtime, size, path in stored:
+        if (path.endswith('.undo') and kept < max_files and total + size <= max_bytes
+                and now - mtime <= max_age):
+            kept += 1
+            total += size
+            continue
+        try:
+            os.unlink(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class Entry:
+    """
+    One undo step: lines ``first..`` held ``old`` and now hold ``new``.
+
+    ``soft`` lists the lines (relative to ``first``) of ``old`` that ended
+    in a soft break. While compressed, the texts live in ``blob``.
+    """
+
+    __slots__ = ('first', 'old', 'new', 'soft', 'started', 'last', 'sealed', 'blob')
+
+    def __init__(self, first, old, new, soft=(), now=0.0):
+        self.first = first
+        self.old = old
+        self.new = new
+        self.soft = list(soft)
+        self.started = self.last = now
+        self.sealed = False
+        self.blob = None
+
+    @property
+    def size(self):
+        if self.blob is not None:
+            return len(self.blob)
+        return len(self.old) + len(self.new)
+
+    def compress(self):
+        self.blob = zlib.compress(json.dumps([self.old, self.new, self.soft]).encode('utf-8', 'surrogatepass'))
+        self.old = self.new = None
+        self.soft = None
+
+    def expand(self):
+        if self.blob is not None:
+            self.old, self.new, self.soft = json.loads(zlib.decompress(self.blob).decode('utf-8', 'surrogatepass'))
+            self.blob = None
+
+
+class History:
+    """
+    Undo and redo stacks of line-range edits with a memory cap.
+
+    The editor records edits with ``record`` and applies what ``undo`` and
+    ``redo`` return; the history itself never touches a widget.
+
+    Args:
+        max_bytes: Memory cap for the recorded text (compressed or not)
+        store: File to persist the history to (see ``store_path``), or None
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, store=None):
+        self.max_bytes = max_bytes
+        self.store = store
+        # (mtime_ns, size) of the file when it was loaded; the persisted
+        # history is only valid for that version
+        self.base_stat = None
+        self.enabled = True
+        self.bytes = 0
+        self.dropped = 0
+        self._undo = deque()
+        self._redo = []
+        # The oldest ``_compressed`` undo entries are compressed
+        self._compressed = 0
+        self._stored_loaded = False
+
+    def __len__(self):
+        return len(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def record(self, first, old, new, soft=(), now=None):
+        """
+        Record that lines ``first..`` changed from ``old`` to ``new``.
+
+        Args:
+            first: First line of the edit (1-based)
+            old: Text of the replaced lines, joined with newlines
+            new: Text of the lines that replaced them
+            soft: Lines of ``old`` (relative to first) ending in a soft break
+            now: Time of the edit (default: ``time.monotonic()``)
+        """
+        if not self.enabled or old == new:
+            return
+        now = time.monotonic() if now is None else now
+        for entry in self._redo:
+            self.bytes -= entry.size
+        self._redo.clear()
+        top = self._undo[-1] if self._undo else None
+        if top is not None and not soft and self._extend(top, first, old, new, now):
+            return
+        if top is not None:
+            top.sealed = True
+        entry = Entry(first, old, new, soft, now)
+        self._undo.append(entry)
+        self.bytes += entry.size
+        self._enforce()
+
+    def _extend(self, top, first, old, new, now):
+        """Fold an edit into the previous entry if it continues it."""
+        if (top.sealed or top.blob is not None or now - top.last > COALESCE_SECONDS
+                or now - top.started > GROUP_SECONDS or top.size > COALESCE_MAX):
+            return False
+        old_last = first + old.count('\n')
+        top_last = top.first + top.new.count('\n')
+        if first < top.first or old_last > top_last:
+            return False
+        lines = top.new.split('\n')
+        lines[first - top.first:old_last - top.first + 1] = new.split('\n')
+        before = top.size
+        top.new = '\n'.join(lines)
+        top.last = now
+        self.bytes += top.size - before
+        return True
+
+    def separator(self):
+        """End the current entry; the next edit starts a new one."""
+        if self._undo:
+            self._undo[-1].sealed = True
+
+    def reset(self):
+        """Forget everything, including a persisted history not yet read."""
+        self._undo.clear()
+        self._redo.clear()
+        self.bytes = 0
+        self._compressed = 0
+        self._stored_loaded = True
+
+    def undo(self):
+        """
+        Take the newest entry off the undo stack.
+
+        Returns:
+            Entry: Lines ``first..`` now hold ``new`` and should get ``old``
+            back; None if there is nothing to undo
+        """
+        if not self._undo:
+            self._load_stored()
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        self._compressed = min(self._compressed, len(self._undo))
+        self.bytes -= entry.size
+        entry.expand()
+        entry.sealed = True
+        self._redo.append(entry)
+        self.bytes += entry.size
+        return entry
+
+    def redo(self):
+        """
+        Take the newest undone entry back.
+
+        Returns:
+            Entry: Lines ``first..`` hold ``old`` again and should get
+            ``new``; None if there is nothing to redo
+        """
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        self._undo.append(entry)
+        self._enforce()
+        return entry
+
+    def _enforce(self):
+        """Compress, then drop, the oldest entries to stay within the cap."""
+        if self.bytes <= self.max_bytes // 2:
+            return
+        # The newest entry stays uncompressed: it may still be extended
+        while self.bytes > self.max_bytes // 2 and self._compressed < len(self._undo) - 1:
+            entry = self._undo[self._compressed]
+            self.bytes -= entry.size
+            entry.compress()
+            self.bytes += entry.size
+            self._compressed += 1
+        while self.bytes > self.max_bytes and len(self._undo) > 1:
+            self.bytes -= self._undo.popleft().size
+            self._compressed = max(0, self._compressed - 1)
+            self.dropped += 1
+
+    def _load_stored(self):
+        """Put the persisted history under the current one, once."""
+        if self._stored_loaded:
+            return
+        self._stored_loaded = True
+        if self.store is None or self.base_stat is None:
+            return
+        try:
+            with open(self.store, 'rb') as f:
+                data = json.loads(zlib.decompress(f.read()).decode('utf-8', 'surrogatepass'))
+        except (OSError, ValueError, zlib.error):
+            return
+        if data.get('version') != STORE_VERSION or tuple(data.get('stat', ())) != tuple(self.base_stat):
+            # The file changed since; the history no longer applies
+            try:
+                os.unlink(self.store)
+            except OSError:
+                pass
+            return
+        entries = []
+        for first, old, new, soft in data['entries']:
+            entry = Entry(first, old, new, soft)
+            entry.sealed = True
+            entry.compress()
+            entries.append(entry)
+        self._undo.extendleft(reversed(entries))
+        self._compressed += len(entries)
+        self.bytes += sum(entry.size for entry in entries)
+        self._enforce()
+
+    def persist(self, stat):
+        """
+        Write the undo stack for the file's current version.
+
+        Call only when the buffer matches the file on disk.
+
+        Args:
+            stat: (mtime_ns, size) of the file as it is now
+
+        Returns:
+            bool: True if the history was written
+        """
+        if self.store is None:
+            return False
+        self._load_stored()
+        if not self._undo:
+            return False
+        entries = []
+        for entry in self._undo:
+            if entry.blob is not None:
+                old, new, soft = json.loads(zlib.decompress(entry.blob).decode('utf-8', 'surrogatepass'))
+            else:
+                old, new, soft = entry.old, entry.new, entry.soft
+            entries.append([entry.first, old, new, soft])
+        data = {'version': STORE_VERSION, 'stat': list(stat), 'entries': entries}
+        tmp = self.store + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.store), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(zlib.compress(json.dumps(data).encode('utf-8', 'surrogatepass')))
+            os.replace(tmp, self.store)
+        except OSError:
+            return False
+        return True
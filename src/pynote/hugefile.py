@@ -0,0 +1,282 @@
+"""
+Read-only viewer mode for files too large to load into a Text widget.
+
+The file is memory-mapped and a sparse newline index is built in a
+background thread. Only the lines currently on screen are ever decoded and
+inserted into the Text widget, so memory stays flat regardless of file size.
+"""
+
+import codecs
+import hashlib
+import json
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+
+
+def supported(encoding):
+    """
+    Return True if the viewer can show a file in this encoding.
+
+    Lines are found by searching for the byte ``b'\\n'``, which is not a
+    newline of its own in UTF-16 and UTF-32 files.
+    """
+    return not codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32'))
+
+
+class LineIndex:
+    """
+    Sparse newline index over a memory-mapped file.
+
+    Instead of one offset per line, the index stores the number of newlines
+    before every ``BLOCK``-byte boundary. Line starts are found by jumping to
+    the right block and scanning the few newlines inside it with
+    ``mmap.find``.
+
+    Args:
+        mm: Memory-mapped file contents
+        cache_path: Optional file used to persist the index between runs
+        stamp: ``(size, mtime_ns)`` of the file, used to validate the cache
+    """
+
+    BLOCK = 1 << 14          # bytes per index entry
+    READ_SIZE = 1 << 22      # bytes scanned per read while building
+
+    def __init__(self, mm, cache_path=None, stamp=None):
+        self.mm = mm
+        self.size = len(mm)
+        self.cache_path = cache_path
+        self.stamp = list(stamp) if stamp else None
+        self.complete = threading.Event()
+        self._starts = array('Q')
+        self._newlines = 0
+        self._stop = threading.Event()
+
+    @property
+    def indexed_bytes(self):
+        """Number of bytes covered by the index so far."""
+        if self.complete.is_set():
+            return self.size
+        return min(self.size, len(self._starts) * self.BLOCK)
+
+    @property
+    def progress(self):
+        """Fraction of the file indexed so far."""
+        return self.indexed_bytes / self.size if self.size else 1.0
+
+    @property
+    def line_count(self):
+        """Number of lines (a lower bound while the index is still building)."""
+        return self._newlines + 1
+
+    def build(self):
+        """Build the index, or load it from the cache. Meant for a worker thread."""
+        if self._load_cache():
+            self.complete.set()
+            return
+        # Reads must stay aligned to block boundaries
+        step = max(1, self.READ_SIZE // self.BLOCK) * self.BLOCK
+        pos = 0
+        count = 0
+        while pos < self.size:
+            if self._stop.is_set():
+                return
+            data = self.mm[pos:pos + step]
+            for start in range(0, len(data), self.BLOCK):
+                self._starts.append(count)
+                count += data.count(b'\n', start, start + self.BLOCK)
+            pos += len(data)
+            self._newlines = count
+        self.complete.set()
+        self._save_cache()
+
+    def stop(self):
+        """Ask a running build to stop."""
+        self._stop.set()
+
+    def line_start(self, line):
+        """
+        Byte offset where a line starts.
+
+        Args:
+            line: Line number (1-based), clamped to the indexed range
+
+        Returns:
+            int: Byte offset
+        """
+        skip = max(0, min(line, self.line_count) - 1)
+        if skip == 0:
+            return 0
+        block = bisect_left(self._starts, skip) - 1
+        pos = block * self.BLOCK - 1
+        for _ in range(skip - self._starts[block]):
+            pos = self.mm.find(b'\n', pos + 1)
+        return pos + 1
+
+    def line_of(self, offset):
+        """Line number (1-based) containing a byte offset."""
+        offset = max(0, min(offset, self.indexed_bytes))
+        block = min(offset // self.BLOCK, len(self._starts) - 1)
+        if block < 0:
+            return 1
+        start = block * self.BLOCK
+        return self._starts[block] + self.mm[start:offset].count(b'\n') + 1
+
+    def read_lines(self, first, count):
+        """
+        Read a range of lines as bytes.
+
+        Returns:
+            tuple: ``(data, end_offset)``
+        """
+        start = self.line_start(first)
+        end = start
+        for _ in range(count):
+            nl = self.mm.find(b'\n', end)
+            if nl < 0:
+                end = self.size
+                break
+            end = nl + 1
+        return self.mm[start:end], end
+
+    def _load_cache(self):
+        if not self.cache_path or not self.stamp:
+            return False
+        try:
+            with open(self.cache_path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header.get('stamp') != self.stamp or header.get('block') != self.BLOCK:
+                    return False
+                starts = array('Q')
+                starts.frombytes(f.read())
+        except (OSError, ValueError):
+            return False
+        self._starts = starts
+        self._newlines = header['newlines']
+        return True
+
+    def _save_cache(self):
+        if not self.cache_path or not self.stamp:
+            return
+        header = {'stamp': self.stamp, 'block': self.BLOCK, 'newlines': self._newlines}
+        tmp = f'{self.cache_path}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                f.write(self._starts.tobytes())
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+
+
+def index_cache_path(cache_dir, path):
+    """Return the index cache file for a path inside cache_dir."""
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f'{key}.idx')
+
+
+class HugeFileView:
+    """
+    Show a window of a huge file's lines in a Text widget.
+
+    The Text widget only ever holds the lines on screen; scrolling, go-to-line
+    and the gutter all work in file line numbers through ``LineIndex``.
+
+    Args:
+        text: Text widget used for display
+        path: File to view
+        encoding: Text encoding used to decode visible lines
+        cache_dir: Directory for the persisted line index (optional)
+    """
+
+    DEFAULT_ROWS = 50
+
+    def __init__(self, text, path, encoding='utf-8', cache_dir=None):
+        if not supported(encoding):
+            raise ValueError(f'the huge file viewer cannot show {encoding} files')
+        self.text = text
+        self.path = path
+        self.encoding = encoding
+        self.top = 1
+        self.rows = self.DEFAULT_ROWS
+        self._file = open(path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self.size = stat.st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        cache_path = None
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_path = index_cache_path(cache_dir, path)
+        self.index = LineIndex(self._mm, cache_path, (stat.st_size, stat.st_mtime_ns))
+        self._bottom = 0
+        self._thread = threading.Thread(target=self.index.build, daemon=True)
+        self._thread.start()
+
+    @property
+    def line_count(self):
+        """Number of lines in the file (approximate while indexing)."""
+        return self.index.line_count
+
+    def close(self):
+        """Stop indexing and release the mapping."""
+        self.index.stop()
+        self._thread.join()
+        if self.size:
+            self._mm.close()
+        self._file.close()
+
+    def measure_rows(self, linespace):
+        """Update how many rows fit in the widget, given the font linespace."""
+        height = self.text.winfo_height()
+        if height > 1 and linespace > 0:
+            self.rows = height // linespace + 1
+
+    def show(self, top):
+        """Display the file starting at line ``top``."""
+        last_top = max(1, self.line_count - self.rows + 2)
+        top = max(1, min(top, last_top))
+        data, self._bottom = self.index.read_lines(top, self.rows)
+        content = data.decode(self.encoding, 'replace').replace('\r\n', '\n')
+        self.top = top
+        self.text.configure(state='normal')
+        self.text.delete('1.0', 'end')
+        self.text.insert('1.0', content.rstrip('\n'))
+        self.text.configure(state='disabled')
+        self.text.edit_modified(False)
+
+    def refresh(self):
+        """Redisplay the current window, e.g. after a resize."""
+        self.show(self.top)
+
+    def scroll(self, lines):
+        """Scroll by a number of lines (negative scrolls up)."""
+        self.show(self.top + lines)
+
+    def yview(self, *args):
+        """Handle scrollbar commands in file terms."""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            offset = int(float(args[1]) * self.size)
+            self.show(self.index.line_of(offset))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= max(1, self.rows - 1)
+            self.scroll(amount)
+
+    def fractions(self):
+        """Scrollbar (first, last) fractions for the current window."""
+        if not self.size:
+            return 0.0, 1.0
+        return self.index.line_start(self.top) / self.size, self._bottom / self.size
+
+    def goto_line(self, line_number):
+        """Scroll so a file line is visible and put the cursor on it."""
+        line_number = max(1, min(line_number, self.line_count))
+        self.show(line_number - self.rows // 3)
+        row = line_number - self.top + 1
+        self.text.mark_set('insert', f'{row}.0')
+        self.text.see('insert')
@@ -0,0 +1,157 @@
+"""
+Background file loading for PyNote.
+
+A worker thread reads and decodes the file in chunks and hands them to the
+Tk thread through a bounded queue. The Tk side inserts at most a slice of
+text per ``after()`` tick, so the window keeps responding while large files
+stream in.
+"""
+
+import os
+import queue
+import threading
+
+from . import longlines, utils
+
+
+class FileLoader:
+    """
+    Stream a file into a Text widget without blocking the UI.
+
+    Args:
+        widget: Any Tk widget, used for ``after()`` scheduling
+        text: Text widget receiving the content
+        path: File to read
+        on_progress: Called with the loaded fraction (0.0-1.0)
+        on_done: Called once with ``(error, cancelled)`` when loading stops
+        softbreaks: longlines.SoftBreaks of the editor; lines longer than
+            ``longlines.LONG_LINE`` are split with soft breaks as they stream in
+    """
+
+    CHUNK_SIZE = 1 << 20      # bytes decoded per worker read
+    SLICE_SIZE = 1 << 18      # characters inserted per UI tick
+    QUEUE_SIZE = 8            # chunks buffered between the threads
+    POLL_MS = 10
+
+    def __init__(self, widget, text, path, on_progress=None, on_done=None, softbreaks=None):
+        self.widget = widget
+        self.text = text
+        self.path = path
+        # Sniffed by the worker before the first chunk is queued
+        self.encoding = 'utf-8'
+        self.newline = os.linesep
+        self.fallback = False
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.total_bytes = 0
+        self.loaded_bytes = 0
+        self.finished = False
+        self._queue = queue.Queue(self.QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._pending = ''
+        self.softbreaks = softbreaks
+        self._segmenter = longlines.Segmenter() if softbreaks is not None else None
+        self._after_id = None
+        self._thread = None
+
+    def start(self):
+        """Start reading in the background and inserting on the Tk thread."""
+        try:
+            self.total_bytes = os.path.getsize(self.path)
+        except OSError:
+            self.total_bytes = 0
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+        self._after_id = self.widget.after(self.POLL_MS, self._pump)
+
+    def cancel(self):
+        """Stop loading; the text inserted so far is left in place."""
+        if self.finished:
+            return
+        self._stop.set()
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        self._finish(None, cancelled=True)
+
+    @property
+    def progress(self):
+        """Fraction of the file loaded so far."""
+        if not self.total_bytes:
+            return 1.0 if self.finished else 0.0
+        return min(1.0, self.loaded_bytes / self.total_bytes)
+
+    def _put(self, item):
+        # Block while the UI catches up, but notice cancellation
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(self):
+        try:
+            with utils.open_decoded(self.path) as f:
+                self.encoding, self.newline = f.encoding, f.newline
+                while not self._stop.is_set():
+                    chunk = f.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if not self._put((chunk, f.tell())):
+                        return
+                # A mixed file is written back as UTF-8
+                self.fallback = f.fallback
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+
+    def _pump(self):
+        self._after_id = None
+        budget = self.SLICE_SIZE
+        while budget > 0:
+            if not self._pending:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None or isinstance(item, Exception):
+                    self._flush_pending()
+                    self.loaded_bytes = self.total_bytes
+                    self._finish(item, cancelled=False)
+                    return
+                self._pending, self.loaded_bytes = item
+            piece, self._pending = self._pending[:budget], self._pending[budget:]
+            self._insert(piece)
+            budget -= len(piece)
+        if self.on_progress:
+            self.on_progress(self.progress)
+        self._after_id = self.widget.after(self.POLL_MS, self._pump)
+
+    def _insert(self, piece):
+        first = self.text.compare('end-1c', '==', '1.0')
+        parts = self._segmenter.feed(piece) if self._segmenter is not None else [piece]
+        if len(parts) == 1:
+            self.text.insert('end-1c', piece)
+        else:
+            self.softbreaks.active = True
+            self.text.insert('end-1c', *longlines.insert_args(parts))
+        if first:
+            # The insert mark would otherwise ride along at the end
+            self.text.mark_set('insert', '1.0')
+
+    def _flush_pending(self):
+        if self._pending:
+            self._insert(self._pending)
+            self._pending = ''
+
+    @property
+    def soft_breaks(self):
+        """Number of soft breaks inserted."""
+        return self._segmenter.breaks if self._segmenter is not None else 0
+
+    def _finish(self, error, cancelled):
+        self.finished = True
+        if self.on_done:
+            self.on_done(error, cancelled)
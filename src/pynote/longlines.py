@@ -0,0 +1,235 @@
+"""
+Long-line safe display for PyNote.
+
+Tk lays out a whole logical line whenever any part of it is shown, so a
+20 MB single-line file costs seconds per redraw. Lines longer than
+``LONG_LINE`` characters are therefore split while they stream in: a
+newline tagged ``softbreak`` is inserted about every ``LONG_LINE``
+characters, preferably after a space or punctuation. Tk then only wraps and
+measures the short segments in the viewport.
+
+Soft breaks exist only in the widget and its mirrored buffer. ``SoftBreaks``
+tracks which widget lines end in one, maps widget lines to the file's
+lines for the gutter, status bar and Go to Line, and removes the breaks
+again from anything that leaves the editor: saves, swap snapshots, journal
+entries and the clipboard.
+"""
+
+import bisect
+
+
+# Lines longer than this are split into segments of about this length
+LONG_LINE = 4096
+# How far back from the limit to look for a nicer break position
+BREAK_WINDOW = 256
+# A break goes after one of these when possible
+BREAK_AFTER = ' ,;}])>'
+
+TAG = 'softbreak'
+
+
+class Segmenter:
+    """
+    Split streamed text into pieces separated by soft breaks.
+
+    Keeps the length of the current line across ``feed`` calls, so a long
+    line arriving over several chunks is segmented the same way as if it
+    had come at once.
+
+    Args:
+        limit: Longest segment
+    """
+
+    def __init__(self, limit=LONG_LINE):
+        self.limit = limit
+        self.col = 0
+        self.breaks = 0
+
+    def feed(self, text):
+        """
+        Segment the next piece of text.
+
+        Returns:
+            list: The text split at soft break positions; a soft break
+            belongs between each two consecutive items
+        """
+        parts = []
+        start = 0
+        pos = 0
+        n = len(text)
+        while pos < n:
+            newline = text.find('\n', pos)
+            run_end = n if newline < 0 else newline
+            if self.col + run_end - pos <= self.limit:
+                if newline < 0:
+                    self.col += run_end - pos
+                    break
+                self.col = 0
+                pos = newline + 1
+                continue
+            cut = pos + self.limit - self.col
+            low = max(pos, cut - BREAK_WINDOW)
+            best = max(text.rfind(c, low, cut) for c in BREAK_AFTER)
+            if best >= 0:
+                cut = best + 1
+            # Empty if the line already reached the limit in the last piece
+            parts.append(text[start:cut])
+            self.breaks += 1
+            start = pos = cut
+            self.col = 0
+        parts.append(text[start:])
+        return parts
+
+
+def insert_args(parts):
+    """Arguments for one ``Text.insert`` that inserts parts with tagged soft breaks."""
+    args = [parts[0], ()]
+    for part in parts[1:]:
+        args.extend(('\n', (TAG,), part, ()))
+    return args
+
+
+class SoftBreaks:
+    """
+    The widget lines of a Text that end in a soft break.
+
+    Register ``on_change`` as a ChangeHook listener ahead of anything that
+    maps lines; it also leaves the file lines the edit replaced in ``edit``.
+    Until ``active`` is set (by the loader, before inserting the first soft
+    break) edits cost nothing.
+
+    Args:
+        text: Tkinter Text widget
+        buffer: buffer.TextBuffer mirroring the widget
+    """
+
+    # Edits spanning more lines than this list all breaks in one call
+    SCAN_LINES = 64
+
+    def __init__(self, text, buffer):
+        self.text = text
+        self.buffer = buffer
+        self.active = False
+        # Sorted widget line numbers whose newline is a soft break
+        self.lines = []
+        # File lines (first, old_last) replaced by the last edit
+        self.edit = None
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    def on_change(self, first, old_last, new_last):
+        """ChangeHook listener: forget, shift and re-find breaks in the edited lines."""
+        if not self.active:
+            return
+        lines = self.lines
+        lo = bisect.bisect_left(lines, first)
+        hi = bisect.bisect_right(lines, old_last, lo)
+        delta = new_last - old_last
+        found = []
+        if new_last - first > self.SCAN_LINES:
+            # Undo, redo or a big paste: one call listing every break
+            ranges = self.text.tag_ranges(TAG)
+            for start in ranges[::2]:
+                line = int(str(start).split('.')[0])
+                if first <= line <= new_last:
+                    found.append(line)
+        else:
+            index = f'{first}.0'
+            stop = f'{new_last}.end+1c'
+            while True:
+                ranges = self.text.tag_nextrange(TAG, index, stop)
+                if not ranges:
+                    break
+                found.append(int(str(ranges[0]).split('.')[0]))
+                index = ranges[1]
+        self.edit = (self.logical_line(self.widget_range(first, first)[0]), self.logical_line(old_last))
+        lines[lo:] = found + [line + delta for line in lines[hi:]]
+
+    def before(self, line):
+        """Number of soft breaks above a widget line."""
+        return bisect.bisect_left(self.lines, line)
+
+    def is_continuation(self, line):
+        """True if a widget line continues the line above it."""
+        i = bisect.bisect_left(self.lines, line - 1)
+        return i < len(self.lines) and self.lines[i] == line - 1
+
+    def logical_line(self, line):
+        """File line shown on a widget line."""
+        return line - self.before(line)
+
+    def widget_line(self, line):
+        """First widget line of a file line."""
+        skipped = 0
+        while True:
+            found = self.before(line + skipped)
+            if found == skipped:
+                return line + skipped
+            skipped = found
+
+    def logical_position(self, line, col):
+        """(file line, column) of a widget position."""
+        first = line
+        while self.is_continuation(first):
+            first -= 1
+        offset = self.buffer.index(line, col) - self.buffer.line_start(first)
+        # Every soft break in between takes one character that is not in the file
+        return self.logical_line(line), offset - (line - first)
+
+    def widget_index(self, line, col=0):
+        """Tk index of a file (line, column) position."""
+        line = self.widget_line(line)
+        while True:
+            length = self.buffer.line_end(line) - self.buffer.line_start(line)
+            i = bisect.bisect_left(self.lines, line)
+            if col <= length or i == len(self.lines) or self.lines[i] != line:
+                return f'{line}.{col}'
+            col -= length
+            line += 1
+
+    def widget_range(self, first, last):
+        """Widget lines of the file lines shown on widget lines first..last."""
+        while self.is_continuation(first):
+            first -= 1
+        i = bisect.bisect_left(self.lines, last)
+        while i < len(self.lines) and self.lines[i] == last:
+            last += 1
+            i += 1
+        return first, last
+
+    def plain(self, text, first_line):
+        """
+        Remove the soft breaks from text copied out of the widget.
+
+        Args:
+            text: Text that starts on widget line ``first_line``
+            first_line: Widget line where text starts
+        """
+        if not self.lines or '\n' not in text:
+            return text
+        pieces = text.split('\n')
+        lo = bisect.bisect_left(self.lines, first_line)
+        hi = bisect.bisect_left(self.lines, first_line + len(pieces) - 1, lo)
+        if lo == hi:
+            return text
+        soft = set(self.lines[lo:hi])
+        out = [pieces[0]]
+        for i, piece in enumerate(pieces[1:]):
+            if first_line + i not in soft:
+                out.append('\n')
+            out.append(piece)
+        return ''.join(out)
+
+    def chunks(self):
+        """The mirrored buffer's text without soft breaks, as a list of strings."""
+        if not self.lines:
+            return self.buffer.chunks()
+        out = []
+        start = 0
+        for line in self.lines:
+            end = self.buffer.line_end(line)
+            out.append(self.buffer.get(start, end))
+            start = end + 1
+        out.append(self.buffer.get(start))
+        return out
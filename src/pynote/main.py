@@ -1,17 +1,150 @@
 # src/pynote/main.py
+import itertools
+import os
 import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
-from tkinter import font as tkfont
+from tkinter import ttk
 try:
     from . import utils
     from . import themes
+    from . import editor
+    from . import stats
+    from . import highlight
+    from . import search
+    from . import ui
+    from . import tabs
+    from . import minimap
+    from . import profiler
+    from . import recent
 except Exception:
     # Fallback for running as a script directly
-    import os, sys
+    import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from pynote import utils, themes
+    from pynote import utils, themes, editor, stats, highlight, search, ui, tabs, minimap, profiler, recent
+
+# Not needed to show the first window: loaded on first use
+_PACKAGE = utils.__name__.rpartition('.')[0]
+filedialog = utils.lazy_import('tkinter.filedialog')
+messagebox = utils.lazy_import('tkinter.messagebox')
+tkfont = utils.lazy_import('tkinter.font')
+loader = utils.lazy_import(f'{_PACKAGE}.loader')
+hugefile = utils.lazy_import(f'{_PACKAGE}.hugefile')
+saver = utils.lazy_import(f'{_PACKAGE}.saver')
+autosave = utils.lazy_import(f'{_PACKAGE}.autosave')
+history = utils.lazy_import(f'{_PACKAGE}.history')
+watcher = utils.lazy_import(f'{_PACKAGE}.watcher')
+spellcheck = utils.lazy_import(f'{_PACKAGE}.spellcheck')
+preview = utils.lazy_import(f'{_PACKAGE}.preview')
+session = utils.lazy_import(f'{_PACKAGE}.session')
 
 APP_TITLE = "PyNote"
+# How often external file changes are collected from the watcher thread
+WATCH_POLL_MS = 250
+# Lines past a restored view that must have streamed in before jumping there
+RESTORE_LINES = 100
+
+# Tcl helpers for the line-number gutter. Each one runs a whole redraw step
+# in a single round-trip instead of one Tcl call per visible line.
+_GUTTER_TCL = r'''
+proc pynote_gutter_layout {cmd win offset} {
+    set first [lindex [split [$cmd index @0,0] .] 0]
+    set last [lindex [split [$cmd index "@0,[winfo height $win]"] .] 0]
+    set out {}
+    for {set i $first} {$i <= $last} {incr i} {
+        set d [$cmd dlineinfo $i.0]
+        if {[llength $d]} { lappend out [expr {$i + $offset}] [lindex $d 1] }
+    }
+    return $out
+}
+proc pynote_gutter_place {canvas x items layout} {
+    set n 0
+    foreach {line y} $layout {
+        set id [lindex $items $n]
+        $canvas coords $id $x $y
+        $canvas itemconfigure $id -text $line -state normal
+        incr n
+    }
+    foreach id [lrange $items $n end] {
+        $canvas itemconfigure $id -state hidden
+    }
+}
+'''
+
+
+class RefreshScheduler:
+    """
+    Coalesce UI refresh requests and run each task at most once per idle cycle.
+
+    ``FRAME`` tasks run on the next idle callback. ``DEBOUNCED`` tasks wait
+    until no request has arrived for ``debounce_ms`` and then run on the
+    following idle callback.
+    """
+
+    FRAME = 0
+    DEBOUNCED = 1
+
+    def __init__(self, widget, debounce_ms=120):
+        self.widget = widget
+        self.debounce_ms = debounce_ms
+        self._tasks = {}
+        self._dirty = set()
+        self._idle_id = None
+        self._debounce_id = None
+        self._debounce_due = False
+        self.requested = {}
+        self.executed = {}
+
+    def register(self, name, callback, priority=FRAME):
+        """Register a refresh task under a name."""
+        self._tasks[name] = (priority, callback)
+        self.requested.setdefault(name, 0)
+        self.executed.setdefault(name, 0)
+
+    def request(self, name):
+        """Mark a task dirty and schedule a flush."""
+        priority, _ = self._tasks[name]
+        self.requested[name] += 1
+        self._dirty.add(name)
+        if priority == self.FRAME:
+            self._schedule_idle()
+        else:
+            if self._debounce_id is not None:
+                self.widget.after_cancel(self._debounce_id)
+            self._debounce_id = self.widget.after(self.debounce_ms, self._debounce_expired)
+
+    def flush(self):
+        """Run every dirty task now, regardless of priority."""
+        if self._debounce_id is not None:
+            self.widget.after_cancel(self._debounce_id)
+            self._debounce_id = None
+        self._debounce_due = True
+        self._flush()
+
+    def counters(self):
+        """Return {name: (requested, executed)} for every task."""
+        return {name: (self.requested[name], self.executed[name]) for name in self._tasks}
+
+    def _debounce_expired(self):
+        self._debounce_id = None
+        self._debounce_due = True
+        self._schedule_idle()
+
+    def _schedule_idle(self):
+        if self._idle_id is None:
+            self._idle_id = self.widget.after_idle(self._flush)
+
+    def _flush(self):
+        if self._idle_id is not None:
+            self.widget.after_cancel(self._idle_id)
+            self._idle_id = None
+        due = sorted(
+            (priority, name) for name, (priority, _) in self._tasks.items()
+            if name in self._dirty and (priority == self.FRAME or self._debounce_due)
+        )
+        self._debounce_due = False
+        for _, name in due:
+            self._dirty.discard(name)
+            self.executed[name] += 1
+            self._tasks[name][1]()
 
 
 class PyNoteApp(tk.Tk):
@@ -19,7 +152,15 @@ class PyNoteApp(tk.Tk):
         super().__init__()
         self.title(APP_TITLE)
         self.geometry('800x600')
-        self._filepath = None
+        # One Document per tab; self.doc is the one shown
+        self.docs = []
+        self.doc = None
+        self._untitled = itertools.count(1)
+        # Background saves; each job remembers its document
+        self._save_jobs = []
+        self._swap_poll_id = None
+        self._status_note = ''
+        self._status_note_id = None
         # Platform hint for menu accelerator text
         try:
             self._is_mac = (self.tk.call('tk', 'windowingsystem') == 'aqua')
@@ -27,15 +168,67 @@ class PyNoteApp(tk.Tk):
             import sys as _sys
             self._is_mac = (_sys.platform == 'darwin')
         # Settings and theme
-        self.settings = utils.load_settings()
+        self.settings = utils.get_settings()
+        self.settings.subscribe(self._on_settings_changed)
         self.current_theme_name = self.settings.get('theme', 'light')
         self.dark_mode = tk.BooleanVar(value=(self.current_theme_name.lower() == 'dark'))
+        self.show_minimap = tk.BooleanVar(value=bool(self.settings.get('show_minimap', True)))
+        self.follow_tail = tk.BooleanVar(value=False)
+        self.spell_check = tk.BooleanVar(value=bool(self.settings.get('spell_check', False)))
+        self.show_preview = tk.BooleanVar(value=False)
+        self.recent = recent.RecentFiles(self.settings)
+        # Notices files changed by other programs; started after the first frame
+        self.watcher = None
+        # Restored tabs whose fingerprints are not checked yet, and the ones
+        # waiting to be loaded in the background
+        self._session_checks = {}
+        self._session_verifier = None
+        self._preload = []
+        # Gutter and status refreshes are batched into idle callbacks
+        self.refresh = RefreshScheduler(self)
+        # Opt-in timing of the hot paths; installed before any widget exists
+        # so every Tcl call is counted
+        self.profiler = None
+        self.perf_label = None
+        self._perf_after_id = None
+        self.show_perf = tk.BooleanVar(value=False)
+        if profiler.enabled(self.settings):
+            self.profiler = profiler.Profiler()
+            self.profiler.install(self)
         self.style = ttk.Style(self)
-        # Using emoji icons for consistency across platforms
+        # Autosave journals edits rather than rewriting the document; swap
+        # snapshots hold modified tabs that were unloaded
+        self._config_dir = utils.get_config_dir()
+        self._journal_dir = self._config_dir / 'journal'
+        # Only what the first frame shows is built here; menu items, dialog
+        # modules and housekeeping wait until the window is up
         self._create_widgets()
         self._create_menu()
         self._bind_shortcuts()
-        self._apply_theme()
+        self._apply_theme(startup=True)
+        # The last session's files, or an empty tab
+        if not self._restore_session():
+            self.new_file()
+        self.protocol('WM_DELETE_WINDOW', self._on_exit)
+        self.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        """Setup that can wait until the first frame has been drawn."""
+        tabs.clean_swap(self._config_dir)
+        history.clean_store(self._config_dir / 'undo')
+        self.bind('<FocusIn>', self._on_focus_in, add='+')
+        self.watcher = watcher.FileWatcher()
+        self.watcher.start()
+        for doc in self.docs:
+            if doc.path is not None and doc.huge is None:
+                self.watcher.watch(doc.path)
+        self.after(WATCH_POLL_MS, self._poll_watcher)
+        self._offer_recovery()
+
+    @property
+    def text(self):
+        """Text widget of the active tab."""
+        return self.doc.text
 
     def _create_widgets(self):
         # Toolbar with small icon buttons
@@ -50,6 +243,12 @@ class PyNoteApp(tk.Tk):
         for b in (btn_new, btn_open, btn_save):
             b.pack(side='left', padx=4, pady=4)
 
+        # Tab strip: empty pages, the active document's editor is shown below
+        self.tabbar = ttk.Notebook(self)
+        self.tabbar.pack(side='top', fill='x')
+        self.tabbar.bind('<<NotebookTabChanged>>', self._on_tab_changed)
+        self.tabbar.bind('<Button-2>', self._on_tab_middle_click)
+
         # Editor area: gutter (line numbers) + text + vertical scrollbar
         self.editor = ttk.Frame(self)
         self.editor.pack(side='top', fill='both', expand=True)
@@ -57,42 +256,193 @@ class PyNoteApp(tk.Tk):
         self.gutter_width = 40
         self.gutter = tk.Canvas(self.editor, width=self.gutter_width, highlightthickness=0)
         self.gutter.pack(side='left', fill='y')
+        # Pooled line-number items, moved and relabelled instead of recreated
+        self._gutter_items = []
+        self._gutter_layout = None
+        self._gutter_digits = None
+        self._gutter_char_w = None
+        self.tk.eval(_GUTTER_TCL)
 
-        self.text = tk.Text(self.editor, wrap='word', undo=True)
-        self.text.pack(side='left', fill='both', expand=True)
-
+        # Shared by all tabs; each tab's Text is packed between gutter and scrollbar
         self.vsb = ttk.Scrollbar(self.editor, orient='vertical', command=self._on_scrollbar)
         self.vsb.pack(side='right', fill='y')
-        self.text.configure(yscrollcommand=self._on_yscroll)
+        self.minimap = minimap.Minimap(self.editor, command=self._on_scrollbar)
+        if self.show_minimap.get():
+            self.minimap.pack(side='right', fill='y')
+        # Markdown preview pane, created when first shown
+        self.preview_pane = None
 
         # status bar
         self.status = tk.StringVar()
         self.status.set('Ln 1, Col 0 | Words: 0 | Chars: 0')
         self.status_bar = ttk.Label(self, textvariable=self.status, anchor='w')
         self.status_bar.pack(side='bottom', fill='x')
+        self.find_bar = ui.FindBar(self, None, side='bottom', fill='x', after=self.status_bar)
+        # Find in Files panel, created when first opened
+        self.files_panel = None
 
         # update cursor position and gutter on edits/resizes
-        self.text.bind('<KeyRelease>', self._update_status)
-        self.text.bind('<ButtonRelease>', self._update_status)
-        self.text.bind('<MouseWheel>', lambda e: (self._update_gutter(), None))
-        self.text.bind('<Configure>', lambda e: self._update_gutter())
+        self.refresh.register('gutter', self._update_gutter, RefreshScheduler.FRAME)
+        self.refresh.register('status', self._update_status, RefreshScheduler.DEBOUNCED)
+        self.refresh.register('minimap', self._update_minimap, RefreshScheduler.DEBOUNCED)
+        # Blocks are rendered in a worker, so the preview can follow every frame
+        self.refresh.register('preview', self._update_preview, RefreshScheduler.FRAME)
+
+    def _create_editor(self, doc):
+        """Create a document's editor widget and the state derived from its buffer."""
+        doc.editor = editor.EditorWidget(self.editor, scrollbar=False)
+        # The undo history outlives the editor when the tab is unloaded
+        if doc.history is None:
+            self._new_history(doc)
+        doc.editor.history = doc.history
+        text = doc.text
+        themes.apply_theme(text, self._theme)
+        # Word/char counts are kept per line and updated from edits only
+        doc.stats = stats.TextStats()
+        doc.summary = minimap.LineSummary()
+        # Highlighting, search and saving read the headless buffer copy
+        doc.highlighter = highlight.Highlighter(text, self._theme, buffer=doc.editor.buffer)
+        doc.search = search.SearchController(text, buffer=doc.editor.buffer)
+        doc.search.set_theme(self._theme)
+        changes = doc.editor.changes
+        changes.add_listener(lambda *lines: self._on_text_change(doc, *lines))
+        changes.add_listener(doc.highlighter.on_change)
+        changes.add_listener(doc.search.on_change)
+        text.configure(yscrollcommand=lambda first, last: self._on_yscroll(first, last) if doc is self.doc else None)
+
+        text.bind('<KeyRelease>', lambda e: self.refresh.request('status'))
+        text.bind('<ButtonRelease>', lambda e: self.refresh.request('status'))
+        text.bind('<MouseWheel>', self._on_mousewheel)
+        text.bind('<Button-4>', self._on_mousewheel)
+        text.bind('<Button-5>', self._on_mousewheel)
+        text.bind('<Configure>', self._on_text_configure)
+        text.bind('<<Modified>>', lambda e: self._update_tab(doc))
+        # In huge file mode the keyboard scrolls the file, not the window
+        for key, lines in (('<Up>', -1), ('<Down>', 1), ('<Prior>', -0.9), ('<Next>', 0.9)):
+            text.bind(key, lambda e, n=lines: self._huge_scroll(n))
+        # Soft breaks are display-only and stay out of the clipboard
+        text.bind('<<Copy>>', lambda e: self._copy_plain(doc))
+        text.bind('<<Cut>>', lambda e: self._copy_plain(doc, cut=True))
+        text.bind('<Button-3>', lambda e: self._spell_menu(doc, e))
+        if self.spell_check.get():
+            self._set_spell(doc, True)
+        # Keep the Text's own Ctrl+F/Ctrl+H editing keys from running
+        text.bind('<Control-f>', lambda e: self.show_find() or 'break')
+        text.bind('<Control-h>', lambda e: self.show_find(replace=True) or 'break')
+
+    def _new_history(self, doc, stat=None):
+        """
+        Give a document an empty undo history.
+
+        Args:
+            stat: (mtime_ns, size) of the file just loaded; a history saved
+                for that version of it is read on the first undo
+        """
+        doc.history = history.History(self.settings.get('undo_memory', history.DEFAULT_MAX_BYTES))
+        if stat is not None:
+            doc.history.store = history.store_path(self._config_dir / 'undo', doc.path)
+            doc.history.base_stat = stat
+        if doc.loaded:
+            doc.editor.history = doc.history
+
+    def _persist_history(self, doc):
+        """
+        Save the undo history of an unmodified file for its next opening.
+
+        Returns:
+            bool: True if the history was written
+        """
+        if doc.history is None or doc.path is None or doc.modified or doc.huge is not None:
+            return False
+        if doc.loader is not None or not doc.history.enabled:
+            return False
+        try:
+            st = os.stat(doc.path)
+        except OSError:
+            return False
+        doc.history.store = history.store_path(self._config_dir / 'undo', doc.path)
+        return doc.history.persist((st.st_mtime_ns, st.st_size))
+
+    def _copy_plain(self, doc, cut=False):
+        softbreaks = doc.editor.softbreaks
+        ranges = doc.text.tag_ranges('sel')
+        if not softbreaks or not ranges:
+            # Nothing to clean up; Tk's binding leaves the clipboard alone
+            return None
+        first, last = str(ranges[0]), str(ranges[-1])
+        selected = softbreaks.plain(doc.text.get(first, last), int(first.split('.')[0]))
+        doc.text.clipboard_clear()
+        doc.text.clipboard_append(selected)
+        if cut:
+            doc.text.delete(first, last)
+        return 'break'
 
     def _create_menu(self):
+        # Only the menu bar is built up front; each menu's items are added
+        # the first time it is opened
         menu = tk.Menu(self)
-        filemenu = tk.Menu(menu, tearoff=0)
+        for label, build in (('File', self._build_file_menu), ('Edit', self._build_edit_menu),
+                             ('View', self._build_view_menu)):
+            submenu = tk.Menu(menu, tearoff=0)
+            submenu.configure(postcommand=lambda m=submenu, b=build: self._fill_menu(m, b))
+            menu.add_cascade(label=label, menu=submenu)
+        self.config(menu=menu)
+
+    def _fill_menu(self, menu, build):
+        menu.configure(postcommand='')
+        build(menu)
+
+    def _build_file_menu(self, filemenu):
         filemenu.add_command(label='New', command=self.new_file)
         filemenu.add_command(label='Open', command=self.open_file)
+        recentmenu = tk.Menu(filemenu, tearoff=0)
+        recentmenu.configure(postcommand=lambda: self._fill_recent_menu(recentmenu))
+        filemenu.add_cascade(label='Open Recent', menu=recentmenu)
         filemenu.add_command(label='Save', command=self.save_file)
         accel_sa = 'Cmd+Shift+S' if self._is_mac else 'Ctrl+Shift+S'
         filemenu.add_command(label='Save As...', command=self.save_as, accelerator=accel_sa)
+        filemenu.add_command(label='Close Tab', command=self.close_tab, accelerator='Ctrl+W')
         filemenu.add_separator()
-        filemenu.add_command(label='Exit', command=self.quit)
-        menu.add_cascade(label='File', menu=filemenu)
+        filemenu.add_command(label='Exit', command=self._on_exit)
 
-        viewmenu = tk.Menu(menu, tearoff=0)
+    def _fill_recent_menu(self, menu):
+        # Built from the cached details only; nothing is read from disk
+        menu.delete(0, 'end')
+        entries = self.recent.entries()
+        for entry in entries:
+            menu.add_command(label=recent.describe(entry),
+                             command=lambda path=entry['path']: self._open_recent(path))
+        if entries:
+            menu.add_separator()
+            menu.add_command(label='Clear Recent Files', command=self.recent.clear)
+        else:
+            menu.add_command(label='No Recent Files', state='disabled')
+
+    def _open_recent(self, path):
+        if not os.path.isfile(path):
+            self.recent.remove(path)
+            messagebox.showerror('Error', f'{path} no longer exists.')
+            return
+        self.load_file(path)
+
+    def _build_edit_menu(self, editmenu):
+        editmenu.add_command(label='Find...', command=self.show_find, accelerator='Ctrl+F')
+        editmenu.add_command(label='Replace...', command=lambda: self.show_find(replace=True), accelerator='Ctrl+H')
+        editmenu.add_command(label='Find Next', command=self.find_bar.find_next, accelerator='F3')
+        editmenu.add_command(label='Find in Files...', command=self.show_find_in_files, accelerator='Ctrl+Shift+F')
+
+    def _build_view_menu(self, viewmenu):
         viewmenu.add_checkbutton(label='Dark Mode', variable=self.dark_mode, command=self._toggle_dark_mode)
-        menu.add_cascade(label='View', menu=viewmenu)
-        self.config(menu=menu)
+        viewmenu.add_checkbutton(label='Minimap', variable=self.show_minimap, command=self._toggle_minimap)
+        viewmenu.add_checkbutton(label='Follow End of File', variable=self.follow_tail, command=self._toggle_follow)
+        viewmenu.add_checkbutton(label='Spell Check', variable=self.spell_check, command=self._toggle_spell_check)
+        viewmenu.add_checkbutton(label='Markdown Preview', variable=self.show_preview,
+                                 command=self._toggle_preview, accelerator='Ctrl+Shift+M')
+        if self.profiler is not None:
+            viewmenu.add_separator()
+            viewmenu.add_checkbutton(label='Performance Overlay', variable=self.show_perf,
+                                     command=self._toggle_perf_overlay)
+            viewmenu.add_command(label='Save Performance Profile', command=self._dump_profile)
 
     def _bind_shortcuts(self):
         self.bind('<Control-s>', lambda e: self.save_file())
@@ -105,23 +455,49 @@ class PyNoteApp(tk.Tk):
         # Save As shortcut
         self.bind('<Control-Shift-s>', lambda e: self.save_as())
         self.bind('<Command-Shift-s>', lambda e: self.save_as())
+        # Tabs
+        self.bind('<Control-w>', lambda e: self.close_tab())
+        self.bind('<Control-Tab>', lambda e: self._cycle_tab(1) or 'break')
+        self.bind('<Control-Shift-Tab>', lambda e: self._cycle_tab(-1) or 'break')
+        self.bind('<Control-ISO_Left_Tab>', lambda e: self._cycle_tab(-1) or 'break')
+        # Find & Replace
+        self.bind('<Control-f>', lambda e: self.show_find())
+        self.bind('<Control-h>', lambda e: self.show_find(replace=True))
+        self.bind('<F3>', lambda e: self.find_bar.find_next())
+        self.bind('<Control-Shift-F>', lambda e: self.show_find_in_files())
+        self.bind('<Control-Shift-M>', lambda e: self.show_preview.set(not self.show_preview.get())
+                  or self._toggle_preview())
+        self.bind('<Shift-F3>', lambda e: self.find_bar.find_next(backwards=True))
+        # Cancel a file that is still loading
+        self.bind('<Escape>', lambda e: self._cancel_loading())
 
     def _load_icons(self):
         # Deprecated: image-based icons removed to avoid TclError on some platforms
         # Kept for compatibility; no-op.
         pass
 
-    def _apply_theme(self):
+    def _apply_theme(self, startup=False):
         name = 'dark' if self.dark_mode.get() else 'light'
         theme = themes.get_theme(name)
         self._theme = theme
-        # Apply to text widget
-        themes.apply_theme(self.text, theme)
+        # Apply to the text widgets that exist
+        for doc in self.docs:
+            if doc.loaded:
+                themes.apply_theme(doc.text, theme)
+                doc.highlighter.set_theme(theme)
+                doc.search.set_theme(theme)
+                if doc.spell is not None:
+                    doc.spell.set_theme(theme)
+        self.minimap.set_theme(theme)
+        if self.preview_pane is not None:
+            self.preview_pane.set_theme(theme)
         # Apply to root window background
         self.configure(bg=theme['bg'])
         # Apply to toolbar and status bar via ttk styles
-        # Use a custom style to avoid clobbering global styles
-        self.style.theme_use(self.style.theme_use())
+        # Use a custom style to avoid clobbering global styles. Re-applying
+        # the ttk theme is slow and pointless before anything was styled
+        if not startup:
+            self.style.theme_use(self.style.theme_use())
         self.style.configure('PyNote.TFrame', background=theme['status_bg'])
         self.style.configure('PyNote.TLabel', background=theme['status_bg'], foreground=theme['status_fg'])
         self.toolbar.configure(style='PyNote.TFrame')
@@ -134,157 +510,1201 @@ class PyNoteApp(tk.Tk):
         # Gutter colors
         try:
             self.gutter.configure(bg=theme['gutter_bg'])
+            self.gutter.itemconfigure('lineno', fill=theme['gutter_fg'])
         except Exception:
             pass
-        # Redraw gutter after theme change
-        self._update_gutter()
+        self.refresh.request('gutter')
 
     def _on_yscroll(self, first, last):
         # Update scrollbar and gutter when text yview changes
+        huge = self.doc.huge
+        if huge is not None:
+            first, last = huge.fractions()
         self.vsb.set(first, last)
-        self._update_gutter()
+        if self.show_minimap.get():
+            self.minimap.set_view(first, last)
+        self.refresh.request('gutter')
+        if self.doc.loaded:
+            self.doc.highlighter.on_scroll()
+            self.doc.search.on_scroll()
+            if self.doc.spell is not None:
+                self.doc.spell.on_scroll()
+            if self.show_preview.get() and self.doc.huge is None:
+                self.preview_pane.sync(self._top_line(self.doc))
 
     def _on_scrollbar(self, *args):
         # Scroll text and update gutter when using scrollbar
-        self.text.yview(*args)
-        self._update_gutter()
+        if self.doc.huge is not None:
+            self.doc.huge.yview(*args)
+            self._on_yscroll(0, 1)
+        else:
+            self.text.yview(*args)
+        self.refresh.request('gutter')
+
+    def _on_mousewheel(self, event):
+        huge = self.doc.huge
+        if huge is None:
+            self.refresh.request('gutter')
+            return None
+        if event.num == 4 or event.delta > 0:
+            huge.scroll(-3)
+        else:
+            huge.scroll(3)
+        self._on_yscroll(0, 1)
+        return 'break'
+
+    def _huge_scroll(self, amount):
+        huge = self.doc.huge
+        if huge is None:
+            return None
+        if isinstance(amount, float):
+            amount = int(amount * huge.rows) or (1 if amount > 0 else -1)
+        huge.scroll(amount)
+        self._on_yscroll(0, 1)
+        return 'break'
+
+    def _on_text_configure(self, event):
+        if event.widget is not self.text:
+            return
+        huge = self.doc.huge
+        if huge is not None:
+            huge.measure_rows(self._linespace())
+            huge.refresh()
+            self._on_yscroll(0, 1)
+        self.refresh.request('gutter')
+
+    def _linespace(self):
+        try:
+            return tkfont.nametofont(self.text.cget('font')).metrics('linespace')
+        except Exception:
+            return 16
 
     def _update_gutter(self):
         """Redraw line numbers in the gutter to match visible lines."""
-        if not hasattr(self, 'gutter'):
+        if not hasattr(self, 'gutter') or self.doc is None or not self.doc.loaded:
+            return
+        gutter_padding = 4
+        # Adjust gutter width based on number of digits
+        huge = self.doc.huge
+        total_lines = huge.line_count if huge is not None else self.doc.editor.line_count
+        offset = huge.top - 1 if huge is not None else 0
+        digits = max(2, len(str(total_lines)))
+        if digits != self._gutter_digits or self._gutter_char_w is None:
+            if self._gutter_char_w is None:
+                try:
+                    font = tkfont.nametofont(self.text.cget('font'))
+                    self._gutter_char_w = font.measure('0')
+                except Exception:
+                    self._gutter_char_w = 8
+            self._gutter_digits = digits
+            desired_width = gutter_padding * 2 + digits * self._gutter_char_w
+            if abs(desired_width - self.gutter_width) > 2:
+                self.gutter_width = desired_width
+                self.gutter.config(width=self.gutter_width)
+            # Item x positions depend on the width
+            self._gutter_layout = None
+
+        # Visible line numbers and their y offsets, as a flat (line, y) list
+        layout = self.tk.call('pynote_gutter_layout', self.doc.editor.changes.command, self.text._w, offset)
+        softbreaks = self.doc.editor.softbreaks
+        if softbreaks:
+            # Number file lines; segments continuing a line get no number
+            layout = list(layout)
+            for i in range(0, len(layout), 2):
+                line = int(layout[i])
+                layout[i] = '' if softbreaks.is_continuation(line) else softbreaks.logical_line(line)
+            layout = tuple(layout)
+        if layout == self._gutter_layout:
             return
-        self.gutter.delete('all')
+        self._gutter_layout = layout
+
         theme = getattr(self, '_theme', {
             'gutter_bg': '#F0F0F0',
             'gutter_fg': '#666666',
         })
-        try:
-            self.gutter.configure(bg=theme['gutter_bg'])
-        except Exception:
-            pass
+        while len(self._gutter_items) < len(layout) // 2:
+            self._gutter_items.append(self.gutter.create_text(
+                0, 0, anchor='ne', tags=('lineno',), fill=theme['gutter_fg']))
+        self.tk.call('pynote_gutter_place', self.gutter._w, self.gutter_width - gutter_padding,
+                     tuple(self._gutter_items), layout)
 
-        # Determine first and last visible line
-        i = self.text.index('@0,0')
-        gutter_padding = 4
-        # Adjust gutter width based on number of digits
-        total_lines = int(self.text.index('end-1c').split('.')[0])
-        digits = max(2, len(str(total_lines)))
+    def _update_minimap(self):
+        """Redraw the minimap from the active document's line summary."""
+        if not self.show_minimap.get():
+            return
+        doc = self.doc
+        # The huge file view only holds a window of the file
+        summary = doc.summary if doc is not None and doc.loaded and doc.huge is None else None
+        self.minimap.set_summary(summary)
+        self.minimap.redraw()
+
+    def _top_line(self, doc):
+        """File line at the top of a document's view."""
+        line = int(doc.text.index('@0,0').split('.')[0])
+        softbreaks = doc.editor.softbreaks
+        return softbreaks.logical_line(line) if softbreaks else line
+
+    def _update_preview(self):
+        """Render the active document into the Markdown preview."""
+        if not self.show_preview.get():
+            return
+        doc = self.doc
+        if doc is None or not doc.loaded or doc.huge is not None:
+            self.preview_pane.clear()
+            return
+        self.preview_pane.sync(self._top_line(doc))
+        self.preview_pane.render(doc.editor.softbreaks.chunks())
+
+    def show_find(self, replace=False):
+        """Open the Find (or Find & Replace) bar."""
+        if self.doc.huge is not None:
+            self._flash_status('Find is not available in the read-only huge file view')
+            return
+        self.find_bar.show(replace=replace)
+
+    def show_find_in_files(self):
+        """Open the Find in Files panel, searching the current file's folder."""
+        if self.files_panel is None:
+            self.files_panel = ui.FindInFilesPanel(self, self._open_search_result,
+                                                   side='bottom', fill='both', after=self.status_bar)
+        folder = os.path.dirname(os.path.abspath(self.doc.path)) if self.doc.path else os.getcwd()
         try:
-            font = tkfont.nametofont(self.text.cget('font'))
-            char_w = font.measure('0')
-        except Exception:
-            char_w = 8
-        desired_width = gutter_padding * 2 + digits * char_w
-        if abs(desired_width - int(self.gutter['width'])) > 2:
-            self.gutter_width = desired_width
-            self.gutter.config(width=self.gutter_width)
-
-        # Iterate through visible lines and draw numbers
-        index = self.text.index('@0,0')
-        while True:
-            dline = self.text.dlineinfo(index)
-            if dline is None:
-                break
-            y = dline[1]
-            line_number = index.split('.')[0]
-            self.gutter.create_text(self.gutter_width - gutter_padding, y, anchor='ne',
-                                    text=line_number, fill=theme['gutter_fg'])
-            # Move to next line
-            index = self.text.index(f"{index}+1line")
-            if y > self.text.winfo_height():
-                break
+            selected = self.text.get('sel.first', 'sel.last')
+        except tk.TclError:
+            selected = ''
+        self.files_panel.show(folder, selected if '\n' not in selected else None)
+
+    def _open_search_result(self, path, line, col):
+        """Open a Find in Files result at its line."""
+        doc = self.load_file(path)
+        self._goto_when_loaded(doc, line, col)
+
+    def _goto_when_loaded(self, doc, line, col):
+        if doc is not self.doc:
+            return
+        if doc.loader is not None:
+            # Lines past what has streamed in do not exist yet
+            self.after(50, self._goto_when_loaded, doc, line, col)
+            return
+        doc.editor.goto_line(line, col)
+        doc.text.focus_set()
+        self.refresh.request('status')
 
     def _toggle_dark_mode(self):
         self.current_theme_name = 'dark' if self.dark_mode.get() else 'light'
-        # Save preference
+        # Save preference (written to disk in the background)
         self.settings['theme'] = self.current_theme_name
-        utils.save_settings(self.settings)
         # Apply
         self._apply_theme()
 
-    def new_file(self):
-        if self._confirm_discard():
-            self.text.delete('1.0', tk.END)
-            self._filepath = None
+    def _toggle_minimap(self):
+        self.settings['show_minimap'] = self.show_minimap.get()
+        if self.show_minimap.get():
+            self.minimap.pack(side='right', fill='y', after=self.vsb)
+            # The marker was not moved while the minimap was hidden
+            self.minimap.set_view(*self.vsb.get())
+            self.refresh.request('minimap')
+        else:
+            self.minimap.pack_forget()
+
+    def _toggle_preview(self):
+        if self.show_preview.get():
+            if self.preview_pane is None:
+                self.preview_pane = preview.PreviewPane(self.editor)
+                self.preview_pane.set_theme(self._theme)
+            # Outside the scrollbar, so the pane reads as a second column
+            self.preview_pane.pack(side='right', fill='both', expand=True, before=self.vsb)
+            self.refresh.request('preview')
+        else:
+            self.preview_pane.pack_forget()
+            self.preview_pane.clear()
+
+    def _toggle_follow(self):
+        self.doc.follow = self.follow_tail.get()
+        if self.doc.follow and self.doc.loaded:
+            self.doc.text.mark_set('insert', 'end-1c')
+            self.doc.text.see('insert')
+
+    def _toggle_spell_check(self):
+        on = self.spell_check.get()
+        self.settings['spell_check'] = on
+        for doc in self.docs:
+            if doc.loaded:
+                self._set_spell(doc, on)
+
+    def _set_spell(self, doc, on):
+        """Turn spell checking of a loaded document on or off."""
+        if on and doc.huge is None:
+            if doc.spell is None:
+                doc.spell = spellcheck.SpellChecker(doc.text, doc.editor.buffer, self._spell_dictionary)
+                doc.spell.set_theme(self._theme)
+                doc.editor.changes.add_listener(doc.spell.on_change)
+            doc.spell.enable(True)
+        elif doc.spell is not None:
+            doc.spell.enable(False)
+
+    def _spell_dictionary(self):
+        # Runs in the spell check worker, which loads the word list
+        return spellcheck.get_dictionary(os.path.join(self._config_dir, 'dictionary.txt'))
+
+    def _spell_menu(self, doc, event):
+        """Offer corrections for the misspelled word under the mouse."""
+        if doc.spell is None or not doc.spell.enabled:
+            return None
+        text = doc.text
+        index = text.index(f'@{event.x},{event.y}')
+        if doc.spell.TAG not in text.tag_names(index):
+            return None
+        start, end = text.tag_prevrange(doc.spell.TAG, f'{index}+1c')
+        word = text.get(start, end)
+        dictionary = self._spell_dictionary()
+        menu = tk.Menu(self, tearoff=0)
+        suggestions = dictionary.suggest(word)
+        for suggestion in suggestions:
+            menu.add_command(label=suggestion, command=lambda s=suggestion: text.replace(start, end, s))
+        if not suggestions:
+            menu.add_command(label='No suggestions', state='disabled')
+        menu.add_separator()
+        menu.add_command(label=f'Add "{word}" to Dictionary', command=lambda: self._add_to_dictionary(word))
+        menu.tk_popup(event.x_root, event.y_root)
+        return 'break'
+
+    def _add_to_dictionary(self, word):
+        self._spell_dictionary().add(word)
+        # Check the visible lines again without the word
+        for doc in self.docs:
+            if doc.loaded and doc.spell is not None and doc.spell.enabled:
+                doc.spell.enable(True)
+
+    def _toggle_perf_overlay(self):
+        if self.show_perf.get():
+            if self.perf_label is None:
+                self.perf_label = ttk.Label(self.editor, style='PyNote.TLabel')
+            self.perf_label.place(relx=1.0, rely=1.0, anchor='se')
+            self._refresh_perf_overlay()
+        else:
+            if self._perf_after_id is not None:
+                self.after_cancel(self._perf_after_id)
+                self._perf_after_id = None
+            self.perf_label.place_forget()
+
+    def _refresh_perf_overlay(self):
+        self.perf_label.configure(text=self.profiler.summary_line())
+        self._perf_after_id = self.after(500, self._refresh_perf_overlay)
+
+    def _dump_profile(self):
+        try:
+            path = self.profiler.dump(self._config_dir)
+        except OSError as e:
+            messagebox.showerror('Error', f'Failed to save profile: {str(e)}')
+            return
+        self._flash_status(f'Profile saved to {path}', ms=5000)
+
+    def _on_settings_changed(self, changed):
+        # Another PyNote instance may have changed the theme
+        if 'theme' in changed and changed['theme'] != self.current_theme_name:
+            self.current_theme_name = changed['theme']
+            self.dark_mode.set(self.current_theme_name.lower() == 'dark')
+            self._apply_theme()
+        if 'tab_memory_budget' in changed:
+            self._enforce_budget()
+
+    def _on_focus_in(self, event):
+        if event.widget is self:
+            self.settings.refresh()
+
+    def _add_document(self, path=None):
+        """Add a tab for a document without loading it."""
+        doc = tabs.Document(path, number=0 if path else next(self._untitled))
+        doc.tab = ttk.Frame(self.tabbar, height=0)
+        self.tabbar.add(doc.tab, text=doc.name)
+        self.docs.append(doc)
+        return doc
+
+    def select_document(self, doc):
+        """Show a document, creating or reloading its editor if needed."""
+        self.tabbar.select(doc.tab)
+        self._activate(doc)
+
+    def _on_tab_changed(self, event):
+        selected = self.tabbar.select()
+        for doc in self.docs:
+            if str(doc.tab) == selected:
+                self._activate(doc)
+                return
+
+    def _on_tab_middle_click(self, event):
+        try:
+            index = self.tabbar.index(f'@{event.x},{event.y}')
+        except tk.TclError:
+            return
+        self.close_tab(self.docs[index])
+
+    def _cycle_tab(self, step):
+        index = (self.docs.index(self.doc) + step) % len(self.docs)
+        self.select_document(self.docs[index])
+
+    def _activate(self, doc):
+        if doc is self.doc:
+            return
+        if self.doc is not None and self.doc.loaded:
+            self.doc.editor.pack_forget()
+        self.doc = doc
+        doc.touch()
+        if doc.swap_job is not None:
+            # Shown again before its swap snapshot was written: keep it loaded
+            self._cancel_swap(doc)
+        if not doc.loaded:
+            self._create_editor(doc)
+            doc.editor.pack()
+            self._load_content(doc)
+        else:
+            doc.editor.pack()
+        self.find_bar.set_controller(doc.search)
+        self.follow_tail.set(doc.follow)
+        if doc.huge is not None and self.find_bar.visible:
+            self.find_bar.hide()
+        self._update_title()
+        self._gutter_layout = None
+        self._update_minimap()
+        self.refresh.request('preview')
+        self._on_yscroll(*doc.text.yview())
+        self._update_status()
+        doc.text.focus_set()
+        self._enforce_budget()
+
+    def _update_tab(self, doc):
+        if doc in self.docs:
+            self.tabbar.tab(doc.tab, text=('• ' if doc.modified else '') + doc.name)
+
+    def _update_title(self):
+        doc = self.doc
+        if doc.path is None:
             self.title(APP_TITLE)
-            self._update_status()
+        elif doc.huge is not None:
+            self.title(f"{APP_TITLE} - {doc.path} (read-only)")
+        else:
+            self.title(f"{APP_TITLE} - {doc.path}")
 
-    def open_file(self):
-        if not self._confirm_discard():
+    def _is_blank(self, doc):
+        """True for an untouched, empty untitled tab that a file may replace."""
+        return (doc.path is None and doc.loaded and doc.loader is None and doc.swap_path is None
+                and not doc.modified and doc.stats.chars == 0 and doc.stats.line_count == 1)
+
+    def close_tab(self, doc=None):
+        """Close a tab (the active one by default) after offering to save it."""
+        doc = doc or self.doc
+        if not self._confirm_discard(doc):
+            return False
+        # Let a save started from the prompt finish before the buffer goes
+        for job in [j for j in self._save_jobs if j.doc is doc]:
+            job.wait()
+        self._poll_saves()
+        if doc.modified:
+            return False
+        self._close_document(doc)
+        return True
+
+    def _close_document(self, doc):
+        if doc is self.doc:
+            others = [d for d in self.docs if d is not doc]
+            following = max(others, key=lambda d: d.last_used) if others else None
+            if following is None:
+                following = self._add_document()
+            self.select_document(following)
+        self.docs.remove(doc)
+        self._release(doc, discard_journal=True)
+        self.tabbar.forget(doc.tab)
+        doc.tab.destroy()
+
+    def _release(self, doc, discard_journal):
+        """Stop everything a document runs and free its editor."""
+        self._persist_history(doc)
+        if self.watcher is not None and doc.path is not None:
+            self.watcher.unwatch(doc.path)
+        if doc.loader is not None:
+            doc.loader.cancel()
+        self._close_huge(doc)
+        if doc.swap_job is not None:
+            self._cancel_swap(doc)
+        self._remove_swap(doc)
+        if doc.journal is not None:
+            doc.journal.close(discard=discard_journal)
+            doc.journal = None
+        if doc.loaded:
+            self._destroy_editor(doc)
+
+    def _destroy_editor(self, doc):
+        """Stop a loaded document's highlighter, search and spell checker; destroy its editor."""
+        doc.highlighter.close()
+        doc.search.close()
+        if doc.spell is not None:
+            doc.spell.close()
+        doc.detach().destroy()
+
+    def _enforce_budget(self):
+        """Unload least recently used tabs while over the memory budget."""
+        budget = self.settings.get('tab_memory_budget', 0)
+        for doc in tabs.pick_unload(self.docs, budget, self.doc):
+            self._unload(doc)
+
+    def _unload(self, doc):
+        """Drop an inactive document's editor; it reloads when selected."""
+        # An untitled buffer has no file to reload from, even when unmodified
+        if not doc.modified and (doc.path is not None or not doc.stats.chars):
+            # Its undo history waits on disk too, until the first undo
+            if self._persist_history(doc):
+                doc.history = None
+            self._destroy_editor(doc)
             return
-        path = filedialog.askopenfilename(
+        # A modified buffer is written to a swap snapshot in the background
+        # and its editor destroyed once that has succeeded
+        doc.swap_path = os.path.join(tabs.swap_dir(self._config_dir), f'{id(doc)}.swap')
+        doc.swap_job = saver.SaveJob(doc.swap_path, doc.editor.softbreaks.chunks(), 'utf-8', '\n')
+        doc.swap_job.start()
+        if self._swap_poll_id is None:
+            self._swap_poll_id = self.after(50, self._poll_swaps)
+
+    def _poll_swaps(self):
+        self._swap_poll_id = None
+        waiting = False
+        for doc in self.docs:
+            job = doc.swap_job
+            if job is None:
+                continue
+            if not job.done:
+                waiting = True
+                continue
+            doc.swap_job = None
+            if job.status == 'error':
+                # Keep the buffer in memory rather than risk losing it
+                self._remove_swap(doc)
+                self._flash_status(f'Could not unload {doc.name}: {job.error}')
+            elif doc is not self.doc and doc.loaded:
+                self._destroy_editor(doc)
+        if waiting:
+            self._swap_poll_id = self.after(50, self._poll_swaps)
+
+    def _cancel_swap(self, doc):
+        doc.swap_job.wait()
+        doc.swap_job = None
+        self._remove_swap(doc)
+
+    def _remove_swap(self, doc):
+        if doc.swap_path is not None:
+            try:
+                os.unlink(doc.swap_path)
+            except OSError:
+                pass
+            doc.swap_path = None
+
+    def new_file(self):
+        """Open an empty untitled tab."""
+        self.select_document(self._add_document())
+
+    def open_file(self):
+        paths = filedialog.askopenfilenames(
             filetypes=[('Text Files', '*.txt;*.md;*.py'), ('All Files', '*.*')]
         )
-        if path:
+        if not paths:
+            return
+        # Only the last file is loaded now; the others load when selected
+        for path in paths[:-1]:
+            self.load_file(path, activate=False)
+        self.load_file(paths[-1])
+
+    def load_file(self, path, activate=True):
+        """
+        Open a file in a tab; its content streams in when the tab is shown.
+
+        Returns:
+            tabs.Document: The document for the file
+        """
+        for doc in self.docs:
+            if doc.path and os.path.abspath(doc.path) == os.path.abspath(path):
+                if activate:
+                    self.select_document(doc)
+                return doc
+        blank = self.doc if activate and self.doc is not None and self._is_blank(self.doc) else None
+        doc = self._add_document(path)
+        if activate:
+            self.select_document(doc)
+            if blank is not None:
+                self._close_document(blank)
+        return doc
+
+    def _load_content(self, doc):
+        """Fill a freshly created editor from its swap snapshot, file, or nothing."""
+        if doc.swap_path is not None:
+            self._start_loader(doc, doc.swap_path, from_swap=True)
+            return
+        if doc.path is None:
+            self._journal_begin(doc, None)
+            return
+        if doc in self._session_checks:
+            # Shown before the background check got to it
+            self._apply_session_check(doc, session.check(doc.path, self._session_checks[doc].get('fingerprint')))
+        # The file itself is the journal's base once loading finishes
+        self._journal_end(doc)
+        try:
+            size = os.path.getsize(doc.path)
+        except OSError:
+            size = 0
+        if size >= self.settings.get('huge_file_threshold', 0) > 0 and self._open_huge(doc):
+            return
+        self._start_loader(doc, doc.path)
+
+    def _start_loader(self, doc, path, from_swap=False):
+        """Stream a file into a document's editor in the background."""
+        # Highlight once, after loading, rather than chasing every chunk
+        doc.highlighter.set_lexer(None)
+        # Loading is not an undoable edit
+        doc.history.enabled = False
+        doc.loader = loader.FileLoader(
+            self, doc.text, path,
+            on_progress=lambda fraction: self._on_load_progress(doc),
+            on_done=lambda error, cancelled: self._on_load_done(doc, error, cancelled),
+            softbreaks=doc.editor.softbreaks,
+        )
+        doc.loader.from_swap = from_swap
+        doc.loader.start()
+
+    def _open_huge(self, doc):
+        """Open a document in the huge file viewer; False if its encoding needs a full load."""
+        encoding = utils.detect_encoding(doc.path)
+        if not hugefile.supported(encoding):
+            self._flash_status(f'{doc.name} is {encoding}, which the huge file viewer cannot show; '
+                               'loading it in full', ms=6000)
+            return False
+        try:
+            cache_dir = self._config_dir / 'line_index'
+            doc.huge = hugefile.HugeFileView(doc.text, doc.path, encoding, cache_dir=cache_dir)
+        except Exception as e:
+            doc.path = None
+            self._update_tab(doc)
+            messagebox.showerror('Error', f'Failed to open file: {str(e)}')
+            return True
+        doc.editor.view = doc.huge
+        doc.encoding = encoding
+        self._add_recent(doc)
+        doc.text.configure(wrap='none')
+        doc.history.enabled = False
+        self._set_spell(doc, False)
+        doc.huge.measure_rows(self._linespace())
+        doc.huge.show(1)
+        if self.find_bar.visible and doc is self.doc:
+            self.find_bar.hide()
+        self._poll_huge_index(doc)
+        return True
+
+    def _poll_huge_index(self, doc):
+        # Keep scrollbar, gutter and status current while the index builds
+        if doc.huge is None:
+            return
+        if doc is self.doc:
+            self._on_yscroll(0, 1)
+            self._update_status()
+        if not doc.huge.index.complete.is_set():
+            self.after(200, self._poll_huge_index, doc)
+
+    def _close_huge(self, doc):
+        if doc.huge is None:
+            return
+        doc.huge.close()
+        doc.huge = None
+        if doc.loaded:
+            doc.editor.view = None
+            doc.text.configure(state='normal', wrap='word')
+            doc.text.delete('1.0', tk.END)
+            doc.history.enabled = True
+            doc.text.edit_reset()
+            doc.text.edit_modified(False)
+
+    def _cancel_loading(self, doc=None):
+        doc = doc or self.doc
+        # A swap snapshot is the only copy of its buffer: always finish it
+        if doc.loader is not None and not doc.loader.from_swap:
+            doc.loader.cancel()
+
+    def _restore_session(self):
+        """
+        Reopen the files of the last session, the one that was shown first.
+
+        Only the shown file is checked now; the others are checked in the
+        background and then loaded one by one while the memory budget allows.
+
+        Returns:
+            bool: False if there was nothing to restore
+        """
+        if not self.settings.get('restore_session', True):
+            return False
+        entries, active = session.load(self._config_dir)
+        # The shown file, or the next one that still exists
+        shown = None
+        missing = set()
+        for i in list(range(active, len(entries))) + list(range(active)):
+            status = session.check(entries[i]['path'], entries[i].get('fingerprint'))
+            if status != session.MISSING:
+                shown = i
+                break
+            missing.add(i)
+        if shown is None:
+            return False
+        for i, entry in enumerate(entries):
+            if i in missing:
+                continue
+            doc = self._add_document(entry['path'])
+            doc.encoding = entry.get('encoding') or doc.encoding
+            if i == shown:
+                visible = doc
+                self._apply_session_check(doc, status, entry)
+            else:
+                self._session_checks[doc] = entry
+        self.select_document(visible)
+        if self._session_checks:
+            self._session_verifier = session.Verifier(self._session_checks.values())
+            self._session_verifier.start()
+            self.after(50, self._poll_session)
+        return True
+
+    def _apply_session_check(self, doc, status, entry=None):
+        """Act on a restored document's fingerprint check."""
+        entry = entry or self._session_checks.pop(doc)
+        if status == session.MISSING:
+            # A tab already shown reports the missing file when it loads
+            if not doc.loaded:
+                self._close_document(doc)
+                self._flash_status(f'{doc.name} was not reopened: the file no longer exists', ms=6000)
+        elif status == session.UNCHANGED:
+            # Positions are only trusted on the version they were saved for
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = f.read()
-                self.text.delete('1.0', tk.END)
-                self.text.insert('1.0', data)
-                self._filepath = path
-                self.title(f"{APP_TITLE} - {path}")
-                self._update_status()
-            except Exception as e:
-                messagebox.showerror('Error', f'Failed to open file: {str(e)}')
-
-    def save_file(self):
-        if self._filepath:
+                line, col = (int(n) for n in entry['cursor'])
+                top = entry.get('top')
+                doc.restore = (line, col, int(top) if top else None)
+            except (KeyError, TypeError, ValueError):
+                doc.restore = None
+
+    def _poll_session(self):
+        verifier = self._session_verifier
+        if not verifier.done:
+            self.after(50, self._poll_session)
+            return
+        self._session_verifier = None
+        for doc in list(self._session_checks):
+            if doc in self.docs:
+                self._apply_session_check(doc, verifier.results.get(doc.path, session.CHANGED))
+            else:
+                del self._session_checks[doc]
+        self._preload = [doc for doc in self.docs if doc.path is not None and not doc.loaded]
+        self._preload_next()
+
+    def _preload_next(self):
+        """Load the next restored tab in the background, one at a time."""
+        if any(doc.loader is not None for doc in self.docs):
+            return    # called again when that load finishes
+        budget = self.settings.get('tab_memory_budget', 0)
+        threshold = self.settings.get('huge_file_threshold', 0)
+        while self._preload:
+            doc = self._preload.pop(0)
+            if doc not in self.docs or doc.loaded:
+                continue
             try:
-                with open(self._filepath, 'w', encoding='utf-8') as f:
-                    f.write(self.text.get('1.0', tk.END))
-                self.text.edit_modified(False)
-                messagebox.showinfo('Saved', 'File saved successfully')
-            except Exception as e:
-                messagebox.showerror('Error', f'Failed to save file: {str(e)}')
+                size = os.path.getsize(doc.path)
+            except OSError:
+                continue
+            if 0 < threshold <= size:
+                continue    # the huge file viewer opens when the tab is shown
+            # Assume 40 characters a line until the file is loaded
+            needed = tabs.estimate_memory(size, size // 40)
+            if budget > 0 and sum(d.memory_estimate() for d in self.docs) + needed > budget:
+                self._preload = []
+                return
+            self._create_editor(doc)
+            self._load_content(doc)
+            return
+
+    def _on_load_progress(self, doc):
+        if doc.restore is not None:
+            self._apply_restore(doc)
+        if doc is self.doc:
+            self._update_status()
+
+    def _apply_restore(self, doc, final=False):
+        """
+        Put a restored document's cursor and view back where they were.
+
+        While the file streams in this waits only until the lines of the
+        saved view have arrived, not for the whole file.
+        """
+        line, col, top = doc.restore
+        text = doc.text
+        softbreaks = doc.editor.softbreaks
+        widget_line = softbreaks.widget_line if softbreaks else (lambda n: n)
+        loaded = int(text.index('end-1c').split('.')[0])
+        if not final and loaded <= widget_line(max(line, top or 0)) + RESTORE_LINES:
+            return
+        doc.restore = None
+        text.mark_set('insert', f'{widget_line(min(line, loaded))}.{col}')
+        if top:
+            text.yview(f'{widget_line(min(top, loaded))}.0')
+        else:
+            text.see('insert')
+        if doc is self.doc:
+            self._on_yscroll(*text.yview())
+
+    def _session_entry(self, doc):
+        """What the session remembers about an open file."""
+        entry = {'path': os.path.abspath(doc.path), 'encoding': doc.encoding}
+        position = doc.restore
+        if doc.loaded and doc.loader is None and doc.huge is None:
+            text = doc.text
+            line, col = (int(n) for n in text.index('insert').split('.'))
+            top = int(text.index('@0,0').split('.')[0])
+            softbreaks = doc.editor.softbreaks
+            if softbreaks:
+                line, col = softbreaks.logical_position(line, col)
+                top = softbreaks.logical_line(top)
+            position = (line, col, top)
+        elif position is None and doc.cursor is not None:
+            # Unloaded: the cursor is remembered, the view only as a fraction
+            line, col = (int(n) for n in doc.cursor.split('.'))
+            position = (line, col, None)
+        if position is not None:
+            entry['cursor'] = list(position[:2])
+            entry['top'] = position[2]
+        fingerprint = session.fingerprint(doc.path)
+        if fingerprint is not None:
+            entry['fingerprint'] = fingerprint
+        return entry
+
+    def _save_session(self):
+        """Remember the open files for the next start."""
+        docs = [doc for doc in self.docs if doc.path is not None]
+        active = docs.index(self.doc) if self.doc in docs else 0
+        session.save(self._config_dir, [self._session_entry(doc) for doc in docs], active)
+
+    def _on_load_done(self, doc, error, cancelled):
+        ld = doc.loader
+        doc.loader = None
+        if doc not in self.docs:
+            return
+        text = doc.text
+        doc.history.enabled = True
+        if ld.from_swap:
+            # The buffer keeps its encoding, line ending and journal
+            if error is not None:
+                messagebox.showerror('Error', f'Failed to reload {doc.name}: {str(error)}')
+            else:
+                self._remove_swap(doc)
+            doc.sync_modified()
+        else:
+            doc.encoding, doc.newline = ld.encoding, ld.newline
+            text.edit_modified(False)
+            if error is not None:
+                doc.path = None
+                self._new_history(doc)
+                messagebox.showerror('Error', f'Failed to open file: {str(error)}')
+            elif cancelled:
+                # Never let a partial buffer overwrite the original on save
+                doc.path = None
+                self._new_history(doc)
+                self._flash_status(f'Loading cancelled; the partial text is not linked to {ld.path}', ms=6000)
+            else:
+                self._journal_begin(doc, doc.path, doc.path, saver.file_stamp(doc.path))
+                self._watch(doc)
+                self._add_recent(doc)
+                # A tab reloaded after an unload keeps its history as long
+                # as the file is still the version it was loaded from
+                try:
+                    st = os.stat(doc.path)
+                    stat = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    stat = None
+                if stat is None or doc.history.base_stat != stat:
+                    self._new_history(doc, stat)
+                if ld.fallback:
+                    self._flash_status('Invalid UTF-8 found; part of the file was read as Latin-1 and will be saved as UTF-8', ms=6000)
+        if error is None and not doc.editor.softbreaks:
+            doc.highlighter.set_lexer(highlight.lexer_for_path(doc.path))
+        if ld.soft_breaks and doc is self.doc:
+            self._flash_status('Long lines are split for display; they are saved unchanged', ms=6000)
+        if doc.cursor is not None:
+            text.mark_set('insert', doc.cursor)
+            text.yview_moveto(doc.yview)
+        if doc.restore is not None:
+            if error is None and not cancelled:
+                self._apply_restore(doc, final=True)
+            doc.restore = None
+        self._update_tab(doc)
+        if doc is self.doc:
+            self._update_title()
+            self._update_status()
+        self._enforce_budget()
+        if self._preload:
+            self.after_idle(self._preload_next)
+
+    def save_file(self, doc=None):
+        doc = doc or self.doc
+        if doc.huge is not None:
+            messagebox.showinfo('Read-only', 'Huge files are opened read-only.')
+            return
+        if doc.path:
+            self._start_save(doc, doc.path)
         else:
-            self.save_as()
+            self.save_as(doc)
 
-    def save_as(self):
+    def save_as(self, doc=None):
+        doc = doc or self.doc
+        if doc.huge is not None:
+            messagebox.showinfo('Read-only', 'Huge files are opened read-only.')
+            return
         path = filedialog.asksaveasfilename(
             defaultextension='.txt',
             filetypes=[('Text Files', '*.txt;*.md;*.py'), ('All Files', '*.*')]
         )
         if path:
-            try:
-                with open(path, 'w', encoding='utf-8') as f:
-                    f.write(self.text.get('1.0', tk.END))
-                self._filepath = path
-                self.title(f"{APP_TITLE} - {path}")
-                self.text.edit_modified(False)
-                messagebox.showinfo('Saved', 'File saved successfully')
-            except Exception as e:
-                messagebox.showerror('Error', f'Failed to save file: {str(e)}')
+            self._start_save(doc, path)
+
+    def _snapshot(self, doc):
+        """The buffer as chunks, from the editor or the swap snapshot."""
+        if doc.loaded:
+            # The buffer's leaves are immutable, so listing them is the
+            # whole snapshot (soft breaks are cut out between leaves)
+            return doc.editor.softbreaks.chunks()
+        if doc.swap_job is not None:
+            doc.swap_job.wait()
+        return [utils.read_text(doc.swap_path)[0]]
+
+    def _start_save(self, doc, path):
+        if doc.loader is not None:
+            self._flash_status('Still loading - save when loading finishes')
+            return
+        if not doc.loaded and doc.swap_path is None:
+            return    # unloaded and unmodified: the file is up to date
+        # Only the snapshot happens on the UI thread; hashing and writing
+        # run in the background
+        chunks = self._snapshot(doc)
+        doc.modified = False
+        # Edits from here on apply to the file being written; its stamp is
+        # recorded once the save is done
+        self._journal_begin(doc, path, path)
+        previous = None
+        if doc.save_record is not None and doc.save_record[0] == path:
+            previous = doc.save_record[1:]
+        job = saver.SaveJob(path, chunks, doc.encoding, doc.newline, previous=previous)
+        job.doc = doc
+        job.start()
+        doc.saving += 1
+        self._save_jobs.append(job)
+        self._flash_status('Saving...', ms=0)
+        self.after(20, self._poll_saves)
+
+    def _poll_saves(self):
+        for job in [j for j in self._save_jobs if j.done]:
+            self._save_jobs.remove(job)
+            self._on_save_done(job)
+        if self._save_jobs:
+            self.after(20, self._poll_saves)
+
+    def _on_save_done(self, job):
+        doc = job.doc
+        doc.saving -= 1
+        current = doc in self.docs
+        if job.status == 'error':
+            if current:
+                doc.modified = True
+                # The file was left untouched, so journal the whole buffer
+                self._journal_begin(doc, doc.path, None)
+                if doc.journal is not None and doc.loaded:
+                    doc.journal.record(1, 1, ''.join(doc.editor.softbreaks.chunks()))
+                self._update_tab(doc)
+            self._flash_status('')
+            messagebox.showerror('Error', f'Failed to save file: {str(job.error)}')
+            return
+        doc.save_record = (job.path, job.digest, job.stamp)
+        if self.profiler is not None:
+            # Hashing and writing run in the worker, outside the wrapped methods
+            self.profiler.add('save_worker', job.seconds * 1000)
+        if current:
+            if self.watcher is not None:
+                if doc.path is not None and doc.path != job.path:
+                    self.watcher.unwatch(doc.path)
+                # Our own write is not an external change
+                self.watcher.watch(job.path, job.stamp)
+            doc.path = job.path
+            doc.tail = None
+            if doc.journal is not None and doc.saving == 0:
+                # The journal begun for this save now has a known base
+                doc.journal.set_base_stamp(job.stamp)
+            if doc.loaded and doc.huge is None and not doc.modified and doc.saving == 0:
+                self._watch(doc, job.stamp)
+            self._add_recent(doc)
+            if not doc.loaded and not doc.modified:
+                # Saved straight from the swap snapshot; reload from the file
+                self._remove_swap(doc)
+            if doc.loaded and doc.huge is None and not doc.editor.softbreaks:
+                lexer = highlight.lexer_for_path(job.path)
+                if lexer is not doc.highlighter.lexer:
+                    doc.highlighter.set_lexer(lexer)
+            self._update_tab(doc)
+            if doc is self.doc:
+                self._update_title()
+        name = os.path.basename(job.path)
+        if job.status == 'unchanged':
+            self._flash_status(f'No changes to save in {name}')
+        else:
+            self._flash_status(f'Saved {name} ({job.bytes_written:,} bytes in {job.seconds * 1000:.0f} ms)')
+
+    def _add_recent(self, doc):
+        """Record a file in the recent-files list with its current details."""
+        stamp = saver.file_stamp(doc.path)
+        if stamp is None:
+            return
+        lines = None
+        if doc.huge is None and doc.loaded:
+            lines = doc.editor.line_count
+        self.recent.add(doc.path, size=stamp[0], mtime=stamp[1], encoding=doc.encoding, lines=lines)
+
+    def _watch(self, doc, stamp=None):
+        """Watch a loaded document's file and remember where its text ends."""
+        stamp = stamp or saver.file_stamp(doc.path)
+        if stamp is None:
+            return
+        if self.watcher is not None:
+            self.watcher.watch(doc.path, stamp)
+        try:
+            doc.tail = watcher.Tail(doc.path, doc.encoding, stamp[0])
+        except (OSError, LookupError):
+            doc.tail = None
+
+    def _poll_watcher(self):
+        for path, stamp in self.watcher.changes():
+            for doc in self.docs:
+                if doc.path is not None and os.path.abspath(doc.path) == path:
+                    self._on_file_changed(doc, stamp)
+        self.after(WATCH_POLL_MS, self._poll_watcher)
+
+    def _on_file_changed(self, doc, stamp):
+        """Follow, reload or flag a document whose file another program changed."""
+        if doc.saving or doc.huge is not None or doc.loader is not None:
+            return
+        if doc.save_record is not None and stamp == doc.save_record[2]:
+            return    # our own save, seen before the watcher was told about it
+        if stamp is None:
+            self._flash_status(f'{doc.name} was deleted or moved on disk', ms=6000)
+            return
+        if not doc.loaded:
+            doc.tail = None
+            if doc.modified:
+                self._flash_status(f'{doc.name} was changed by another program', ms=6000)
+            # An unmodified tab reads the new version when it is shown
+            return
+        if doc.modified:
+            if messagebox.askyesno(
+                'File changed',
+                f'{doc.name} was changed by another program. Reload it and lose your changes?'
+            ):
+                self._reload(doc)
+            return
+        appended = None
+        if doc.tail is not None and not doc.editor.softbreaks.active:
+            appended = doc.tail.read()
+        if appended is None:
+            self._reload(doc)
+        elif appended:
+            self._append(doc, appended)
+
+    def _append(self, doc, appended):
+        """Add text another program appended to an unmodified document's file."""
+        text = doc.text
+        follow = doc.follow or text.compare('insert', '==', 'end-1c')
+        doc.history.enabled = False
+        try:
+            text.insert('end-1c', appended)
+        finally:
+            doc.history.enabled = True
+        # The earlier steps may end on the line that grew
+        text.edit_reset()
+        text.edit_modified(False)
+        # The journal replays onto the file, which now has the new text
+        self._journal_begin(doc, doc.path, doc.path, saver.file_stamp(doc.path))
+        if follow:
+            text.mark_set('insert', 'end-1c')
+            text.see('insert')
+        if doc is self.doc:
+            self._update_status()
+
+    def _reload(self, doc):
+        """Load a document's file again, keeping the cursor and scroll position."""
+        text = doc.text
+        doc.cursor = 'end-1c' if doc.follow else text.index('insert')
+        doc.yview = 1.0 if doc.follow else text.yview()[0]
+        doc.tail = None
+        self._journal_end(doc)
+        doc.history.enabled = False
+        text.delete('1.0', 'end')
+        self._start_loader(doc, doc.path)
+
+    def _flash_status(self, note, ms=2500):
+        """Show a note in the status bar, cleared after ms (0 keeps it)."""
+        self._status_note = note
+        if self._status_note_id is not None:
+            self.after_cancel(self._status_note_id)
+            self._status_note_id = None
+        if note and ms:
+            self._status_note_id = self.after(ms, self._flash_status, '')
+        self._update_status()
+
+    def _on_text_change(self, doc, first, old_last, new_last):
+        # Recount only the lines touched by the edit
+        text = doc.editor.buffer.lines(first, new_last)
+        doc.stats.replace_lines(first, old_last, text)
+        doc.summary.replace_lines(first, old_last, text)
+        if doc.journal is not None and doc.loader is None and doc.huge is None:
+            softbreaks = doc.editor.softbreaks
+            if softbreaks.active:
+                # The journal replays onto the file, which has no soft breaks
+                start, end = softbreaks.widget_range(first, new_last)
+                text = softbreaks.plain(doc.editor.buffer.lines(start, end), start)
+                first, old_last = softbreaks.edit
+            doc.journal.record(first, old_last, text)
+        if doc is self.doc:
+            self.refresh.request('gutter')
+            self.refresh.request('minimap')
+            if self.show_preview.get():
+                self.refresh.request('preview')
+
+    def _journal_begin(self, doc, doc_path, base_path=None, base_stamp=None):
+        if doc.journal is None:
+            if not self.settings.get('autosave'):
+                return
+            doc.journal = autosave.EditJournal(self._journal_dir, self.settings.get('autosave_interval', 300))
+            doc.journal.start()
+        doc.journal.begin(doc_path, base_path, base_stamp)
+
+    def _journal_end(self, doc):
+        if doc.journal is not None:
+            doc.journal.end()
+
+    def _offer_recovery(self):
+        """Offer to replay edit journals left behind by a crash."""
+        found = autosave.find_recoverable(self._journal_dir)
+        if not found:
+            return
+        names = ', '.join(header.get('path') or 'an untitled document' for _, header, _ in found)
+        if not messagebox.askyesno(
+            'Recover unsaved changes',
+            f'PyNote did not shut down cleanly. Recover unsaved changes to {names}?'
+        ):
+            for journal_path, _, _ in found:
+                os.unlink(journal_path)
+            return
+        blank = self.doc if self._is_blank(self.doc) else None
+        recovered = []
+        for journal_path, header, entries in found:
+            if autosave.base_changed(header) and not messagebox.askyesno(
+                'Recover unsaved changes',
+                f'{header["base"]} was changed after PyNote stopped. The edits were made to '
+                'the old version, so the recovered text may be wrong. Recover it anyway?'
+            ):
+                os.unlink(journal_path)
+                continue
+            doc = self._add_document(header.get('path'))
+            base = ''
+            if header.get('base'):
+                try:
+                    base, doc.encoding, doc.newline = utils.read_text(header['base'])
+                except OSError:
+                    base = ''
+            os.unlink(journal_path)
+            # The recovered text loads through a swap snapshot like any
+            # modified tab, once its tab is shown
+            doc.swap_path = os.path.join(tabs.swap_dir(self._config_dir), f'{id(doc)}.swap')
+            saver.write_atomic(doc.swap_path, [autosave.replay(base, entries)], 'utf-8', '\n')
+            doc.modified = True
+            self._update_tab(doc)
+            # Carry the recovered edits over into this session's journal
+            base_path = header.get('base')
+            self._journal_begin(doc, doc.path, base_path, base_path and saver.file_stamp(base_path))
+            if doc.journal is not None:
+                for entry in entries:
+                    doc.journal.record(*entry)
+            recovered.append(doc)
+        if not recovered:
+            return
+        self.select_document(recovered[0])
+        if blank is not None:
+            self._close_document(blank)
+
+    def _on_exit(self):
+        for doc in list(self.docs):
+            if not self._confirm_discard(doc):
+                return
+        # Docs the user chose not to save stay modified; only the saves
+        # that were actually started can keep the app open
+        jobs = list(self._save_jobs)
+        for job in jobs:
+            job.wait()
+        self._poll_saves()
+        if any(job.status == 'error' for job in jobs):
+            return    # a save failed; its error has been shown
+        self._save_session()
+        for doc in self.docs:
+            self._release(doc, discard_journal=True)
+        tabs.remove_swap_dir(self._config_dir)
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.files_panel is not None:
+            self.files_panel.close()
+        self.settings.flush()
+        self.destroy()
 
     def _update_status(self, event=None):
+        doc = self.doc
+        if doc is None or not doc.loaded:
+            return
         idx = self.text.index(tk.INSERT).split('.')
         line = idx[0]
         col = idx[1]
-        content = self.text.get('1.0', 'end-1c')
-        try:
-            words = utils.count_words(content)
-            chars = utils.count_chars(content)
-        except Exception:
-            # Fallback in unlikely event utils isn't available
-            words = len(content.split())
-            chars = len(content)
-        self.status.set(f'Ln {line}, Col {col} | Words: {words} | Chars: {chars}')
-        # Keep gutter in sync with edits/cursor moves
-        self._update_gutter()
-
-    def _confirm_discard(self):
-        if self.text.edit_modified():
+        words = doc.stats.words
+        chars = doc.stats.chars
+        softbreaks = doc.editor.softbreaks
+        if softbreaks and doc.huge is None:
+            line, col = softbreaks.logical_position(int(line), int(col))
+            chars -= len(softbreaks.lines)
+        status = f'Ln {line}, Col {col} | Words: {words} | Chars: {chars}'
+        if doc.huge is not None:
+            index = doc.huge.index
+            status = f'Ln {doc.huge.top + int(line) - 1}, Col {col} | Lines: {index.line_count} | Read-only'
+            if not index.complete.is_set():
+                status += f' | Indexing {index.progress:.0%}'
+        if doc.loader is not None:
+            status += f' | Loading {doc.loader.progress:.0%}'
+            if not doc.loader.from_swap:
+                status += ' (Esc to cancel)'
+        newline = {'\n': 'LF', '\r\n': 'CRLF', '\r': 'CR'}.get(doc.newline, 'LF')
+        status += f' | {doc.encoding.upper()} | {newline}'
+        if self._status_note:
+            status += f' | {self._status_note}'
+        self.status.set(status)
+
+    def _confirm_discard(self, doc=None):
+        doc = doc or self.doc
+        self._cancel_loading(doc)
+        if doc.modified:
             resp = messagebox.askyesnocancel(
                 'Unsaved changes',
-                'You have unsaved changes. Save before continuing?'
+                f'{doc.name} has unsaved changes. Save before continuing?'
             )
             if resp is None:
                 return False
             if resp:
-                self.save_file()
+                self.save_file(doc)
+                # Still modified if the save dialog was cancelled
+                return not doc.modified
         return True
 
 
 if __name__ == '__main__':
     app = PyNoteApp()
     app.mainloop()
-
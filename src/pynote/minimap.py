@@ -0,0 +1,215 @@
+"""
+Minimap for PyNote.
+
+The minimap is drawn from a ``LineSummary`` - the length and indentation of
+every line in two compact arrays, updated from edit notifications like
+``stats.TextStats`` - never from the text itself. When the file has more
+lines than the canvas has pixel rows, lines are bucketed into rows and each
+row is drawn from a few sampled lines, so a redraw costs time proportional
+to the canvas height, not to the file length.
+"""
+
+from array import array
+import tkinter as tk
+
+
+# Longest length/indent stored per line; the canvas is far narrower anyway
+_CAP = 0xFFFF
+# Lines sampled per pixel row when lines are bucketed
+_SAMPLES = 4
+
+# Moves the pooled row items in one Tcl round-trip, like the gutter does
+_MINIMAP_TCL = r'''
+proc pynote_minimap_place {canvas items coords} {
+    set n 0
+    foreach {x0 y0 x1 y1} $coords {
+        set id [lindex $items $n]
+        $canvas coords $id $x0 $y0 $x1 $y1
+        $canvas itemconfigure $id -state normal
+        incr n
+    }
+    foreach id [lrange $items $n end] {
+        $canvas itemconfigure $id -state hidden
+    }
+}
+'''
+
+
+def _measure(line):
+    """Return (indent, length) of a line, counting a tab as 4 columns."""
+    body = line.lstrip(' \t')
+    prefix = line[:len(line) - len(body)]
+    indent = len(prefix) + 3 * prefix.count('\t')
+    return min(indent, _CAP), min(indent + len(body), _CAP)
+
+
+class LineSummary:
+    """
+    Per-line indentation and length, kept in ``array`` storage.
+
+    Lines are numbered from 1 like Tk text indices.
+    """
+
+    def __init__(self, text=''):
+        self.reset(text)
+
+    def reset(self, text):
+        """
+        Rebuild the summary from a complete buffer.
+
+        Args:
+            text: Full buffer content (without Tk's trailing newline)
+        """
+        self.indents = array('H')
+        self.lengths = array('H')
+        self.version = 0
+        self._store(0, 0, text)
+
+    def replace_lines(self, first, last, text):
+        """
+        Replace lines ``first..last`` with the lines of ``text``.
+
+        Args:
+            first: First replaced line (1-based)
+            last: Last replaced line (inclusive, 1-based)
+            text: New content for that range, lines joined with newlines
+        """
+        first = max(1, min(first, len(self.lengths)))
+        last = max(first, min(last, len(self.lengths)))
+        self._store(first - 1, last, text)
+
+    def _store(self, start, stop, text):
+        measured = [_measure(line) for line in text.split('\n')]
+        self.indents[start:stop] = array('H', [indent for indent, _ in measured])
+        self.lengths[start:stop] = array('H', [length for _, length in measured])
+        self.version += 1
+
+    @property
+    def line_count(self):
+        """Number of lines in the buffer."""
+        return len(self.lengths)
+
+    def rows(self, count):
+        """
+        Downsample the lines to ``count`` rows.
+
+        Each row covers an equal share of the lines and is drawn from up to
+        ``_SAMPLES`` of them: the smallest indent and the longest length.
+
+        Args:
+            count: Number of rows (at most the number of lines)
+
+        Returns:
+            list: ``(indent, length)`` per row
+        """
+        lines = len(self.lengths)
+        count = max(0, min(count, lines))
+        out = []
+        for row in range(count):
+            start = row * lines // count
+            stop = min((row + 1) * lines // count, start + _SAMPLES)
+            out.append((min(self.indents[start:stop]), max(self.lengths[start:stop])))
+        return out
+
+
+class Minimap:
+    """
+    Canvas showing a zoomed-out outline of the buffer and the visible region.
+
+    Clicking or dragging scrolls so the pointer is at the centre of the view,
+    through ``command`` - the same callback the scrollbar uses.
+
+    Args:
+        parent: Parent widget
+        command: Called like a scrollbar command, with ``('moveto', fraction)``
+    """
+
+    WIDTH = 80
+    LINE_PX = 2         # pixel rows per line while the whole file fits
+    CHARS_PER_PX = 2
+
+    def __init__(self, parent, command):
+        self.command = command
+        self.canvas = tk.Canvas(parent, width=self.WIDTH, highlightthickness=0, cursor='hand2')
+        self.canvas.tk.eval(_MINIMAP_TCL)
+        self.summary = None
+        self._items = []
+        self._drawn = None
+        self._content_height = 0
+        self._view = (0.0, 1.0)
+        self._fg = '#B0B0B0'
+        self._view_item = self.canvas.create_rectangle(0, 0, 0, 0, outline='#316AC5', width=1)
+        self.canvas.bind('<Button-1>', self._on_drag)
+        self.canvas.bind('<B1-Motion>', self._on_drag)
+        self.canvas.bind('<Configure>', lambda e: self.redraw())
+
+    def pack(self, **kwargs):
+        """Pack the canvas."""
+        self.canvas.pack(**kwargs)
+
+    def pack_forget(self):
+        """Hide the canvas."""
+        self.canvas.pack_forget()
+
+    def set_theme(self, theme):
+        """Colour the minimap from a theme."""
+        self._fg = theme['minimap_fg']
+        self.canvas.configure(bg=theme['gutter_bg'])
+        self.canvas.itemconfigure('row', fill=self._fg)
+        self.canvas.itemconfigure(self._view_item, outline=theme['minimap_view'])
+
+    def set_summary(self, summary):
+        """Show a LineSummary, or None for an empty minimap."""
+        if summary is not self.summary:
+            self.summary = summary
+            self._drawn = None
+
+    def redraw(self):
+        """Redraw the rows if the summary or the canvas size changed."""
+        height = self.canvas.winfo_height()
+        width = self.canvas.winfo_width()
+        summary = self.summary
+        key = (id(summary), summary.version if summary is not None else 0, height, width)
+        if key == self._drawn:
+            return
+        self._drawn = key
+        coords = []
+        if summary is None or height <= 1:
+            self._content_height = height
+        else:
+            lines = summary.line_count
+            if lines * self.LINE_PX <= height:
+                rows, row_px = lines, self.LINE_PX
+            else:
+                rows, row_px = height, 1
+            self._content_height = rows * row_px
+            scale = self.CHARS_PER_PX
+            for row, (indent, length) in enumerate(summary.rows(rows)):
+                if length > indent:
+                    y = row * row_px
+                    x0 = 2 + indent // scale
+                    coords.extend((x0, y, min(width - 2, max(x0 + 1, 2 + length // scale)), y + row_px))
+        while len(self._items) < len(coords) // 4:
+            self._items.append(self.canvas.create_rectangle(
+                0, 0, 0, 0, width=0, fill=self._fg, tags=('row',)))
+        self.canvas.tk.call('pynote_minimap_place', self.canvas._w, tuple(self._items), tuple(coords))
+        self.canvas.tag_raise(self._view_item)
+        self._place_view()
+
+    def set_view(self, first, last):
+        """Move the visible-region marker to the yview fractions given."""
+        self._view = (float(first), float(last))
+        self._place_view()
+
+    def _place_view(self):
+        first, last = self._view
+        top = first * self._content_height
+        bottom = max(top + 2, last * self._content_height)
+        self.canvas.coords(self._view_item, 0, top, self.canvas.winfo_width() - 1, bottom)
+
+    def _on_drag(self, event):
+        if self._content_height <= 0:
+            return
+        first, last = self._view
+        fraction = min(1.0, max(0.0, event.y / self._content_height))
+        self.command('moveto', max(0.0, fraction - (last - first) / 2))
@@ -0,0 +1,550 @@
+"""
+Markdown preview for PyNote.
+
+The document is split into top-level blocks (paragraphs, headings, lists,
+quotes, fenced code, ...). Each block is rendered into styled text runs for
+a Tk Text - ``(text, tags)`` pairs - and the runs are cached by a hash of
+the block's source, so after an edit only the blocks whose text changed are
+rendered again. ``BlockSplitter`` also re-splits only the text around an
+edit, so an edit costs about the same in a large document as in a small
+one. Splitting and rendering run in a worker thread.
+
+``PreviewLayout`` compares the new block list with the one on screen and
+says which range of preview lines to replace; ``PreviewPane`` applies that
+with one delete and one insert, and scrolls the preview to the block shown
+at the top of the editor.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import bisect
+import hashlib
+import itertools
+import re
+import threading
+import time
+import tkinter as tk
+from tkinter import font as tkfont
+from tkinter import ttk
+
+
+# Rendered blocks kept in the cache
+CACHED_BLOCKS = 50000
+
+_HEADING = re.compile(r'(#{1,6})\s+(.*?)\s*#*\s*$')
+_FENCE = re.compile(r'\s{0,3}(`{3,}|~{3,})')
+_RULE = re.compile(r'\s{0,3}([-*_])(\s*\1){2,}\s*$')
+# A fenced code block, to its closing fence or the end of the text
+_FENCED = re.compile(r'^ {0,3}(`{3,}|~{3,})[^\n]*(?:\n.*?^ {0,3}\1[`~]*[ \t]*$|.*\Z)', re.M | re.S)
+_BLANK = re.compile(r'\n(?:[ \t]*\n)+')
+_HEADING_START = re.compile(r'^#{1,6}\s', re.M)
+_ITEM = re.compile(r'(\s*)([-*+]|\d+[.)])\s+(.*)')
+_INLINE = re.compile(
+    r'(?P<code>`+)(?P<code_text>.+?)(?P=code)'
+    r'|!\[(?P<alt>[^\]]*)\]\([^)]*\)'
+    r'|\[(?P<link>[^\]]+)\]\([^)]*\)'
+    r'|(?P<strong>\*\*|__)(?P<strong_text>.+?)(?P=strong)'
+    r'|(?P<em>[*_])(?P<em_text>[^*_]+?)(?P=em)'
+)
+
+
+def _piece(text, start, end, line, out):
+    """Append the blocks of text[start:end], which has no blank line inside."""
+    piece = text[start:end]
+    if not piece.strip(' \t\n'):
+        return
+    first_end = piece.find('\n')
+    if (first_end < 0 or (_HEADING_START.search(piece) is None and piece[:first_end].strip(' \t')
+                          and piece[piece.rfind('\n') + 1:].strip(' \t'))):
+        out.append((start, end, line))
+        return
+    # Headings or blank edges: go line by line
+    block_start = block_line = block_end = None
+    offset = start
+    for number, source in enumerate(piece.split('\n'), line):
+        stop = offset + len(source)
+        if source.strip(' \t') and not _HEADING.match(source):
+            if block_start is None:
+                block_start, block_line = offset, number
+            block_end = stop
+        else:
+            if block_start is not None:
+                out.append((block_start, block_end, block_line))
+                block_start = None
+            if source.strip(' \t'):
+                out.append((offset, stop, number))
+        offset = stop + 1
+    if block_start is not None:
+        out.append((block_start, block_end, block_line))
+
+
+def _plain(text, pos, endpos, line, out):
+    """Append the blocks of a span without fences; return the line it ends on."""
+    for m in _BLANK.finditer(text, pos, endpos):
+        _piece(text, pos, m.start(), line, out)
+        line += text.count('\n', pos, m.end())
+        pos = m.end()
+    _piece(text, pos, endpos, line, out)
+    return line + text.count('\n', pos, endpos)
+
+
+def _spans(text, pos, endpos, line, out):
+    """
+    Append ``(start, end, first line)`` for the blocks of text[pos:endpos].
+
+    pos must be at the start of a line that is not inside a block.
+    """
+    for m in _FENCED.finditer(text, pos, endpos):
+        line = _plain(text, pos, m.start(), line, out)
+        out.append((m.start(), m.end(), line))
+        line += text.count('\n', m.start(), m.end())
+        pos = m.end()
+    _plain(text, pos, endpos, line, out)
+
+
+def split_blocks(text):
+    """
+    Split Markdown source into top-level blocks.
+
+    Blocks are separated by blank lines; a heading is always a block of its
+    own, and a fenced code block runs to its closing fence whatever it
+    contains.
+
+    Returns:
+        list: ``(first line, block text)`` pairs, lines counted from 1
+    """
+    out = []
+    _spans(text, 0, len(text), 1, out)
+    return [(line, text[start:end]) for start, end, line in out]
+
+
+def _common_prefix(a, b):
+    """Length of the common prefix of two strings or lists, compared in slices."""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, limit):
+    """Length of the common suffix of two strings or lists, at most limit."""
+    lo, hi = 0, limit
+    la, lb = len(a), len(b)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[la - mid:la - lo] == b[lb - mid:lb - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def block_key(block):
+    """Content hash a rendered block is cached under."""
+    return hashlib.blake2b(block.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def _inline(text, tags, out):
+    """Append the runs of a line's inline markup (code, links, emphasis)."""
+    pos = 0
+    for m in _INLINE.finditer(text):
+        if m.start() > pos:
+            out.append((text[pos:m.start()], tags))
+        if m.group('code'):
+            out.append((m.group('code_text'), tags + ('code',)))
+        elif m.group('alt') is not None:
+            out.append((f"[{m.group('alt') or 'image'}]", tags + ('link',)))
+        elif m.group('link'):
+            _inline(m.group('link'), tags + ('link',), out)
+        elif m.group('strong'):
+            _inline(m.group('strong_text'), tags + ('strong',), out)
+        else:
+            _inline(m.group('em_text'), tags + ('em',), out)
+        pos = m.end()
+    if pos < len(text):
+        out.append((text[pos:], tags))
+
+
+def render_block(block):
+    """
+    Render one block.
+
+    Returns:
+        list: ``(text, tags)`` runs, ending with the blank line that
+        separates the block from the next
+    """
+    lines = block.split('\n')
+    out = []
+    first = lines[0]
+    m = _HEADING.match(first)
+    if m:
+        _inline(m.group(2), (f'h{len(m.group(1))}',), out)
+    elif _FENCE.match(first):
+        fence = _FENCE.match(first).group(1)
+        body = lines[1:-1] if len(lines) > 1 and lines[-1].strip().startswith(fence) else lines[1:]
+        out.append(('\n'.join(body), ('codeblock',)))
+    elif _RULE.match(first) and len(lines) == 1:
+        out.append(('─' * 40, ('rule',)))
+    elif all(line.startswith(('    ', '\t')) for line in lines):
+        out.append(('\n'.join(line[4:] if line.startswith('    ') else line[1:] for line in lines), ('codeblock',)))
+    elif first.lstrip().startswith('|'):
+        out.append((block, ('codeblock',)))
+    elif first.lstrip().startswith('>'):
+        text = ' '.join(line.lstrip()[1:].strip() for line in lines)
+        _inline(text, ('quote',), out)
+    elif _ITEM.match(first):
+        for i, line in enumerate(lines):
+            m = _ITEM.match(line)
+            if m is None:
+                # A continuation of the item above
+                out.append((' ', ('list',)))
+                _inline(line.strip(), ('list',), out)
+                continue
+            if i:
+                out.append(('\n', ('list',)))
+            indent, marker, text = m.groups()
+            bullet = marker if marker[0].isdigit() else '•'
+            out.append(('    ' * (len(indent.expandtabs(4)) // 2) + bullet + ' ', ('list',)))
+            _inline(text, ('list',), out)
+    else:
+        for i, line in enumerate(lines):
+            if i:
+                # Two trailing spaces are a hard line break
+                out.append(('\n' if lines[i - 1].endswith('  ') else ' ', ()))
+            _inline(line.strip(), (), out)
+    out.append(('\n\n', ()))
+    return out
+
+
+def height(runs):
+    """Preview lines a rendered block takes."""
+    return sum(text.count('\n') for text, _ in runs)
+
+
+class RenderCache:
+    """Rendered blocks by content hash, least recently used dropped first."""
+
+    def __init__(self, size=CACHED_BLOCKS):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            runs = self._entries.get(key)
+            if runs is not None:
+                self._entries.move_to_end(key)
+            return runs
+
+    def put(self, key, runs):
+        with self._lock:
+            self._entries[key] = runs
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class BlockSplitter:
+    """
+    Split successive versions of a document into rendered blocks.
+
+    Each version is compared with the previous one; splitting restarts at
+    the block before the first change and stops as soon as a block starts
+    where one started before, past the change - from there on the blocks
+    are the old ones, moved. Blocks whose text is not in the cache are
+    rendered.
+
+    Used from the worker thread, one version at a time.
+
+    Args:
+        cache: RenderCache to read and fill
+
+    Attributes:
+        runs: Rendered runs by key, for at least every block of the
+            current version (the cache may drop them)
+    """
+
+    # Characters split past the change before checking for a match
+    WINDOW = 4096
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.text = ''
+        self.starts = []
+        self.ends = []
+        self.lines = []
+        self.keys = []
+        self.runs = {}
+
+    def update(self, text):
+        """
+        Split a new version of the document.
+
+        Returns:
+            tuple: (keys, lines, rendered) - the key and first line of
+            every block, and the number of blocks that had to be rendered
+        """
+        old = self.text
+        prefix = _common_prefix(old, text)
+        suffix = _common_suffix(old, text, min(len(old), len(text)) - prefix)
+        old_end = len(old) - suffix
+        new_end = len(text) - suffix
+        delta = len(text) - len(old)
+        # The block before the first one reaching the change may merge with it
+        i = bisect.bisect_left(self.ends, prefix) - 1
+        if i < 0:
+            i, restart, line = 0, 0, 1
+        else:
+            restart, line = self.starts[i], self.lines[i]
+
+        window = self.WINDOW
+        while True:
+            stop = min(len(text), new_end + window)
+            m = _BLANK.search(text, stop) if stop < len(text) else None
+            stop = m.end() if m else len(text)
+            spans = []
+            _spans(text, restart, stop, line, spans)
+            k = None
+            for t, (start, _, _) in enumerate(spans):
+                if start < new_end or start - delta < old_end:
+                    continue
+                j = bisect.bisect_left(self.starts, start - delta)
+                if j < len(self.starts) and self.starts[j] == start - delta:
+                    k = j
+                    del spans[t:]
+                    break
+            if k is not None or stop == len(text):
+                break
+            window *= 4
+
+        keys = [block_key(text[start:end]) for start, end, _ in spans]
+        if k is None:
+            k = len(self.starts)
+        line_delta = text.count('\n', prefix, new_end) - old.count('\n', prefix, old_end)
+        self.starts[i:] = [start for start, _, _ in spans] + [start + delta for start in self.starts[k:]]
+        self.ends[i:] = [end for _, end, _ in spans] + [end + delta for end in self.ends[k:]]
+        self.lines[i:] = [first for _, _, first in spans] + [first + line_delta for first in self.lines[k:]]
+        self.keys[i:] = keys + self.keys[k:]
+        self.text = text
+
+        rendered = 0
+        for key, (start, end, _) in zip(keys, spans):
+            if key in self.runs:
+                continue
+            runs = self.cache.get(key)
+            if runs is None:
+                runs = render_block(text[start:end])
+                self.cache.put(key, runs)
+                rendered += 1
+            self.runs[key] = runs
+        if len(self.runs) > 2 * len(self.keys) + 1000:
+            self.runs = {key: self.runs[key] for key in self.keys}
+        return list(self.keys), list(self.lines), rendered
+
+
+class PreviewLayout:
+    """
+    The blocks shown in the preview and the preview lines they take.
+
+    Headless: ``update`` works out which preview lines change, the pane
+    applies it to the Text.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.firsts = []
+        self.heights = []
+        # starts[i]: preview line where block i begins; one extra entry for the end
+        self.starts = [1]
+
+    def update(self, keys, firsts, height_of):
+        """
+        Switch to a new list of blocks.
+
+        Args:
+            keys: Block keys, from ``BlockSplitter.update``
+            firsts: The source line each block starts on
+            height_of: Returns the preview lines of a block, by key
+
+        Returns:
+            tuple: (first, last, lo, hi) - preview lines first..last-1 are
+            to be replaced by the new blocks lo..hi-1
+        """
+        old = self.keys
+        lo = _common_prefix(old, keys)
+        tail = _common_suffix(old, keys, min(len(old), len(keys)) - lo)
+        first = self.starts[lo]
+        last = self.starts[len(old) - tail]
+        self.heights[lo:len(old) - tail] = [height_of(key) for key in keys[lo:len(keys) - tail]]
+        self.keys = keys
+        self.firsts = firsts
+        self.starts[lo:] = itertools.accumulate(self.heights[lo:], initial=first)
+        return first, last, lo, len(keys) - tail
+
+    def preview_line(self, line):
+        """Preview line showing a source line."""
+        if not self.keys:
+            return 1
+        i = max(0, bisect.bisect_right(self.firsts, line) - 1)
+        following = self.firsts[i + 1] if i + 1 < len(self.firsts) else None
+        span = (following - self.firsts[i]) if following is not None else 1
+        offset = min(1.0, max(0.0, (line - self.firsts[i]) / max(span, 1)))
+        return self.starts[i] + int(offset * max(self.heights[i] - 1, 0))
+
+
+_executor = None
+
+
+def get_executor():
+    """The worker thread shared by previews, started on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preview')
+    return _executor
+
+
+class PreviewPane:
+    """
+    A read-only Text showing the rendered Markdown of a document.
+
+    Call ``render`` with the document's chunks after edits and ``sync``
+    with the editor's top line after scrolling. Splitting and rendering run
+    in the worker; while one render is running, only the latest request
+    waits.
+
+    Attributes:
+        latencies: Milliseconds from ``render`` to the preview showing it,
+            for the most recent renders
+    """
+
+    POLL_MS = 15
+
+    def __init__(self, parent, cache=None):
+        self.frame = ttk.Frame(parent)
+        self.text = tk.Text(self.frame, wrap='word', padx=12, pady=8, cursor='arrow',
+                            highlightthickness=0, state='disabled')
+        self.scrollbar = ttk.Scrollbar(self.frame, orient='vertical', command=self.text.yview)
+        self.text.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side='right', fill='y')
+        self.text.pack(side='left', fill='both', expand=True)
+        self.cache = cache or RenderCache()
+        self.layout = PreviewLayout()
+        self._splitter = BlockSplitter(self.cache)
+        self.latencies = []
+        self.rendered = 0
+        self._future = None
+        self._started = None
+        self._waiting = None
+        self._top_line = 1
+        self._configure_fonts()
+
+    def _configure_fonts(self):
+        base = tkfont.nametofont('TkDefaultFont').actual()
+        family, size = base['family'], abs(base['size']) or 10
+        fixed = tkfont.nametofont('TkFixedFont').actual()['family']
+        text = self.text
+        text.configure(font=(family, size + 1))
+        for level, scale in ((1, 2.0), (2, 1.6), (3, 1.3), (4, 1.15), (5, 1.05), (6, 1.0)):
+            text.tag_configure(f'h{level}', font=(family, int(size * scale), 'bold'), spacing1=6)
+        text.tag_configure('strong', font=(family, size + 1, 'bold'))
+        text.tag_configure('em', font=(family, size + 1, 'italic'))
+        text.tag_configure('code', font=(fixed, size))
+        text.tag_configure('codeblock', font=(fixed, size), lmargin1=16, lmargin2=16)
+        text.tag_configure('quote', lmargin1=20, lmargin2=20, font=(family, size + 1, 'italic'))
+        text.tag_configure('list', lmargin1=12, lmargin2=28)
+        text.tag_configure('link', underline=True)
+        # Inline styles win over the block style they sit in
+        for tag in ('strong', 'em', 'code', 'link'):
+            text.tag_raise(tag)
+
+    def set_theme(self, theme):
+        self.text.configure(bg=theme['bg'], fg=theme['fg'], selectbackground=theme['select_bg'],
+                            selectforeground=theme['select_fg'])
+        self.text.tag_configure('link', foreground=theme.get('syntax_link', theme['fg']))
+        self.text.tag_configure('code', foreground=theme.get('syntax_code', theme['fg']))
+        self.text.tag_configure('codeblock', foreground=theme.get('syntax_code', theme['fg']))
+        self.text.tag_configure('rule', foreground=theme.get('gutter_fg', theme['fg']))
+        for level in range(1, 7):
+            self.text.tag_configure(f'h{level}', foreground=theme.get('syntax_heading', theme['fg']))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def pack_forget(self):
+        self.frame.pack_forget()
+
+    def render(self, chunks):
+        """
+        Show a new version of the document.
+
+        Args:
+            chunks: The document as a list of strings. It is compared with
+                the previous version, so switching to another document
+                costs a full split once.
+        """
+        self._waiting = (chunks, time.perf_counter())
+        if self._future is None:
+            self._submit()
+
+    def sync(self, top_line):
+        """Scroll so the block at the editor's top source line is at the top."""
+        self._top_line = top_line
+        self.text.yview(f'{self.layout.preview_line(top_line)}.0')
+
+    def clear(self):
+        """Show nothing; the next render starts from scratch."""
+        self._waiting = None
+        self._splitter = BlockSplitter(self.cache)
+        self.layout = PreviewLayout()
+        self.text.configure(state='normal')
+        self.text.delete('1.0', 'end')
+        self.text.configure(state='disabled')
+
+    def _submit(self):
+        chunks, self._started = self._waiting
+        self._waiting = None
+        splitter = self._splitter
+        self._future = get_executor().submit(lambda: (splitter, splitter.update(''.join(chunks))))
+        self.text.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        if not self._future.done():
+            self.text.after(self.POLL_MS, self._poll)
+            return
+        future, self._future = self._future, None
+        if future.exception() is not None:
+            # The splitter may be half updated; start again from scratch
+            waiting = self._waiting
+            self.clear()
+            self._waiting = waiting
+        # A result from before ``clear`` is dropped
+        elif future.result()[0] is self._splitter:
+            keys, lines, self.rendered = future.result()[1]
+            self._apply(keys, lines)
+            self.latencies = (self.latencies + [(time.perf_counter() - self._started) * 1000])[-100:]
+        if self._waiting is not None:
+            self._submit()
+
+    def _apply(self, keys, lines):
+        """Replace only the preview lines of the blocks that changed."""
+        runs = self._splitter.runs
+        first, last, lo, hi = self.layout.update(keys, lines, lambda key: height(runs[key]))
+        if lo == hi and first == last:
+            return
+        args = []
+        for key in self.layout.keys[lo:hi]:
+            for text, tags in runs[key]:
+                args.extend((text, tags))
+        text = self.text
+        text.configure(state='normal')
+        text.delete(f'{first}.0', f'{last}.0')
+        if args:
+            text.insert(f'{first}.0', *args)
+        text.configure(state='disabled')
+        self.sync(self._top_line)
@@ -0,0 +1,213 @@
+"""
+Opt-in hot-path instrumentation for PyNote.
+
+Enabled with the ``PYNOTE_PROFILE`` environment variable or the ``profile``
+setting. ``Profiler.install`` wraps the listed methods of the app with
+timers and routes Tk through a proxy that counts Tcl round-trips, so a
+report shows, per method, how often it ran, how long it took and how many
+Tcl calls it made. Each run of the refresh scheduler's idle flush is
+recorded as one frame.
+"""
+
+from collections import deque
+import json
+import os
+import time
+
+
+ENV_VAR = 'PYNOTE_PROFILE'
+
+# Methods of PyNoteApp timed when profiling
+HOT_METHODS = (
+    '_update_status', '_update_gutter', '_update_minimap', '_apply_theme',
+    '_on_text_change', '_on_yscroll', '_on_scrollbar', '_activate',
+    'load_file', '_start_save', '_snapshot', '_poll_saves', '_enforce_budget',
+)
+
+# Samples kept per method for percentiles
+SAMPLES = 5000
+
+
+def enabled(settings=None):
+    """True if profiling was requested by environment variable or setting."""
+    value = os.environ.get(ENV_VAR, '').strip().lower()
+    if value:
+        return value not in ('0', 'false', 'no', 'off')
+    return bool(settings is not None and settings.get('profile', False))
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class TclCounter:
+    """
+    Stand-in for a Tk interpreter object that counts the calls into Tcl.
+
+    Widgets copy ``tk`` from their master, so installing this on the root
+    window before any widget is created makes every widget use it.
+
+    Args:
+        tkapp: The real interpreter (``Tk().tk``)
+    """
+
+    _COUNTED = frozenset(('call', 'eval', 'getvar', 'setvar', 'globalgetvar', 'globalsetvar'))
+
+    def __init__(self, tkapp):
+        self._tkapp = tkapp
+        self.calls = 0
+
+    def call(self, *args):
+        self.calls += 1
+        return self._tkapp.call(*args)
+
+    def eval(self, script):
+        self.calls += 1
+        return self._tkapp.eval(script)
+
+    def __getattr__(self, name):
+        attr = getattr(self._tkapp, name)
+        if name in self._COUNTED and callable(attr):
+            def counted(*args, **kwargs):
+                self.calls += 1
+                return attr(*args, **kwargs)
+            return counted
+        return attr
+
+
+class _Stat:
+    __slots__ = ('calls', 'total', 'tcl', 'samples')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.tcl = 0
+        self.samples = deque(maxlen=SAMPLES)
+
+
+class Profiler:
+    """
+    Call counts, timings and Tcl round-trips per instrumented name.
+
+    Times are in milliseconds; a nested instrumented call is also counted
+    in its caller's time.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.stats = {}
+        self.counter = None
+        self.last_frame = None
+
+    @property
+    def tcl_calls(self):
+        """Tcl round-trips since the profiler was installed."""
+        return self.counter.calls if self.counter is not None else 0
+
+    def add(self, name, ms, tcl=0):
+        """Record one call of ``name`` that took ``ms`` milliseconds."""
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = _Stat()
+        stat.calls += 1
+        stat.total += ms
+        stat.tcl += tcl
+        stat.samples.append(ms)
+
+    def wrap(self, name, fn):
+        """Return fn wrapped so each call is recorded under ``name``."""
+        def timed(*args, **kwargs):
+            tcl = self.tcl_calls
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, (time.perf_counter() - started) * 1000, self.tcl_calls - tcl)
+        timed.__wrapped__ = fn
+        return timed
+
+    def install(self, app, methods=HOT_METHODS):
+        """
+        Instrument an app; call before its widgets are created.
+
+        Args:
+            app: PyNoteApp, with its RefreshScheduler already created
+            methods: Names of the methods to time
+        """
+        self.counter = TclCounter(app.tk)
+        app.tk = self.counter
+        for name in methods:
+            if hasattr(app, name):
+                setattr(app, name, self.wrap(name, getattr(app, name)))
+        flush = app.refresh._flush
+
+        def frame():
+            tcl = self.tcl_calls
+            started = time.perf_counter()
+            try:
+                flush()
+            finally:
+                ms = (time.perf_counter() - started) * 1000
+                tcl = self.tcl_calls - tcl
+                self.add('frame', ms, tcl)
+                self.last_frame = (ms, tcl)
+        app.refresh._flush = frame
+
+    def report(self):
+        """
+        Summarise what was recorded.
+
+        Returns:
+            dict: Per-name counts, cumulative time, percentiles and Tcl calls
+        """
+        methods = {}
+        for name, stat in sorted(self.stats.items(), key=lambda item: -item[1].total):
+            samples = list(stat.samples)
+            methods[name] = {
+                'calls': stat.calls,
+                'total_ms': round(stat.total, 3),
+                'mean_ms': round(stat.total / stat.calls, 3),
+                'p50_ms': round(_percentile(samples, 50), 3),
+                'p90_ms': round(_percentile(samples, 90), 3),
+                'p99_ms': round(_percentile(samples, 99), 3),
+                'max_ms': round(max(samples), 3),
+                'tcl_calls': stat.tcl,
+            }
+        return {
+            'started': self.started,
+            'seconds': round(time.time() - self.started, 3),
+            'tcl_calls': self.tcl_calls,
+            'methods': methods,
+        }
+
+    def dump(self, directory):
+        """
+        Write the report as JSON.
+
+        Args:
+            directory: Directory to write to, e.g. utils.get_config_dir()
+
+        Returns:
+            str: Path of the written file
+        """
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(str(directory), f'profile-{stamp}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def summary_line(self):
+        """One-line live summary for the overlay."""
+        parts = []
+        frame = self.stats.get('frame')
+        if self.last_frame is not None:
+            ms, tcl = self.last_frame
+            parts.append(f'frame {ms:.1f} ms, {tcl} Tcl')
+        if frame is not None:
+            parts.append(f'p99 {_percentile(list(frame.samples), 99):.1f} ms')
+        for name in ('_update_gutter', '_update_status', '_on_text_change'):
+            stat = self.stats.get(name)
+            if stat is not None and stat.samples:
+                parts.append(f'{name.lstrip("_")} {stat.samples[-1]:.1f} ms')
+        return ' | '.join(parts) or 'no frames yet'
@@ -0,0 +1,82 @@
+"""
+Recently opened files for PyNote.
+
+The list lives in ``settings['recent_files']``, newest first. Each entry
+caches what the File > Open Recent menu shows - size, mtime, encoding and
+line count - as it was when the file was last opened or saved, so the menu
+is built without touching the disk.
+"""
+
+import os
+
+
+MAX_RECENT = 10
+
+
+def format_size(size):
+    """Human-readable byte count."""
+    for unit in ('bytes', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:,} {unit}' if unit == 'bytes' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+def describe(entry):
+    """Menu label for an entry: the file name and its cached details."""
+    details = []
+    if entry.get('size') is not None:
+        details.append(format_size(entry['size']))
+    if entry.get('lines') is not None:
+        details.append(f"{entry['lines']:,} lines")
+    if entry.get('encoding'):
+        details.append(entry['encoding'])
+    name = os.path.basename(entry['path'])
+    return f"{name}  ({', '.join(details)})" if details else name
+
+
+class RecentFiles:
+    """
+    The recent-files list in the settings.
+
+    Args:
+        settings: utils.Settings to read and write
+        limit: Entries kept
+    """
+
+    def __init__(self, settings, limit=MAX_RECENT):
+        self.settings = settings
+        self.limit = limit
+
+    def entries(self):
+        """Entries newest first, as dicts with at least a ``path``."""
+        out = []
+        for item in self.settings.get('recent_files') or []:
+            # Older settings files list bare paths
+            if isinstance(item, str):
+                item = {'path': item}
+            if isinstance(item, dict) and item.get('path'):
+                out.append(item)
+        return out
+
+    def add(self, path, size=None, mtime=None, encoding=None, lines=None):
+        """
+        Put a file at the top of the list with its current details.
+
+        Details left as None keep their previously cached values.
+        """
+        path = os.path.abspath(path)
+        entries = self.entries()
+        entry = next((e for e in entries if e['path'] == path), {'path': path})
+        entry = dict(entry)
+        for key, value in (('size', size), ('mtime', mtime), ('encoding', encoding), ('lines', lines)):
+            if value is not None:
+                entry[key] = value
+        entries = [entry] + [e for e in entries if e['path'] != path]
+        self.settings['recent_files'] = entries[:self.limit]
+
+    def remove(self, path):
+        path = os.path.abspath(path)
+        self.settings['recent_files'] = [e for e in self.entries() if e['path'] != path]
+
+    def clear(self):
+        self.settings['recent_files'] = []
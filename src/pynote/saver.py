@@ -0,0 +1,156 @@
+"""
+Atomic, change-aware saving for PyNote.
+
+The Tk thread only lists the buffer's chunks (its rope leaves). Encoding,
+hashing and writing happen in a worker thread: the chunks are written to a
+temp file next to the target, fsynced and renamed over it, so a crash never
+leaves a half-written file behind.
+"""
+
+import codecs
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from . import utils
+
+
+def _encoded(chunks, encoding, newline):
+    # An incremental encoder writes a BOM (utf-8-sig, utf-16) only once
+    encoder = codecs.getincrementalencoder(encoding)()
+    for chunk in chunks:
+        if newline != '\n':
+            chunk = chunk.replace('\n', newline)
+        yield encoder.encode(chunk)
+    yield encoder.encode('', final=True)
+
+
+def content_hash(chunks, encoding='utf-8', newline='\n'):
+    """Return a digest of the bytes that saving chunks would write."""
+    digest = hashlib.blake2b(digest_size=16)
+    for data in _encoded(chunks, encoding, newline):
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def file_stamp(path):
+    """Return ``(size, mtime_ns)`` of a file, or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def write_atomic(path, chunks, encoding='utf-8', newline='\n'):
+    """
+    Write chunks to a temp file beside path, fsync it and rename it over path.
+
+    A symlink is followed, so the file it points to is replaced and the
+    link kept. The file keeps its mode; a new one gets the usual
+    ``0o666 & ~umask``.
+
+    Returns:
+        int: Number of bytes written
+    """
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for data in _encoded(chunks, encoding, newline):
+                f.write(data)
+                written += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = os.stat(path).st_mode
+        except OSError:
+            mode = 0o666 & ~utils.UMASK
+        try:
+            os.chmod(tmp, mode)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if os.name != 'nt':
+        # Make the rename itself durable
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+    return written
+
+
+class SaveJob:
+    """
+    Save a buffer snapshot in a background thread.
+
+    The write is skipped when the content hash matches ``previous`` - the
+    ``(digest, stamp)`` recorded by the last save of the same file - and the
+    file on disk still has that stamp.
+
+    Attributes set when ``done`` is True:
+        status: 'saved', 'unchanged' or 'error'
+        error: The exception for 'error'
+        digest: Content hash of the snapshot
+        stamp: ``(size, mtime_ns)`` of the file after saving
+        bytes_written: Bytes written (0 when skipped)
+        seconds: Worker time spent hashing and writing
+    """
+
+    def __init__(self, path, chunks, encoding='utf-8', newline=os.linesep, previous=None):
+        self.path = path
+        self.chunks = chunks
+        self.encoding = encoding
+        self.newline = newline
+        self.previous = previous
+        self.done = False
+        self.status = None
+        self.error = None
+        self.digest = None
+        self.stamp = None
+        self.bytes_written = 0
+        self.seconds = 0.0
+        # Not a daemon: an in-flight save finishes even if the app exits
+        self._thread = threading.Thread(target=self._run)
+
+    def start(self):
+        """Start saving in the background."""
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """Block until the save finishes."""
+        self._thread.join(timeout)
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            self.digest = content_hash(self.chunks, self.encoding, self.newline)
+            stamp = file_stamp(self.path)
+            if self.previous == (self.digest, stamp) and stamp is not None:
+                self.status = 'unchanged'
+                self.stamp = stamp
+            else:
+                self.bytes_written = write_atomic(self.path, self.chunks, self.encoding, self.newline)
+                self.stamp = file_stamp(self.path)
+                self.status = 'saved'
+        except Exception as e:
+            self.status = 'error'
+            self.error = e
+        finally:
+            self.chunks = None
+            self.seconds = time.perf_counter() - started
+            self.done = True
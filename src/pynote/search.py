@@ -0,0 +1,489 @@
+"""
+Find & Replace for PyNote.
+
+Searching runs a compiled Python regex over a snapshot of the buffer in a
+worker thread, which streams match positions back in batches; the Tk side
+only tags the matches inside the viewport. Replace-all is computed in the
+worker as well and applied with a single ``replace`` call over the span
+between the first and the last match, so it costs one Tcl round-trip and
+one undo step however many matches there are.
+"""
+
+import bisect
+import queue
+import re
+import threading
+
+
+def compile_pattern(pattern, regex=False, case=True, whole_word=False):
+    """
+    Compile a search pattern.
+
+    Args:
+        pattern: Text to find
+        regex: Treat pattern as a regular expression
+        case: Match case
+        whole_word: Only match at word boundaries
+
+    Returns:
+        re.Pattern: Compiled pattern (raises re.error if it is invalid)
+    """
+    if not regex:
+        pattern = re.escape(pattern)
+    if whole_word:
+        pattern = rf'\b(?:{pattern})\b'
+    flags = re.MULTILINE
+    if not case:
+        flags |= re.IGNORECASE
+    return re.compile(pattern, flags)
+
+
+def iter_matches(text, pattern, batch=1000):
+    """
+    Find all non-empty matches in text.
+
+    Args:
+        text: String to search
+        pattern: Compiled pattern
+        batch: Matches per yielded list
+
+    Yields:
+        list: ``(line, col, end_line, end_col)`` tuples in Text widget
+        coordinates (1-based lines, 0-based columns)
+    """
+    out = []
+    line, line_start, pos = 1, 0, 0
+    for m in pattern.finditer(text):
+        start, end = m.span()
+        if start == end:
+            continue
+        newlines = text.count('\n', pos, start)
+        if newlines:
+            line += newlines
+            line_start = text.rfind('\n', pos, start) + 1
+        col = start - line_start
+        newlines = text.count('\n', start, end)
+        if newlines:
+            line_start_end = text.rfind('\n', start, end) + 1
+            out.append((line, col, line + newlines, end - line_start_end))
+            line += newlines
+            line_start = line_start_end
+        else:
+            out.append((line, col, line, end - line_start))
+        pos = end
+        if len(out) >= batch:
+            yield out
+            out = []
+    if out:
+        yield out
+
+
+def expander(replacement, literal=True):
+    """
+    Return a function mapping a match to its replacement text.
+
+    Args:
+        replacement: Replacement string; with ``literal=False`` it may use
+            group references such as ``\\1`` or ``\\g<name>``
+        literal: Insert replacement as-is
+    """
+    if literal or '\\' not in replacement:
+        return lambda m: replacement
+    return lambda m: m.expand(replacement)
+
+
+def replace_all(text, pattern, replacement, literal=True):
+    """
+    Replace every match and return only the part of the text that changed.
+
+    Args:
+        text: String to search
+        pattern: Compiled pattern
+        replacement: Replacement string
+        literal: Insert replacement as-is (see ``expander``)
+
+    Returns:
+        tuple: ``(first_line, last_line, new_text, count)`` - lines
+        ``first_line..last_line`` are to be replaced by ``new_text`` - or
+        None if nothing matched
+    """
+    expand = expander(replacement, literal)
+    # [first match start, last match end, count]
+    found = [0, 0, 0]
+
+    def substitute(m):
+        start, end = m.span()
+        if start == end:
+            return ''
+        if not found[2]:
+            found[0] = start
+        found[1] = end
+        found[2] += 1
+        return expand(m)
+
+    new = pattern.sub(substitute, text)
+    first, last, count = found
+    if not count:
+        return None
+    start = text.rfind('\n', 0, first) + 1
+    end = text.find('\n', last)
+    if end < 0:
+        end = len(text)
+    first_line = text.count('\n', 0, start) + 1
+    last_line = first_line + text.count('\n', start, end)
+    return first_line, last_line, new[start:len(new) - (len(text) - end)], count
+
+
+class SearchJob:
+    """
+    Search (or replace in) a text snapshot in a background thread.
+
+    The snapshot is a string or a ``buffer.TextBuffer`` snapshot; a buffer
+    is flattened in the worker, so the UI thread copies nothing.
+
+    Match batches from ``iter_matches`` are queued as they are found and
+    collected with ``batches``. With a ``replacement`` the worker runs
+    ``replace_all`` instead and leaves its return value in ``result``.
+
+    Attributes set when ``done`` is True:
+        error: The exception if the search failed
+        result: ``replace_all`` result for a replace job
+    """
+
+    BATCH = 1000
+
+    def __init__(self, text, pattern, replacement=None, literal=True):
+        self.text = text
+        self.pattern = pattern
+        self.replacement = replacement
+        self.literal = literal
+        self.done = False
+        self.error = None
+        self.result = None
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Start searching in the background."""
+        self._thread.start()
+
+    def cancel(self):
+        """Stop after the current batch."""
+        self._stop.set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes."""
+        self._thread.join(timeout)
+
+    def batches(self):
+        """Return the match batches found since the last call."""
+        out = []
+        while True:
+            try:
+                out.append(self._queue.get_nowait())
+            except queue.Empty:
+                return out
+
+    def _run(self):
+        try:
+            text = str(self.text)
+            if self.replacement is not None:
+                self.result = replace_all(text, self.pattern, self.replacement, self.literal)
+            else:
+                for batch in iter_matches(text, self.pattern, self.BATCH):
+                    if self._stop.is_set():
+                        break
+                    self._queue.put(batch)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.text = None
+            self.done = True
+
+
+class SearchController:
+    """
+    Find & Replace on a Text widget.
+
+    Keeps the sorted match list of the current pattern, tags the matches in
+    the viewport, and re-runs the search shortly after the buffer changes.
+
+    Args:
+        text: Tkinter Text widget
+        on_update: Called with no arguments when matches or state change
+        buffer: buffer.TextBuffer mirroring the widget; searches read a
+            snapshot of it instead of copying the text out of Tk
+    """
+
+    TAG = 'search'
+    CURRENT_TAG = 'search_current'
+    POLL_MS = 15
+    RESEARCH_MS = 250
+    MAX_TAGGED = 5000     # matches tagged at once in a very dense viewport
+
+    def __init__(self, text, on_update=None, buffer=None):
+        self.text = text
+        self.on_update = on_update
+        self.buffer = buffer
+        self.pattern = None
+        self.matches = []
+        self.error = None
+        self.job = None
+        self.replaced = None
+        self._generation = 0
+        self._job_generation = 0
+        self._replace_args = None
+        self._pending_move = None
+        self._after_id = None
+        self._research_id = None
+
+    @property
+    def searching(self):
+        """True while matches are still being collected."""
+        return self.job is not None or self._research_id is not None
+
+    def set_theme(self, theme):
+        """Configure the match tags from a theme."""
+        self.text.tag_configure(self.TAG, background=theme['search_bg'])
+        self.text.tag_configure(self.CURRENT_TAG, background=theme['search_current_bg'])
+        self.text.tag_raise(self.CURRENT_TAG, self.TAG)
+        self.text.tag_raise('sel')
+
+    def search(self, pattern):
+        """Search for a compiled pattern; None clears the search."""
+        self._stop()
+        self.pattern = pattern
+        self.matches = []
+        self.error = None
+        self._pending_move = None
+        self._clear_tags()
+        if pattern is not None:
+            self._start(SearchJob(self._snapshot(), pattern))
+        self._notify()
+
+    def clear(self):
+        """Forget the current search and remove its highlighting."""
+        self.search(None)
+
+    def close(self):
+        """Stop any search; call before the Text widget is destroyed."""
+        self._stop()
+        self.pattern = None
+        self.matches = []
+
+    def find_next(self, backwards=False):
+        """
+        Select the next (or previous) match from the cursor, wrapping around.
+
+        If the matches before that point are not known yet, the move
+        happens as soon as they arrive.
+        """
+        if self.pattern is None:
+            return
+        if self._research_id is not None:
+            self._research()
+        self._pending_move = backwards
+        self._try_move()
+
+    def replace_current(self, replacement, literal=True):
+        """Replace the selected match, then select the next one."""
+        if self.pattern is None:
+            return
+        try:
+            first, last = self.text.index('sel.first'), self.text.index('sel.last')
+        except Exception:
+            self.find_next()
+            return
+        selected = self.text.get(first, last)
+        m = self.pattern.fullmatch(selected)
+        if m is None:
+            self.find_next()
+            return
+        new_text = expander(replacement, literal)(m)
+        self._single_edit(first, last, new_text)
+        # Continue after the replacement, which may match the pattern itself
+        self.text.mark_set('insert', f'{first}+{len(new_text)}c')
+        self.find_next()
+
+    def replace_all(self, replacement, literal=True):
+        """Replace every match as one edit; sets ``replaced`` to the count."""
+        if self.pattern is None:
+            return
+        self._stop()
+        self._replace_args = (replacement, literal)
+        self.replaced = None
+        self._start(SearchJob(self._snapshot(), self.pattern, replacement, literal))
+        self._notify()
+
+    def _snapshot(self):
+        if self.buffer is not None:
+            return self.buffer.snapshot()
+        return self.text.get('1.0', 'end-1c')
+
+    def on_change(self, first, old_last, new_last):
+        """ChangeHook listener: matches are stale, search again shortly."""
+        self._generation += 1
+        if self.pattern is None or self._replace_args is not None:
+            return
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+        if self._research_id is not None:
+            self.text.after_cancel(self._research_id)
+        self._research_id = self.text.after(self.RESEARCH_MS, self._research)
+
+    def on_scroll(self):
+        """Tag the matches that scrolled into view."""
+        if self.matches:
+            self._draw()
+
+    def _research(self):
+        if self._research_id is not None:
+            self.text.after_cancel(self._research_id)
+            self._research_id = None
+        pending = self._pending_move
+        self.search(self.pattern)
+        self._pending_move = pending
+
+    def _start(self, job):
+        self.job = job
+        self._job_generation = self._generation
+        job.start()
+        self._after_id = self.text.after(self.POLL_MS, self._poll)
+
+    def _stop(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+        for name in ('_after_id', '_research_id'):
+            after_id = getattr(self, name)
+            if after_id is not None:
+                self.text.after_cancel(after_id)
+                setattr(self, name, None)
+        self._replace_args = None
+
+    def _poll(self):
+        self._after_id = None
+        job = self.job
+        if job is None:
+            return
+        finished = job.done
+        if job.replacement is not None:
+            if finished:
+                self.job = None
+                self._finish_replace(job)
+            else:
+                self._after_id = self.text.after(self.POLL_MS, self._poll)
+            return
+        batches = job.batches()
+        for batch in batches:
+            self.matches.extend(batch)
+        if finished:
+            self.job = None
+            self.error = job.error
+        else:
+            self._after_id = self.text.after(self.POLL_MS, self._poll)
+        if batches:
+            self._draw()
+        self._try_move()
+        self._notify()
+
+    def _finish_replace(self, job):
+        replacement, literal = self._replace_args
+        self._replace_args = None
+        if job.error is not None:
+            self.error = job.error
+        elif self._generation != self._job_generation:
+            # The buffer changed while the worker ran; start over
+            self.replace_all(replacement, literal)
+            return
+        elif job.result is not None:
+            first, last, new_text, count = job.result
+            self._single_edit(f'{first}.0', f'{last}.end', new_text)
+            self.replaced = count
+        else:
+            self.replaced = 0
+        self.search(self.pattern)
+
+    def _single_edit(self, first, last, new_text):
+        """Replace a range with one Tcl call, as one undo step."""
+        autoseparators = self.text.cget('autoseparators')
+        self.text.configure(autoseparators=False)
+        try:
+            self.text.edit_separator()
+            self.text.replace(first, last, new_text)
+            self.text.edit_separator()
+        finally:
+            self.text.configure(autoseparators=autoseparators)
+        self.text.mark_set('insert', first)
+        self.text.see('insert')
+
+    def _try_move(self):
+        if self._pending_move is None:
+            return
+        backwards = self._pending_move
+        complete = self.job is None and self._research_id is None
+        if backwards:
+            # The previous match is the last one before the selection
+            anchor = self._position('sel.first') or self._position('insert')
+            i = bisect.bisect_left(self.matches, anchor) - 1
+            known = complete or (self.matches and self.matches[-1][:2] >= anchor)
+            if not known:
+                return
+            if i < 0:
+                i = len(self.matches) - 1
+        else:
+            anchor = self._position('insert')
+            i = bisect.bisect_left(self.matches, anchor)
+            if i == len(self.matches):
+                if not complete:
+                    return
+                i = 0
+        self._pending_move = None
+        if self.matches:
+            self._select(self.matches[i])
+
+    def _position(self, index):
+        try:
+            line, col = self.text.index(index).split('.')
+        except Exception:
+            return None
+        return int(line), int(col)
+
+    def _select(self, match):
+        line, col, end_line, end_col = match
+        first, last = f'{line}.{col}', f'{end_line}.{end_col}'
+        self.text.tag_remove('sel', '1.0', 'end')
+        self.text.tag_remove(self.CURRENT_TAG, '1.0', 'end')
+        self.text.tag_add('sel', first, last)
+        self.text.tag_add(self.CURRENT_TAG, first, last)
+        self.text.mark_set('insert', last)
+        self.text.see(first)
+
+    def _visible_lines(self):
+        first = int(self.text.index('@0,0').split('.')[0])
+        last = int(self.text.index(f'@0,{self.text.winfo_height()}').split('.')[0])
+        return first, last
+
+    def _draw(self):
+        """Tag only the matches in the viewport, in one tag_add call."""
+        first, last = self._visible_lines()
+        lo = bisect.bisect_left(self.matches, (first,))
+        if lo and self.matches[lo - 1][2] >= first:
+            lo -= 1     # a multi-line match reaching into the viewport
+        hi = bisect.bisect_left(self.matches, (last + 1,), lo)
+        indices = []
+        for line, col, end_line, end_col in self.matches[lo:min(hi, lo + self.MAX_TAGGED)]:
+            indices.extend((f'{line}.{col}', f'{end_line}.{end_col}'))
+        self.text.tag_remove(self.TAG, '1.0', 'end')
+        if indices:
+            self.text.tag_add(self.TAG, *indices)
+
+    def _clear_tags(self):
+        self.text.tag_remove(self.TAG, '1.0', 'end')
+        self.text.tag_remove(self.CURRENT_TAG, '1.0', 'end')
+
+    def _notify(self):
+        if self.on_update:
+            self.on_update()
@@ -0,0 +1,153 @@
+"""
+Session snapshots for PyNote.
+
+On exit the open files are written to ``session.json`` in the config
+directory: path, encoding, cursor, top line of the view and a fingerprint
+of the file. On the next start the files are opened again, the visible one
+first. A file is only trusted to be the version the positions belong to if
+its fingerprint still matches; checking one reads its size and mtime and
+two small samples, never the whole file.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from . import utils
+
+# Only needed on exit
+saver = utils.lazy_import(f'{__package__}.saver')
+
+
+SESSION_FILE = 'session.json'
+SESSION_VERSION = 1
+# Bytes hashed from each end of a file for its fingerprint
+SAMPLE_BYTES = 64 * 1024
+
+UNCHANGED = 'unchanged'
+CHANGED = 'changed'
+MISSING = 'missing'
+
+
+def fingerprint(path):
+    """
+    A cheap identity of a file's current content.
+
+    Returns:
+        list: ``[size, mtime_ns, digest]`` where digest hashes the first and
+        last ``SAMPLE_BYTES``, or None if the file cannot be read
+    """
+    try:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            digest = hashlib.blake2b(f.read(SAMPLE_BYTES), digest_size=16)
+            if st.st_size > SAMPLE_BYTES:
+                f.seek(max(SAMPLE_BYTES, st.st_size - SAMPLE_BYTES))
+                digest.update(f.read(SAMPLE_BYTES))
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+
+
+def check(path, expected):
+    """
+    Compare a file with the fingerprint it had.
+
+    The stat is compared first, so a file that was touched or resized is
+    not read at all.
+
+    Returns:
+        str: ``UNCHANGED``, ``CHANGED`` or ``MISSING``
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return MISSING
+    if not expected or [st.st_size, st.st_mtime_ns] != list(expected[:2]):
+        return CHANGED
+    current = fingerprint(path)
+    if current is None:
+        return MISSING
+    return UNCHANGED if current == list(expected) else CHANGED
+
+
+def session_path(config_dir):
+    """File holding the session."""
+    return os.path.join(str(config_dir), SESSION_FILE)
+
+
+def save(config_dir, entries, active=0):
+    """
+    Write the session, or remove it when no files are open.
+
+    Args:
+        config_dir: Configuration directory
+        entries: One dict per open file with ``path`` and optionally
+            ``encoding``, ``cursor`` ([line, column]), ``top`` and
+            ``fingerprint``
+        active: Index of the entry that was shown
+    """
+    path = session_path(config_dir)
+    try:
+        if not entries:
+            if os.path.exists(path):
+                os.unlink(path)
+            return
+        data = {'version': SESSION_VERSION, 'active': active, 'documents': entries}
+        saver.write_atomic(path, [json.dumps(data, separators=(',', ':'))])
+    except OSError:
+        pass
+
+
+def load(config_dir):
+    """
+    Read the last session.
+
+    Returns:
+        tuple: (entries, active); no entries if there is no usable session
+    """
+    try:
+        with open(session_path(config_dir), encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != SESSION_VERSION:
+            return [], 0
+        entries = [e for e in data.get('documents', []) if isinstance(e, dict) and e.get('path')]
+        active = data.get('active', 0)
+        if not isinstance(active, int) or not 0 <= active < len(entries):
+            active = 0
+        return entries, active
+    except (OSError, ValueError, AttributeError):
+        return [], 0
+
+
+class Verifier:
+    """
+    Check the fingerprints of restored files in a background thread.
+
+    Args:
+        entries: Session entries to check
+
+    Attributes:
+        done: True once every entry has been checked
+        results: ``check`` result by path
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.results = {}
+        self.done = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            for entry in self.entries:
+                self.results[entry['path']] = check(entry['path'], entry.get('fingerprint'))
+        finally:
+            self.done = True
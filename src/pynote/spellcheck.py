@@ -0,0 +1,377 @@
+"""
+Spell checking for PyNote.
+
+Only the lines in the viewport, plus lines that were just edited, are
+checked: ``SpellChecker`` sends their text to a worker thread, which looks
+each word up in a ``Dictionary`` and returns the misspelled spans. The
+spans are tagged in one ``tag_add`` per batch, and only if the line still
+has the text that was checked.
+
+A ``Dictionary`` memoises word lookups in an LRU cache. It uses
+``pyspellchecker`` when it is installed and otherwise the plain word list
+bundled in ``data/words.txt``; the words the user added are kept in the
+config directory.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+import threading
+
+
+# Word lookups remembered
+CACHE_WORDS = 20000
+# Lines of an edit that are rechecked even when off screen
+EDIT_LINES = 50
+
+BUNDLED_WORDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'words.txt')
+
+# Letters with inner apostrophes, not glued to digits or underscores
+WORD_RE = re.compile(r"\b[^\W\d_]+(?:['’][^\W\d_]+)*\b")
+
+_ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+# Endings tried when a word list lacks an inflected form
+_SUFFIXES = (("'s", ''), ('ies', 'y'), ('es', ''), ('s', ''), ('ied', 'y'), ('ed', 'e'), ('ed', ''),
+             ('ing', 'e'), ('ing', ''), ('ly', ''), ('er', 'e'), ('er', ''), ('est', 'e'), ('est', ''),
+             ('ness', ''), ('ment', ''))
+
+
+def _edits(word):
+    """Strings one deletion, transposition, replacement or insertion away."""
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    out = set()
+    for a, b in splits:
+        if b:
+            out.add(a + b[1:])
+            for c in _ALPHABET:
+                out.add(a + c + b[1:])
+        if len(b) > 1:
+            out.add(a + b[1] + b[0] + b[2:])
+        for c in _ALPHABET:
+            out.add(a + c + b)
+    return out
+
+
+class WordList:
+    """
+    Backend over a plain set of lowercase words.
+
+    Inflected forms (``-s``, ``-ed``, ``-ing``, ...) of listed words are
+    accepted, so the list only needs base forms.
+    """
+
+    def __init__(self, words=()):
+        self.words = set(words)
+
+    @classmethod
+    def load(cls, path):
+        """Read a word list with one word per line."""
+        with open(path, encoding='utf-8') as f:
+            return cls(line.strip().lower() for line in f if line.strip())
+
+    def known(self, word):
+        word = word.lower().replace('’', "'")
+        if word in self.words:
+            return True
+        for suffix, replacement in _SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+                stem = word[:-len(suffix)]
+                if stem + replacement in self.words:
+                    return True
+                # Doubled consonant: stopped, running
+                if len(stem) > 2 and stem[-1] == stem[-2] and stem[:-1] in self.words:
+                    return True
+        return False
+
+    def suggest(self, word):
+        lower = word.lower()
+        found = sorted(w for w in _edits(lower) if w in self.words)
+        # Two edits away is tens of thousands of candidates per letter
+        if not found and len(lower) <= 8:
+            found = sorted({w for e in _edits(lower) for w in _edits(e) if w in self.words})
+        return found
+
+    def add(self, word):
+        self.words.add(word.lower())
+
+
+class PySpellBackend:
+    """Backend over ``spellchecker.SpellChecker``."""
+
+    def __init__(self, language='en'):
+        from spellchecker import SpellChecker
+        self.checker = SpellChecker(language=language)
+
+    def known(self, word):
+        return bool(self.checker.known([word.lower().replace('’', "'")]))
+
+    def suggest(self, word):
+        candidates = self.checker.candidates(word.lower()) or ()
+        return sorted(candidates, key=lambda w: -self.checker.word_frequency[w])
+
+    def add(self, word):
+        self.checker.word_frequency.add(word.lower())
+
+
+def load_backend(prefer_pyspell=True):
+    """``PySpellBackend`` if pyspellchecker is installed, else the bundled ``WordList``."""
+    if prefer_pyspell:
+        try:
+            return PySpellBackend()
+        except ImportError:
+            pass
+    return WordList.load(BUNDLED_WORDS)
+
+
+_dictionary = None
+_dictionary_lock = threading.Lock()
+
+
+def get_dictionary(user_path=None):
+    """
+    The Dictionary shared by all spell checkers, loaded on first use.
+
+    Args:
+        user_path: File of the user's own words
+    """
+    global _dictionary
+    with _dictionary_lock:
+        if _dictionary is None:
+            _dictionary = Dictionary(load_backend(), user_path)
+        return _dictionary
+
+
+class Dictionary:
+    """
+    Thread-safe, memoised word lookups.
+
+    Args:
+        backend: Object with ``known(word)``, ``suggest(word)`` and ``add(word)``
+        user_path: File of words the user added, one per line, or None
+        cache_size: Lookups kept in the LRU cache
+    """
+
+    def __init__(self, backend, user_path=None, cache_size=CACHE_WORDS):
+        self.backend = backend
+        self.user_path = user_path
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        if user_path is not None:
+            try:
+                with open(user_path, encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            backend.add(line.strip())
+            except OSError:
+                pass
+
+    @staticmethod
+    def skip(word):
+        """True for words not checked: single letters and acronyms."""
+        return len(word) < 2 or word.isupper()
+
+    def check(self, word):
+        """True if a word is spelled correctly."""
+        with self._lock:
+            result = self._cache.get(word)
+            if result is not None:
+                self._cache.move_to_end(word)
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = self.backend.known(word)
+        with self._lock:
+            self._cache[word] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def misspelled(self, line):
+        """Return ``(start, end)`` columns of the misspelled words in a line."""
+        return [m.span() for m in WORD_RE.finditer(line)
+                if not self.skip(m.group()) and not self.check(m.group())]
+
+    def suggest(self, word, limit=8):
+        """Likely corrections, best first, keeping the word's capitalisation."""
+        out = self.backend.suggest(word)[:limit]
+        if word[:1].isupper():
+            out = [w[:1].upper() + w[1:] for w in out]
+        return out
+
+    def add(self, word):
+        """Accept a word from now on and remember it in the user's word list."""
+        self.backend.add(word)
+        with self._lock:
+            self._cache[word] = True
+            self._cache.move_to_end(word)
+        if self.user_path is not None:
+            try:
+                with open(self.user_path, 'a', encoding='utf-8') as f:
+                    f.write(word + '\n')
+            except OSError:
+                pass
+
+
+_executor = None
+
+
+def get_executor():
+    """The worker thread shared by all spell checkers, started on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spellcheck')
+    return _executor
+
+
+def check_lines(get_dictionary, items):
+    """
+    Worker task: find misspellings in a batch of lines.
+
+    Args:
+        get_dictionary: Returns the Dictionary (loaded on first use, in the worker)
+        items: ``(line number, text)`` pairs
+
+    Returns:
+        list: ``(line number, text, spans)`` for each item
+    """
+    dictionary = get_dictionary()
+    return [(line, text, dictionary.misspelled(text)) for line, text in items]
+
+
+class SpellChecker:
+    """
+    Underline misspelled words in the viewport of a Text widget.
+
+    Args:
+        text: Tkinter Text widget
+        buffer: buffer.TextBuffer mirroring the widget
+        get_dictionary: Returns the Dictionary to use; called in the worker
+            thread, so it may load the word list there
+    """
+
+    TAG = 'misspelled'
+    POLL_MS = 20
+    DELAY_MS = 150
+
+    def __init__(self, text, buffer, get_dictionary):
+        self.text = text
+        self.buffer = buffer
+        self.get_dictionary = get_dictionary
+        self.enabled = False
+        # Text each visible line had when it was last checked
+        self._checked = {}
+        self._edited = set()
+        self._future = None
+        self._after_id = None
+
+    def set_theme(self, theme):
+        """Configure the misspelling tag from a theme."""
+        self.text.tag_configure(self.TAG, underline=True)
+        try:
+            # Tk 8.6.11 and later can colour the underline
+            self.text.tag_configure(self.TAG, underlinefg=theme.get('spell_error', theme['fg']))
+        except Exception:
+            pass
+
+    def enable(self, on=True):
+        """Turn checking on or off; off removes every underline."""
+        self.enabled = on
+        self._checked.clear()
+        self._edited.clear()
+        if on:
+            self._schedule(0)
+        else:
+            self._cancel()
+            self.text.tag_remove(self.TAG, '1.0', 'end')
+
+    def close(self):
+        """Stop checking; call before the Text widget is destroyed."""
+        self.enabled = False
+        self._cancel()
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def on_change(self, first, old_last, new_last):
+        """ChangeHook listener: recheck the edited lines shortly."""
+        if not self.enabled:
+            return
+        delta = new_last - old_last
+        if delta:
+            # Lines below moved; their checked text no longer lines up
+            self._checked = {line if line < first else line + delta: text
+                             for line, text in self._checked.items() if line < first or line > old_last}
+        if new_last - first < EDIT_LINES:
+            self._edited.update(range(first, new_last + 1))
+        self._schedule(self.DELAY_MS)
+
+    def on_scroll(self):
+        """Check the lines that scrolled into view."""
+        if self.enabled:
+            self._schedule(self.DELAY_MS)
+
+    def _schedule(self, ms):
+        if self._after_id is None:
+            self._after_id = self.text.after(ms, self._run)
+
+    def _cancel(self):
+        if self._after_id is not None:
+            self.text.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _visible_range(self):
+        first = int(self.text.index('@0,0').split('.')[0])
+        last = int(self.text.index(f'@0,{self.text.winfo_height()}').split('.')[0])
+        return first, last
+
+    def _run(self):
+        self._after_id = None
+        if not self.enabled:
+            return
+        if self._future is not None:
+            if not self._future.done():
+                self._after_id = self.text.after(self.POLL_MS, self._run)
+                return
+            future, self._future = self._future, None
+            if not future.cancelled() and future.exception() is None:
+                self._apply(future.result())
+        first, last = self._visible_range()
+        count = self.buffer.line_count
+        lines = set(range(first, last + 1)) | {line for line in self._edited if line <= count}
+        self._edited.clear()
+        # Forget lines far out of view so the map stays viewport sized
+        self._checked = {line: text for line, text in self._checked.items() if first <= line <= last}
+        items = []
+        for line in sorted(lines):
+            text = self.buffer.lines(line, line)
+            if self._checked.get(line) != text:
+                items.append((line, text))
+        if items:
+            self._future = get_executor().submit(check_lines, self.get_dictionary, items)
+            self._after_id = self.text.after(self.POLL_MS, self._run)
+
+    def _apply(self, results):
+        """Retag the checked lines that still hold the text that was checked."""
+        count = self.buffer.line_count
+        ranges = []
+        runs = []
+        for line, text, spans in results:
+            if line > count or self.buffer.lines(line, line) != text:
+                self._edited.add(line)
+                continue
+            self._checked[line] = text
+            if runs and runs[-1][1] == line - 1:
+                runs[-1][1] = line
+            else:
+                runs.append([line, line])
+            for start, end in spans:
+                ranges.extend((f'{line}.{start}', f'{line}.{end}'))
+        # One tag_remove per run of lines, one tag_add for the whole batch
+        for first, last in runs:
+            self.text.tag_remove(self.TAG, f'{first}.0', f'{last}.end')
+        if ranges:
+            self.text.tag_add(self.TAG, *ranges)
@@ -0,0 +1,83 @@
+"""
+Incremental word/character statistics for PyNote.
+
+Keeps a per-line cache of word and character counts so edits only recount
+the lines they touch instead of rescanning the whole buffer.
+"""
+
+
+def _count_line(line):
+    """Return (words, chars) for a single line without its newline."""
+    return len(line.split()), len(line)
+
+
+class TextStats:
+    """
+    Per-line word/character counts with running totals.
+
+    Lines are numbered from 1 like Tk text indices. The totals always match
+    ``utils.count_words`` and ``utils.count_chars`` for the text that was fed
+    in, as words never span a newline.
+    """
+
+    def __init__(self, text=''):
+        self.reset(text)
+
+    def reset(self, text):
+        """
+        Rebuild the cache from a complete buffer.
+
+        Args:
+            text: Full buffer content (without Tk's trailing newline)
+        """
+        self._words = []
+        self._chars = []
+        self._total_words = 0
+        self._total_chars = 0
+        self._store(0, 0, text)
+
+    def replace_lines(self, first, last, text):
+        """
+        Replace cached lines ``first..last`` with the lines of ``text``.
+
+        Args:
+            first: First replaced line (1-based)
+            last: Last replaced line (inclusive, 1-based)
+            text: New content for that range, lines joined with newlines
+        """
+        first = max(1, min(first, len(self._words)))
+        last = max(first, min(last, len(self._words)))
+        self._store(first - 1, last, text)
+
+    def _store(self, start, stop, text):
+        old_words = self._words[start:stop]
+        old_chars = self._chars[start:stop]
+        counts = [_count_line(line) for line in text.split('\n')]
+        new_words = [w for w, _ in counts]
+        new_chars = [c for _, c in counts]
+        self._words[start:stop] = new_words
+        self._chars[start:stop] = new_chars
+        self._total_words += sum(new_words) - sum(old_words)
+        self._total_chars += sum(new_chars) - sum(old_chars)
+
+    @property
+    def line_count(self):
+        """Number of lines in the buffer."""
+        return len(self._words)
+
+    @property
+    def words(self):
+        """Total word count."""
+        return self._total_words
+
+    @property
+    def chars(self):
+        """Total character count, excluding trailing newlines."""
+        newlines = len(self._chars) - 1
+        # count_chars strips trailing newlines, i.e. trailing empty lines
+        trailing = 0
+        for length in reversed(self._chars):
+            if length or trailing == newlines:
+                break
+            trailing += 1
+        return self._total_chars + newlines - trailing
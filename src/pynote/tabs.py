@@ -0,0 +1,222 @@
+"""
+Open documents and their memory budget.
+
+Every tab is a ``Document``. Its editor widget is only created when the tab
+is first shown, and inactive tabs can be unloaded again: the widget and
+everything derived from the buffer are dropped, and the text is reloaded
+from disk - or, for a modified buffer, from a swap snapshot written to the
+config directory - when the tab is selected. ``pick_unload`` chooses which
+tabs to unload so the loaded ones stay within a memory budget.
+"""
+
+import itertools
+import os
+
+from . import utils
+
+# Only needed for swap housekeeping, which runs after startup
+autosave = utils.lazy_import(f'{__package__}.autosave')
+shutil = utils.lazy_import('shutil')
+
+
+# Rough cost of a loaded buffer: Tk keeps the text as UTF-8 plus per-line
+# B-tree and display data, and the Python side keeps per-line counts and
+# highlighter states. Only used to compare tabs against the budget.
+BYTES_PER_CHAR = 2
+BYTES_PER_LINE = 128
+
+_clock = itertools.count(1)
+
+
+def estimate_memory(chars, lines):
+    """Estimated bytes held by a loaded buffer."""
+    return chars * BYTES_PER_CHAR + lines * BYTES_PER_LINE
+
+
+class Document:
+    """
+    State of one tab.
+
+    The attributes below ``editor`` are only set while the document is
+    loaded; ``modified``, ``cursor`` and ``yview`` are remembered across an
+    unload, and ``restore`` holds the position from the last session until
+    the document is shown.
+
+    Attributes:
+        path: File path, or None for an untitled buffer
+        encoding: Encoding used when saving
+        newline: Line ending used when saving
+        number: Sequence number for naming untitled buffers
+        last_used: Activation stamp; smaller means less recently used
+        editor: editor.EditorWidget while loaded, else None
+        stats: stats.TextStats for the buffer
+        summary: minimap.LineSummary for the buffer
+        highlighter: highlight.Highlighter for the buffer
+        search: search.SearchController for the buffer
+        spell: spellcheck.SpellChecker while spell checking is on
+        loader: loader.FileLoader while the buffer is streaming in
+        huge: hugefile.HugeFileView in read-only viewer mode
+        journal: autosave.EditJournal, kept while unloaded
+        history: history.History of undoable edits, kept while unloaded
+        tail: watcher.Tail marking where the loaded text ends in the file
+        follow: Keep the cursor at the end as the file grows
+        restore: (line, column, top line) in file lines to show once loaded,
+            from the last session
+        swap_path: Swap snapshot holding a modified, unloaded buffer
+        swap_job: saver.SaveJob writing the swap snapshot
+        saving: Number of saves in flight
+    """
+
+    def __init__(self, path=None, number=0):
+        self.path = path
+        self.encoding = 'utf-8'
+        self.newline = os.linesep
+        self.number = number
+        self.last_used = 0
+        self.save_record = None
+        self.cursor = None
+        self.yview = None
+        self._modified = False
+        self.editor = None
+        self.stats = None
+        self.summary = None
+        self.highlighter = None
+        self.search = None
+        self.spell = None
+        self.loader = None
+        self.huge = None
+        self.journal = None
+        self.history = None
+        self.tail = None
+        self.follow = False
+        self.restore = None
+        self.swap_path = None
+        self.swap_job = None
+        self.saving = 0
+
+    @property
+    def loaded(self):
+        """True while the document has an editor widget."""
+        return self.editor is not None
+
+    @property
+    def text(self):
+        """The Text widget while loaded."""
+        return self.editor.text if self.editor is not None else None
+
+    @property
+    def name(self):
+        """Label for the tab."""
+        if self.path:
+            return os.path.basename(self.path)
+        return f'Untitled {self.number}' if self.number > 1 else 'Untitled'
+
+    @property
+    def modified(self):
+        """Whether the buffer has unsaved changes."""
+        if self.editor is not None:
+            return bool(self.text.edit_modified())
+        return self._modified
+
+    @modified.setter
+    def modified(self, value):
+        if self.editor is not None:
+            self.text.edit_modified(value)
+        self._modified = bool(value)
+
+    def touch(self):
+        """Mark the document as just used."""
+        self.last_used = next(_clock)
+
+    def memory_estimate(self):
+        """Estimated bytes held while loaded (0 when unloaded)."""
+        if self.editor is None or self.huge is not None or self.stats is None:
+            return 0
+        if self.swap_job is not None:
+            return 0    # released as soon as the swap snapshot is written
+        return estimate_memory(self.stats.chars, self.stats.line_count)
+
+    def sync_modified(self):
+        """Apply the remembered modified flag to a freshly loaded buffer."""
+        if self.editor is not None:
+            self.text.edit_modified(self._modified)
+
+    def detach(self):
+        """
+        Forget the editor and everything derived from the buffer.
+
+        The cursor, scroll position and modified flag are remembered for
+        when the document is loaded again.
+
+        Returns:
+            editor.EditorWidget: The editor, for the caller to destroy
+        """
+        editor = self.editor
+        text = editor.text
+        self._modified = bool(text.edit_modified())
+        self.cursor = text.index('insert')
+        self.yview = text.yview()[0]
+        self.editor = self.stats = self.summary = self.highlighter = self.search = self.spell = None
+        return editor
+
+    @property
+    def unloadable(self):
+        """True if the document is loaded and can safely be unloaded now."""
+        return (self.editor is not None and self.loader is None and self.huge is None
+                and self.swap_job is None and not self.saving)
+
+
+def pick_unload(docs, budget, active=None):
+    """
+    Choose documents to unload so the loaded ones fit in a budget.
+
+    Unmodified documents go first, as they reload straight from disk; within
+    each group the least recently used go first. The active document is
+    never picked.
+
+    Args:
+        docs: All open documents
+        budget: Memory budget in bytes; 0 or less disables unloading
+        active: The document being shown
+
+    Returns:
+        list: Documents to unload, in order
+    """
+    if budget <= 0:
+        return []
+    total = sum(doc.memory_estimate() for doc in docs)
+    candidates = sorted(
+        (doc for doc in docs if doc is not active and doc.unloadable),
+        key=lambda doc: (doc.modified, doc.last_used),
+    )
+    picked = []
+    for doc in candidates:
+        if total <= budget:
+            break
+        total -= doc.memory_estimate()
+        picked.append(doc)
+    return picked
+
+
+def swap_dir(config_dir):
+    """Swap directory for this process, created on demand."""
+    path = os.path.join(config_dir, 'swap', str(os.getpid()))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def remove_swap_dir(config_dir):
+    """Remove this process's swap directory (on a clean exit)."""
+    shutil.rmtree(os.path.join(config_dir, 'swap', str(os.getpid())), ignore_errors=True)
+
+
+def clean_swap(config_dir):
+    """Remove swap directories left behind by processes that have exited."""
+    root = os.path.join(config_dir, 'swap')
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return
+    for name in names:
+        if name.isdigit() and not autosave.pid_alive(int(name)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
@@ -13,6 +13,22 @@ LIGHT_THEME = {
     'gutter_fg': '#666666',
     'status_bg': '#E0E0E0',
     'status_fg': '#000000',
+    'syntax_keyword': '#0000FF',
+    'syntax_builtin': '#795E26',
+    'syntax_string': '#A31515',
+    'syntax_comment': '#008000',
+    'syntax_number': '#098658',
+    'syntax_definition': '#001080',
+    'syntax_decorator': '#AF00DB',
+    'syntax_heading': '#800000',
+    'syntax_code': '#A31515',
+    'syntax_emphasis': '#000080',
+    'syntax_link': '#0451A5',
+    'search_bg': '#FFF176',
+    'search_current_bg': '#FF9632',
+    'spell_error': '#E51400',
+    'minimap_fg': '#B8B8B8',
+    'minimap_view': '#316AC5',
 }
 
 DARK_THEME = {
@@ -25,6 +41,22 @@ DARK_THEME = {
     'gutter_fg': '#858585',
     'status_bg': '#007ACC',
     'status_fg': '#FFFFFF',
+    'syntax_keyword': '#569CD6',
+    'syntax_builtin': '#DCDCAA',
+    'syntax_string': '#CE9178',
+    'syntax_comment': '#6A9955',
+    'syntax_number': '#B5CEA8',
+    'syntax_definition': '#4EC9B0',
+    'syntax_decorator': '#C586C0',
+    'syntax_heading': '#569CD6',
+    'syntax_code': '#CE9178',
+    'syntax_emphasis': '#9CDCFE',
+    'syntax_link': '#3794FF',
+    'search_bg': '#613214',
+    'search_current_bg': '#9E6A03',
+    'spell_error': '#F14C4C',
+    'minimap_fg': '#555555',
+    'minimap_view': '#858585',
 }
 
 
@@ -3,8 +3,21 @@
 UI components (menus, dialogs) for PyNote.
 """
 
+from collections import deque
+import os
+import re
 import tkinter as tk
-from tkinter import messagebox, simpledialog
+from tkinter import ttk
+
+try:
+    from . import search, utils
+except ImportError:
+    from pynote import search, utils
+
+# Only needed once a dialog or panel is opened
+messagebox = utils.lazy_import('tkinter.messagebox')
+filedialog = utils.lazy_import('tkinter.filedialog')
+findfiles = utils.lazy_import(f"{utils.__name__.rpartition('.')[0]}.findfiles")
 
 
 class AboutDialog:
@@ -107,6 +120,384 @@ class GoToLineDialog:
             messagebox.showerror('Error', 'Please enter a valid number')
 
 
+class FindBar:
+    """Find & Replace bar driving a search.SearchController."""
+    
+    SEARCH_DELAY_MS = 150
+    
+    def __init__(self, parent, controller, **pack_options):
+        """
+        Create the bar (hidden until ``show`` is called).
+        
+        Args:
+            parent: Parent widget
+            controller: search.SearchController for the editor, or None
+                until ``set_controller`` is called
+            **pack_options: Options used to pack the bar when shown
+        """
+        self.parent = parent
+        self.controller = controller
+        self.pack_options = pack_options
+        self.visible = False
+        self.find_var = tk.StringVar()
+        self.replace_var = tk.StringVar()
+        self.regex = tk.BooleanVar(value=False)
+        self.case = tk.BooleanVar(value=False)
+        self.whole_word = tk.BooleanVar(value=False)
+        self.message = tk.StringVar()
+        self._search_id = None
+        self._create_widgets()
+        if controller is not None:
+            controller.on_update = self._on_update
+    
+    def _create_widgets(self):
+        self.frame = ttk.Frame(self.parent)
+        find_row = ttk.Frame(self.frame)
+        find_row.pack(side='top', fill='x')
+        self.replace_row = ttk.Frame(self.frame)
+        
+        ttk.Label(find_row, text='Find:', width=8).pack(side='left', padx=4)
+        self.find_entry = ttk.Entry(find_row, textvariable=self.find_var, width=30)
+        self.find_entry.pack(side='left', pady=2)
+        ttk.Button(find_row, text='Next', command=self.find_next).pack(side='left', padx=2)
+        ttk.Button(find_row, text='Previous', command=lambda: self.find_next(backwards=True)).pack(side='left', padx=2)
+        for label, var in (('Regex', self.regex), ('Match case', self.case), ('Whole word', self.whole_word)):
+            ttk.Checkbutton(find_row, text=label, variable=var, command=self._search_now).pack(side='left', padx=2)
+        ttk.Label(find_row, textvariable=self.message).pack(side='left', padx=8)
+        ttk.Button(find_row, text='✕', width=3, command=self.hide).pack(side='right', padx=4)
+        
+        ttk.Label(self.replace_row, text='Replace:', width=8).pack(side='left', padx=4)
+        self.replace_entry = ttk.Entry(self.replace_row, textvariable=self.replace_var, width=30)
+        self.replace_entry.pack(side='left', pady=2)
+        ttk.Button(self.replace_row, text='Replace', command=self.replace).pack(side='left', padx=2)
+        ttk.Button(self.replace_row, text='Replace All', command=self.replace_all).pack(side='left', padx=2)
+        
+        self.find_entry.bind('<KeyRelease>', self._on_key)
+        for entry in (self.find_entry, self.replace_entry):
+            entry.bind('<Return>', lambda e: self._run(self.find_next))
+            entry.bind('<Shift-Return>', lambda e: self._run(self.find_next, backwards=True))
+            entry.bind('<Escape>', lambda e: self._run(self.hide))
+        self.replace_entry.bind('<Control-Return>', lambda e: self._run(self.replace_all))
+    
+    @staticmethod
+    def _run(func, *args, **kwargs):
+        func(*args, **kwargs)
+        return 'break'
+    
+    def set_controller(self, controller):
+        """Drive another editor's controller (e.g. after switching tabs)."""
+        if controller is self.controller:
+            return
+        if self.controller is not None:
+            self.controller.on_update = None
+            self.controller.clear()
+        self.controller = controller
+        controller.on_update = self._on_update
+        if self.visible:
+            self._search_now()
+    
+    def show(self, replace=False):
+        """Show the bar and focus the find field."""
+        if replace:
+            self.replace_row.pack(side='top', fill='x')
+        else:
+            self.replace_row.pack_forget()
+        if not self.visible:
+            self.frame.pack(**self.pack_options)
+            self.visible = True
+        try:
+            selected = self.controller.text.get('sel.first', 'sel.last')
+        except tk.TclError:
+            selected = ''
+        if selected and '\n' not in selected:
+            self.find_var.set(selected)
+        self.find_entry.focus_set()
+        self.find_entry.select_range(0, 'end')
+        self._search_now()
+    
+    def hide(self):
+        """Hide the bar, clear the highlighting and return to the editor."""
+        self.frame.pack_forget()
+        self.visible = False
+        self.controller.clear()
+        self.controller.text.focus_set()
+    
+    def find_next(self, backwards=False):
+        """Select the next (or previous) match."""
+        if self._search_id is not None:
+            self._search_now()
+        self.controller.find_next(backwards)
+    
+    def replace(self):
+        """Replace the selected match and move to the next one."""
+        self.controller.replace_current(self.replace_var.get(), literal=not self.regex.get())
+    
+    def replace_all(self):
+        """Replace every match in one undoable step."""
+        self.controller.replace_all(self.replace_var.get(), literal=not self.regex.get())
+    
+    def _on_key(self, event):
+        # Search as the user types, once typing pauses
+        if event.keysym in ('Return', 'Escape'):
+            return
+        if self._search_id is not None:
+            self.frame.after_cancel(self._search_id)
+        self._search_id = self.frame.after(self.SEARCH_DELAY_MS, self._search_now)
+    
+    def _search_now(self):
+        if self._search_id is not None:
+            self.frame.after_cancel(self._search_id)
+            self._search_id = None
+        text = self.find_var.get()
+        if not text:
+            self.controller.clear()
+            return
+        try:
+            pattern = search.compile_pattern(
+                text,
+                regex=self.regex.get(),
+                case=self.case.get(),
+                whole_word=self.whole_word.get(),
+            )
+        except re.error as e:
+            self.controller.clear()
+            self.message.set(f'Invalid pattern: {e}')
+            return
+        self.controller.replaced = None
+        self.controller.search(pattern)
+    
+    def _on_update(self):
+        controller = self.controller
+        if controller.error is not None:
+            self.message.set(f'Search failed: {controller.error}')
+        elif controller.pattern is None:
+            self.message.set('')
+        elif controller.job is not None and controller.job.replacement is not None:
+            self.message.set('Replacing...')
+        else:
+            count = len(controller.matches)
+            text = f'{count:,} match' + ('' if count == 1 else 'es')
+            if controller.replaced is not None:
+                text = f'Replaced {controller.replaced:,} | ' + text
+            if controller.searching:
+                text = f'Searching... {text}'
+            self.message.set(text)
+
+
+class FindInFilesPanel:
+    """
+    Find in Files panel: searches a folder with findfiles.FileSearch and
+    lists the matching lines grouped by file.
+
+    Results are polled with ``after`` and added to the list at most
+    ``ROWS_PER_POLL`` rows at a time, so a search with many matches never
+    blocks the UI. Per-file results are cached across searches.
+    """
+
+    POLL_MS = 30
+    ROWS_PER_POLL = 500
+    MAX_ROWS = 20000
+
+    def __init__(self, parent, on_open, **pack_options):
+        """
+        Create the panel (hidden until ``show`` is called).
+
+        Args:
+            parent: Parent widget
+            on_open: Called with (path, line, col) when a result is chosen
+            **pack_options: Options used to pack the panel when shown
+        """
+        self.parent = parent
+        self.on_open = on_open
+        self.pack_options = pack_options
+        self.visible = False
+        self.find_var = tk.StringVar()
+        self.folder_var = tk.StringVar()
+        self.regex = tk.BooleanVar(value=False)
+        self.case = tk.BooleanVar(value=False)
+        self.whole_word = tk.BooleanVar(value=False)
+        self.message = tk.StringVar()
+        self.cache = findfiles.ResultCache()
+        self.job = None
+        self.root = None
+        self._after_id = None
+        self._pending = deque()
+        self._items = {}
+        self._rows = 0
+        self._matches = 0
+        self._files = 0
+        self._create_widgets()
+
+    def _create_widgets(self):
+        self.frame = ttk.Frame(self.parent)
+        row = ttk.Frame(self.frame)
+        row.pack(side='top', fill='x')
+        ttk.Label(row, text='Find:').pack(side='left', padx=4)
+        self.find_entry = ttk.Entry(row, textvariable=self.find_var, width=24)
+        self.find_entry.pack(side='left', pady=2)
+        ttk.Label(row, text='In:').pack(side='left', padx=4)
+        ttk.Entry(row, textvariable=self.folder_var, width=24).pack(side='left', pady=2)
+        ttk.Button(row, text='...', width=3, command=self._browse).pack(side='left', padx=2)
+        for label, var in (('Regex', self.regex), ('Match case', self.case), ('Whole word', self.whole_word)):
+            ttk.Checkbutton(row, text=label, variable=var).pack(side='left', padx=2)
+        ttk.Button(row, text='Search', command=self.search).pack(side='left', padx=2)
+        ttk.Button(row, text='Stop', command=self.stop).pack(side='left', padx=2)
+        ttk.Label(row, textvariable=self.message).pack(side='left', padx=8)
+        ttk.Button(row, text='✕', width=3, command=self.hide).pack(side='right', padx=4)
+
+        body = ttk.Frame(self.frame)
+        body.pack(side='top', fill='both', expand=True)
+        self.tree = ttk.Treeview(body, columns=('line', 'text'), height=10, selectmode='browse')
+        self.tree.heading('#0', text='File')
+        self.tree.heading('line', text='Line')
+        self.tree.heading('text', text='Text')
+        self.tree.column('#0', width=220, stretch=False)
+        self.tree.column('line', width=60, stretch=False, anchor='e')
+        self.tree.column('text', width=400)
+        vsb = ttk.Scrollbar(body, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        vsb.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+
+        self.tree.bind('<ButtonRelease-1>', lambda e: self._open_selected())
+        self.tree.bind('<Return>', lambda e: self._open_selected())
+        self.find_entry.bind('<Return>', lambda e: self.search() or 'break')
+        self.frame.bind('<Escape>', lambda e: self.hide())
+        self.find_entry.bind('<Escape>', lambda e: self.hide() or 'break')
+
+    def show(self, folder=None, text=None):
+        """
+        Show the panel and focus the find field.
+
+        Args:
+            folder: Folder to search, if none has been chosen yet
+            text: Initial search text (e.g. the editor's selection)
+        """
+        if folder and not self.folder_var.get():
+            self.folder_var.set(folder)
+        if text:
+            self.find_var.set(text)
+        if not self.visible:
+            self.frame.pack(**self.pack_options)
+            self.visible = True
+        self.find_entry.focus_set()
+        self.find_entry.select_range(0, 'end')
+
+    def hide(self):
+        """Hide the panel and stop a running search."""
+        self.stop()
+        self.frame.pack_forget()
+        self.visible = False
+
+    def close(self):
+        """Stop searching and the worker processes; call on exit."""
+        self.stop()
+        findfiles.shutdown()
+
+    def _browse(self):
+        folder = filedialog.askdirectory(initialdir=self.folder_var.get() or None)
+        if folder:
+            self.folder_var.set(folder)
+
+    def search(self):
+        """Start a search with the current fields, replacing the results."""
+        self.stop()
+        self.tree.delete(*self.tree.get_children())
+        self._items.clear()
+        self._pending.clear()
+        self._rows = self._matches = self._files = 0
+        text = self.find_var.get()
+        folder = self.folder_var.get()
+        if not text:
+            self.message.set('')
+            return
+        if not os.path.isdir(folder):
+            self.message.set('Choose a folder to search')
+            return
+        try:
+            pattern = search.compile_pattern(text, regex=self.regex.get(), case=self.case.get(),
+                                             whole_word=self.whole_word.get())
+        except re.error as e:
+            self.message.set(f'Invalid pattern: {e}')
+            return
+        self.root = folder
+        self.job = findfiles.FileSearch(folder, pattern, self.cache)
+        self.job.start()
+        self.message.set('Searching...')
+        self._after_id = self.frame.after(self.POLL_MS, self._poll)
+
+    def stop(self):
+        """Cancel the running search; results found so far stay listed."""
+        if self._after_id is not None:
+            self.frame.after_cancel(self._after_id)
+            self._after_id = None
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+            self._pending.clear()
+            self._update_message(stopped=True)
+
+    def _poll(self):
+        self._after_id = None
+        job = self.job
+        if job is None:
+            return
+        finished = job.done
+        self._pending.extend(r for r in job.results() if r.get('matches'))
+        self._insert_pending()
+        if finished and not self._pending:
+            self.job = None
+            self._update_message(error=job.error)
+            return
+        self._update_message()
+        self._after_id = self.frame.after(self.POLL_MS, self._poll)
+
+    def _insert_pending(self):
+        """Add queued file results to the list, up to ROWS_PER_POLL rows."""
+        budget = self.ROWS_PER_POLL
+        while self._pending and budget > 0:
+            if self._rows >= self.MAX_ROWS:
+                self._pending.clear()
+                return
+            result = self._pending.popleft()
+            path, matches = result['path'], result['matches']
+            parent = result.get('parent')
+            if parent is None:
+                self._files += 1
+                self._matches += len(matches)
+                rel = os.path.relpath(path, self.root)
+                parent = self.tree.insert('', 'end', text=rel, values=(len(matches), ''), open=True)
+                self._items[parent] = (path, matches[0][0], matches[0][1])
+                self._rows += 1
+                budget -= 1
+            shown = matches[:min(budget, self.MAX_ROWS - self._rows)]
+            for line, col, end_col, line_text in shown:
+                iid = self.tree.insert(parent, 'end', values=(line, line_text.strip()))
+                self._items[iid] = (path, line, col)
+            self._rows += len(shown)
+            budget -= len(shown)
+            if len(shown) < len(matches) and self._rows < self.MAX_ROWS:
+                # The rest of this file's matches go in on the next poll
+                self._pending.appendleft({'path': path, 'matches': matches[len(shown):], 'parent': parent})
+
+    def _update_message(self, error=None, stopped=False):
+        text = f'{self._matches:,} match' + ('' if self._matches == 1 else 'es') + f' in {self._files:,} files'
+        if self._rows >= self.MAX_ROWS:
+            text += f' (first {self.MAX_ROWS:,} shown)'
+        if error is not None:
+            text = f'Search failed: {error}'
+        elif stopped:
+            text = f'Stopped | {text}'
+        elif self.job is not None:
+            text = f'Searching {self.job.files:,} files... {text}'
+        self.message.set(text)
+
+    def _open_selected(self):
+        selection = self.tree.selection()
+        if selection and selection[0] in self._items:
+            self.on_open(*self._items[selection[0]])
+
+
 def show_about(parent):
     """Show about dialog."""
     AboutDialog(parent)
@@ -4,70 +4,263 @@ Utility functions for PyNote editor.
 """
 
 import os
+import io
 import json
+import codecs
+import importlib.util
+import sys
+import threading
 from pathlib import Path
 
 
+_config_dir = None
+
+
+def _read_umask():
+    """Return the process umask, without changing it where the OS allows."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    # Querying by setting it is process-wide; this module is imported at
+    # startup, before any threads exist
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Mode bits masked off new files (used by saver.write_atomic)
+UMASK = _read_umask()
+
+
+def lazy_import(name):
+    """
+    Import a module on first attribute access instead of right away.
+
+    Used for modules that are not needed to show the first window (dialogs,
+    the huge file viewer, saving), to keep startup short.
+
+    Args:
+        name: Absolute module name, e.g. 'tkinter.filedialog'
+
+    Returns:
+        module: The module, loaded as soon as one of its attributes is used
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
 def get_config_dir():
     """
     Get the configuration directory for PyNote.
+
+    The directory is created on the first call only.
     
     Returns:
         Path: Configuration directory path
     """
+    global _config_dir
+    if _config_dir is not None:
+        return _config_dir
     if os.name == 'nt':  # Windows
         config_dir = Path(os.environ.get('APPDATA', '')) / 'PyNote'
     else:  # macOS/Linux
         config_dir = Path.home() / '.config' / 'pynote'
     
     config_dir.mkdir(parents=True, exist_ok=True)
+    _config_dir = config_dir
     return config_dir
 
 
-def load_settings():
+DEFAULT_SETTINGS = {
+    'theme': 'light',
+    'autosave': False,
+    'autosave_interval': 300,  # seconds
+    'tab_size': 4,
+    'font_family': 'Courier New',
+    'font_size': 12,
+    'recent_files': [],
+    'huge_file_threshold': 256 * 1024 * 1024,  # bytes; 0 disables viewer mode
+    'tab_memory_budget': 512 * 1024 * 1024,  # bytes; 0 keeps every tab loaded
+    'show_minimap': True,
+    'undo_memory': 32 * 1024 * 1024,  # bytes of undo history kept per tab
+    'spell_check': False,
+    'restore_session': True,  # reopen the last session's files on start
+    'profile': False,  # instrument hot paths (or set PYNOTE_PROFILE=1)
+}
+
+
+class Settings:
     """
-    Load settings from JSON file.
-    
-    Returns:
-        dict: Settings dictionary
-    """
-    config_file = get_config_dir() / 'settings.json'
-    default_settings = {
-        'theme': 'light',
-        'autosave': False,
-        'autosave_interval': 300,  # seconds
-        'tab_size': 4,
-        'font_family': 'Courier New',
-        'font_size': 12,
-        'recent_files': [],
-    }
-    
-    if config_file.exists():
+    In-memory settings store with debounced, atomic write-behind.
+
+    Reads are served from memory. Changes notify subscribers immediately and
+    are written to disk once no change has arrived for ``debounce`` seconds,
+    through a temp file and rename. ``refresh`` reloads the file only if its
+    mtime changed since it was last read or written.
+
+    Args:
+        path: Settings file
+        debounce: Seconds to wait for further changes before writing
+    """
+
+    def __init__(self, path, debounce=0.5):
+        self.path = Path(path)
+        self.debounce = debounce
+        self.writes = 0
+        self._data = dict(DEFAULT_SETTINGS)
+        self._mtime = None
+        self._subscribers = []
+        self._timer = None
+        self._lock = threading.RLock()
+        self._read()
+
+    def get(self, key, default=None):
+        """Get a setting."""
+        with self._lock:
+            return self._data.get(key, default)
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def as_dict(self):
+        """Return a copy of all settings."""
+        with self._lock:
+            return dict(self._data)
+
+    def update(self, values):
+        """Change several settings at once and schedule a write."""
+        with self._lock:
+            changed = {k: v for k, v in values.items() if self._data.get(k) != v}
+            if not changed:
+                return
+            self._data.update(changed)
+            self._schedule_write()
+        self._notify(changed)
+
+    def subscribe(self, callback):
+        """Register callback(changed) where changed maps keys to new values."""
+        self._subscribers.append(callback)
+
+    def refresh(self):
+        """Reload from disk if another process changed the file."""
         try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                settings = json.load(f)
-            # Merge with defaults to handle missing keys
-            default_settings.update(settings)
-            return default_settings
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._mtime or self._timer is not None:
+                return
+            before = dict(self._data)
+            self._read()
+            changed = {k: v for k, v in self._data.items() if before.get(k) != v}
+        if changed:
+            self._notify(changed)
+
+    def flush(self):
+        """Write pending changes now."""
+        with self._lock:
+            if self._timer is None:
+                return
+            self._timer.cancel()
+            self._timer = None
+            self._write()
+
+    def _notify(self, changed):
+        for callback in self._subscribers:
+            callback(changed)
+
+    def _read(self):
+        try:
+            mtime = self.path.stat().st_mtime_ns
+            with open(self.path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
         except Exception:
-            return default_settings
+            return
+        # Merge with defaults to handle missing keys
+        self._data = dict(DEFAULT_SETTINGS)
+        self._data.update(loaded)
+        self._mtime = mtime
+
+    def _schedule_write(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        # Not a daemon: a pending write still happens at interpreter exit
+        self._timer = threading.Timer(self.debounce, self._timer_fired)
+        self._timer.start()
+
+    def _timer_fired(self):
+        with self._lock:
+            if self._timer is None:
+                return
+            self._timer = None
+            self._write()
+
+    def _write(self):
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp, self.path)
+            self._mtime = self.path.stat().st_mtime_ns
+            self.writes += 1
+        except Exception as e:
+            print(f"Failed to save settings: {e}")
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings():
+    """
+    Get the process-wide settings store, loading it on first use.
+
+    Returns:
+        Settings: Shared settings object
+    """
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            _settings = Settings(get_config_dir() / 'settings.json')
+        return _settings
+
+
+def load_settings():
+    """
+    Load settings.
     
-    return default_settings
+    Returns:
+        dict: Copy of the settings
+    """
+    return get_settings().as_dict()
 
 
 def save_settings(settings):
     """
-    Save settings to JSON file.
+    Save settings; the write happens in the background after a short delay.
     
     Args:
         settings: Settings dictionary
     """
-    config_file = get_config_dir() / 'settings.json'
-    try:
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, indent=2)
-    except Exception as e:
-        print(f"Failed to save settings: {e}")
+    get_settings().update(settings)
 
 
 def count_words(text):
@@ -96,27 +289,165 @@ def count_chars(text):
     return len(text.rstrip('\n'))
 
 
+# Byte order marks, longest first (the UTF-32-LE BOM starts with UTF-16-LE's).
+# The codecs named here consume the BOM on decode and write it on encode.
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+SAMPLE_SIZE = 64 * 1024
+READ_SIZE = 1 << 20
+
+
+def _sniff_encoding(sample, at_eof):
+    """Pick an encoding from a byte sample: BOM, then UTF-8, then Latin-1."""
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=at_eof)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def newline_style(text):
+    """Return the dominant line ending in text ('\n' if there is none)."""
+    crlf = text.count('\r\n')
+    lf = text.count('\n') - crlf
+    cr = text.count('\r') - crlf
+    best = max((lf, '\n'), (crlf, '\r\n'), (cr, '\r'))
+    return best[1] if best[0] else '\n'
+
+
+class DecodedFile:
+    """
+    A file decoded incrementally, read from disk exactly once.
+
+    The encoding and line-ending style are sniffed from the first
+    ``sample_size`` bytes; that sample is then returned by the first
+    ``read`` call instead of being read again. Line endings are translated
+    to ``'\n'``. If a file that looked like UTF-8 turns out to contain
+    invalid bytes further on, the rest is decoded as Latin-1 and
+    ``fallback`` is set.
+
+    Attributes:
+        encoding: Encoding name suitable for writing the file back
+        newline: Line ending found in the sample ('\n', '\r\n' or '\r')
+        fallback: True if part of the file had to be decoded as Latin-1
+    """
+
+    def __init__(self, filepath, sample_size=SAMPLE_SIZE):
+        self._file = open(filepath, 'rb')
+        try:
+            sample = self._file.read(sample_size)
+            at_eof = len(sample) < sample_size
+            self.encoding = _sniff_encoding(sample, at_eof)
+            self.fallback = False
+            self._decoder = codecs.getincrementaldecoder(self.encoding)()
+            self._newlines = io.IncrementalNewlineDecoder(None, translate=True)
+            raw = self._decode(sample, at_eof)
+            self.newline = newline_style(raw)
+            self._buffer = self._newlines.decode(raw, final=at_eof)
+            self._eof = at_eof
+        except Exception:
+            self._file.close()
+            raise
+
+    def _decode(self, data, final):
+        try:
+            return self._decoder.decode(data, final)
+        except UnicodeDecodeError as e:
+            if self.encoding != 'utf-8':
+                raise
+            # Mixed file: keep what decoded cleanly, Latin-1 from here on
+            self.fallback = True
+            self.encoding = 'latin-1'
+            self._decoder = codecs.getincrementaldecoder('latin-1')()
+            return e.object[:e.start].decode('utf-8') + e.object[e.start:].decode('latin-1')
+
+    def read(self, size=READ_SIZE):
+        """
+        Read and decode roughly ``size`` bytes; returns '' at end of file.
+
+        A negative size reads the rest of the file.
+        """
+        if self._buffer:
+            text, self._buffer = self._buffer, ''
+            return text
+        while not self._eof:
+            data = self._file.read(size) if size >= 0 else self._file.read()
+            self._eof = not data or size < 0
+            text = self._newlines.decode(self._decode(data, self._eof), final=self._eof)
+            if text:
+                return text
+        return ''
+
+    def read_all(self):
+        """Read and decode everything that is left."""
+        parts = []
+        while True:
+            text = self.read(-1)
+            if not text:
+                return ''.join(parts)
+            parts.append(text)
+
+    def tell(self):
+        """Number of bytes read from disk so far."""
+        return self._file.tell()
+
+    def close(self):
+        """Close the underlying file."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_decoded(filepath, sample_size=SAMPLE_SIZE):
+    """
+    Open a file for incremental decoding with a sniffed encoding.
+
+    Args:
+        filepath: Path to file
+        sample_size: Bytes inspected to choose the encoding
+
+    Returns:
+        DecodedFile: Stream with ``encoding`` and ``newline`` attributes
+    """
+    return DecodedFile(filepath, sample_size)
+
+
+def read_text(filepath):
+    """
+    Read a whole file with a sniffed encoding.
+
+    Returns:
+        tuple: (text, encoding, newline)
+    """
+    with open_decoded(filepath) as f:
+        return f.read_all(), f.encoding, f.newline
+
+
 def detect_encoding(filepath):
     """
-    Detect file encoding (basic implementation).
-    
+    Detect file encoding from its BOM or a bounded sample.
+
     Args:
         filepath: Path to file
-    
+
     Returns:
         str: Encoding name (defaults to 'utf-8')
     """
     try:
-        # Try UTF-8 first
-        with open(filepath, 'r', encoding='utf-8') as f:
-            f.read()
+        with open_decoded(filepath) as f:
+            return f.encoding
+    except Exception:
         return 'utf-8'
-    except UnicodeDecodeError:
-        # Fallback to latin-1
-        try:
-            with open(filepath, 'r', encoding='latin-1') as f:
-                f.read()
-            return 'latin-1'
-        except Exception:
-            return 'utf-8'
-
@@ -0,0 +1,296 @@
+"""
+External change watching for PyNote.
+
+``FileWatcher`` notices when another program rewrites, appends to or
+deletes a file that is open. On Linux it asks inotify about the files'
+directories (so atomic saves that rename a new file into place are seen as
+well); elsewhere, or if inotify is unavailable, a background thread
+compares each file's size and mtime once a second. Changes are queued and
+collected with ``changes`` from an ``after`` poll on the Tk side.
+
+``Tail`` remembers where the editor's copy of a file ends, so a file that
+only grew - a log being written, say - is followed by reading just the
+new bytes, as ``tail -f`` does.
+"""
+
+import codecs
+from collections import deque
+import ctypes
+import io
+import os
+import select
+import struct
+import sys
+import threading
+
+from .saver import file_stamp
+
+
+# Seconds between stat polls without inotify (and the inotify wait timeout)
+POLL_SECONDS = 1.0
+# Bytes before the old end of file compared to tell an append from a rewrite
+TAIL_BYTES = 4096
+# Appends larger than this are loaded like any other change
+MAX_APPEND = 8 * 1024 * 1024
+
+
+class _Inotify:
+    """Just enough of inotify(7) through ctypes; raises OSError where unavailable."""
+
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+            | IN_CREATE | IN_DELETE)
+    _EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux')
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def add(self, directory):
+        """Watch a directory; returns the watch descriptor."""
+        wd = self._add(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'cannot watch {directory}')
+        return wd
+
+    def remove(self, wd):
+        self._rm(self.fd, wd)
+
+    def read(self):
+        """Return (watch descriptor, file name) for the pending events."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos + self._EVENT.size <= len(data):
+            wd, _mask, _cookie, length = self._EVENT.unpack_from(data, pos)
+            pos += self._EVENT.size
+            name = data[pos:pos + length].rstrip(b'\0')
+            pos += length
+            events.append((wd, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """
+    Report files changed by other processes.
+
+    A change is reported once per new ``(size, mtime_ns)`` stamp; after
+    writing a file itself, the editor passes the new stamp to ``watch`` so
+    its own saves are not reported.
+
+    Args:
+        interval: Seconds between polls when inotify is not used
+        use_inotify: Try inotify first (Linux only)
+
+    Attributes:
+        backend: 'inotify' or 'poll'
+    """
+
+    def __init__(self, interval=POLL_SECONDS, use_inotify=True):
+        self.interval = interval
+        self._files = {}
+        self._dirs = {}
+        self._wds = {}
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._stop = threading.Event()
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                pass
+        self.backend = 'inotify' if self._inotify is not None else 'poll'
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching; the thread exits within ``interval`` seconds."""
+        self._stop.set()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+
+    def watch(self, path, stamp=None):
+        """
+        Watch a file, or accept its current version as known.
+
+        Changes to ``stamp`` that were queued but not yet collected are
+        dropped, so a save the editor has just finished is never reported.
+
+        Args:
+            path: File to watch
+            stamp: ``saver.file_stamp`` of the version the editor has
+                (default: the file as it is now)
+        """
+        path = os.path.abspath(path)
+        if stamp is None:
+            stamp = file_stamp(path)
+        directory = os.path.dirname(path)
+        with self._lock:
+            self._files[path] = stamp
+            self._queue = deque(change for change in self._queue if change != (path, stamp))
+            if self._inotify is not None and directory not in self._dirs:
+                try:
+                    wd = self._inotify.add(directory)
+                except OSError:
+                    wd = None    # polled instead
+                self._dirs[directory] = wd
+                if wd is not None:
+                    self._wds[wd] = directory
+
+    def unwatch(self, path):
+        """Stop watching a file."""
+        path = os.path.abspath(path)
+        directory = os.path.dirname(path)
+        with self._lock:
+            self._files.pop(path, None)
+            if directory in self._dirs and not any(os.path.dirname(p) == directory for p in self._files):
+                wd = self._dirs.pop(directory)
+                if wd is not None:
+                    self._wds.pop(wd, None)
+                    if self._inotify is not None:
+                        self._inotify.remove(wd)
+
+    def changes(self):
+        """
+        Return the changes found since the last call.
+
+        Returns:
+            list: ``(path, stamp)`` pairs; stamp is None if the file is gone
+        """
+        with self._lock:
+            out = list(self._queue)
+            self._queue.clear()
+        return out
+
+    def _check(self, paths):
+        for path in paths:
+            stamp = file_stamp(path)
+            with self._lock:
+                if path not in self._files or self._files[path] == stamp:
+                    continue
+                self._files[path] = stamp
+                # Queued under the lock so ``watch`` can take it back
+                self._queue.append((path, stamp))
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                if self._inotify is None:
+                    self._stop.wait(self.interval)
+                    with self._lock:
+                        paths = list(self._files)
+                    self._check(paths)
+                    continue
+                ready = select.select([self._inotify.fd], [], [], self.interval)[0]
+                with self._lock:
+                    # Files in directories inotify refused to watch are polled
+                    paths = [p for p in self._files if self._dirs.get(os.path.dirname(p)) is None]
+                if ready:
+                    for wd, name in self._inotify.read():
+                        with self._lock:
+                            directory = self._wds.get(wd)
+                        if directory is not None and name:
+                            paths.append(os.path.join(directory, name))
+                self._check(set(paths))
+        finally:
+            with self._lock:
+                if self._inotify is not None:
+                    self._inotify.close()
+                    self._inotify = None
+
+
+def appended(path, size, tail):
+    """
+    Read what was added to a file that has only grown since it was checked.
+
+    Only the last bytes before the old end of file (``tail``) are compared,
+    so a rewrite that keeps them is mistaken for an append.
+
+    Args:
+        path: The file
+        size: Its size when it was last read
+        tail: Its last bytes at that time (up to ``TAIL_BYTES``)
+
+    Returns:
+        bytes: The new bytes (empty if none), or None if the file shrank,
+        was rewritten or grew by more than ``MAX_APPEND``
+    """
+    with open(path, 'rb') as f:
+        end = os.fstat(f.fileno()).st_size
+        if end < size or end - size > MAX_APPEND:
+            return None
+        f.seek(size - len(tail))
+        if f.read(len(tail)) != tail:
+            return None
+        return f.read(end - size)
+
+
+def read_tail(path, size):
+    """The up to ``TAIL_BYTES`` bytes of a file before offset size."""
+    with open(path, 'rb') as f:
+        f.seek(max(0, size - TAIL_BYTES))
+        return f.read(size - f.tell())
+
+
+class Tail:
+    """
+    The end of a file as far as the editor has read it.
+
+    Args:
+        path: The file
+        encoding: Its encoding
+        size: Bytes the editor has read (default: the file's size now)
+    """
+
+    def __init__(self, path, encoding, size=None):
+        self.path = path
+        self.size = os.path.getsize(path) if size is None else size
+        self.tail = read_tail(path, self.size)
+        # Newlines are translated like the loader does, even when a
+        # '\r\n' pair is split between two appends
+        self._decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(encoding)(errors='replace'), translate=True)
+
+    def read(self):
+        """
+        Read the text appended since the last call.
+
+        Returns:
+            str: The new text ('' if none), or None if the file changed in
+            some other way and has to be loaded again
+        """
+        try:
+            data = appended(self.path, self.size, self.tail)
+        except OSError:
+            return None
+        if data is None:
+            return None
+        self.size += len(data)
+        self.tail = (self.tail + data)[-TAIL_BYTES:]
+        return self._decoder.decode(data)
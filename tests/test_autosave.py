@@ -0,0 +1,98 @@
+"""
+Unit tests for the autosave edit journal.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from src.pynote import autosave
+
+
+def _random_edits(rng, content, count):
+    """Yield (entry, content_after) for random line-range edits."""
+    for _ in range(count):
+        lines = content.split('\n')
+        first = rng.randrange(1, len(lines) + 1)
+        old_last = min(len(lines), first + rng.choice((0, 0, 0, 1, 2)))
+        text = '\n'.join(lines[first - 1:old_last])
+        if rng.random() < 0.7:
+            pos = rng.randrange(len(text) + 1)
+            text = text[:pos] + rng.choice(('a', 'b', ' ', '\n', 'xy')) + text[pos:]
+        elif text:
+            pos = rng.randrange(len(text))
+            text = text[:pos] + text[pos + 1:]
+        lines[first - 1:old_last] = text.split('\n')
+        content = '\n'.join(lines)
+        yield [first, old_last, text], content
+
+
+class TestJournal(unittest.TestCase):
+    """Test cases for journal compaction, replay and recovery."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_compact_preserves_replay(self):
+        """Test that compacted journals replay to the same content."""
+        rng = random.Random(7)
+        base = 'first line\nsecond\n\nlast'
+        entries = []
+        content = base
+        for entry, content in _random_edits(rng, base, 1500):
+            entries.append(entry)
+        self.assertEqual(autosave.replay(base, entries), content)
+        compacted = autosave.compact(entries)
+        self.assertLess(len(compacted), len(entries))
+        self.assertEqual(autosave.replay(base, compacted), content)
+
+    def test_typing_collapses(self):
+        """Test that keystrokes on one line collapse into one entry."""
+        entries = [[3, 3, 'h'], [3, 3, 'he'], [3, 3, 'hel'], [3, 3, 'hell']]
+        self.assertEqual(autosave.compact(entries), [[3, 3, 'hell']])
+
+    def test_flush_and_recover(self):
+        """Test that flushed entries can be read back and replayed."""
+        journal = autosave.EditJournal(self.tmpdir.name)
+        journal.begin('/tmp/doc.txt', '/tmp/doc.txt')
+        journal.record(1, 1, 'hello')
+        journal.flush()
+        journal.record(1, 1, 'hello\nworld')
+        journal.flush()
+        header, entries = autosave.read_journal(journal.path)
+        self.assertEqual(header['path'], '/tmp/doc.txt')
+        self.assertEqual(autosave.replay('', entries), 'hello\nworld')
+        # The writing process is alive, so the journal is not offered
+        self.assertEqual(autosave.find_recoverable(self.tmpdir.name), [])
+        journal.close()
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_base_stamp(self):
+        """Test that a base changed after the journal began is detected."""
+        base = os.path.join(self.tmpdir.name, 'doc.txt')
+        with open(base, 'w') as f:
+            f.write('one\n')
+        journal = autosave.EditJournal(os.path.join(self.tmpdir.name, 'journals'))
+        # Still being saved: no stamp yet
+        journal.begin(base, base)
+        journal.record(1, 1, 'two')
+        journal.flush()
+        header, _ = autosave.read_journal(journal.path)
+        self.assertTrue(autosave.base_changed(header))
+        journal.set_base_stamp(autosave.file_stamp(base))
+        journal.flush()
+        header, entries = autosave.read_journal(journal.path)
+        self.assertFalse(autosave.base_changed(header))
+        self.assertEqual(entries, [[1, 1, 'two']])
+        with open(base, 'a') as f:
+            f.write('changed by another program\n')
+        self.assertTrue(autosave.base_changed(header))
+        self.assertFalse(autosave.base_changed({'base': None}))
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
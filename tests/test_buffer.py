@@ -0,0 +1,119 @@
+"""
+Unit tests for the rope text model.
+"""
+
+import math
+import random
+import threading
+import unittest
+from src.pynote import buffer
+from src.pynote.buffer import TextBuffer
+
+
+def _line_starts(text):
+    starts = [0]
+    for i, ch in enumerate(text):
+        if ch == '\n':
+            starts.append(i + 1)
+    return starts
+
+
+class TestTextBuffer(unittest.TestCase):
+
+    def test_empty(self):
+        buf = TextBuffer()
+        self.assertEqual(len(buf), 0)
+        self.assertEqual(str(buf), '')
+        self.assertEqual(buf.line_count, 1)
+        self.assertEqual(buf.lines(1, 1), '')
+        self.assertEqual(buf.position(0), (1, 0))
+
+    def test_edits_match_str(self):
+        rnd = random.Random(7)
+        text = ''.join(rnd.choice('ab \n') for _ in range(20000))
+        buf = TextBuffer(text)
+        for i in range(2000):
+            start = rnd.randint(0, len(text))
+            end = min(len(text), start + rnd.choice([0, 1, 40, 6000]))
+            new = ''.join(rnd.choice('xy\n') for _ in range(rnd.choice([0, 1, 12, 5000])))
+            buf.replace(start, end, new)
+            text = text[:start] + new + text[end:]
+            self.assertEqual(len(buf), len(text))
+            if i % 250 == 0:
+                self.assertEqual(str(buf), text)
+        self.assertEqual(str(buf), text)
+        self.assertEqual(buf.line_count, text.count('\n') + 1)
+
+    def test_stays_balanced(self):
+        buf = TextBuffer()
+        for i in range(20000):
+            buf.insert(len(buf) // 2, 'line %d\n' % i)
+        leaves = len(buf.chunks())
+        # AVL height bound
+        self.assertLessEqual(buf.height, 1.45 * math.log2(leaves + 2))
+
+    def test_delete_everything(self):
+        buf = TextBuffer('x' * 10000)
+        buf.delete(0, len(buf))
+        self.assertEqual(len(buf), 0)
+        buf.insert(0, 'a\nb')
+        self.assertEqual(buf.lines(2, 2), 'b')
+
+    def test_line_lookups(self):
+        rnd = random.Random(3)
+        text = ''.join(rnd.choice('abc\n\n') for _ in range(30000))
+        buf = TextBuffer(text)
+        starts = _line_starts(text)
+        lines = text.split('\n')
+        for line in range(1, len(starts) + 1, 17):
+            start = starts[line - 1]
+            self.assertEqual(buf.line_start(line), start)
+            self.assertEqual(buf.lines(line, line), lines[line - 1])
+            self.assertEqual(buf.line_of(start), line)
+            self.assertEqual(buf.index(line, 1), min(start + 1, start + len(lines[line - 1])))
+        for offset in range(0, len(text), 997):
+            line, col = buf.position(offset)
+            self.assertEqual(starts[line - 1] + col, offset)
+        self.assertEqual(buf.line_start(len(starts) + 5), len(text))
+
+    def test_lines_match_tk_get(self):
+        buf = TextBuffer('one\ntwo\nthree')
+        self.assertEqual(buf.lines(1, 2), 'one\ntwo')
+        self.assertEqual(buf.lines(2, 3), 'two\nthree')
+
+    def test_replace_lines(self):
+        buf = TextBuffer('one\ntwo\nthree\nfour')
+        buf.replace_lines(2, 3, 'TWO\nmid\nTHREE')
+        self.assertEqual(str(buf), 'one\nTWO\nmid\nTHREE\nfour')
+        buf.replace_lines(1, 5, '')
+        self.assertEqual(str(buf), '')
+
+    def test_snapshot_is_isolated(self):
+        buf = TextBuffer('abc\n' * 5000)
+        snap = buf.snapshot()
+        buf.insert(0, 'new\n')
+        buf.delete(100, 9000)
+        self.assertEqual(str(snap), 'abc\n' * 5000)
+        self.assertEqual(snap.line_count, 5001)
+
+    def test_snapshot_read_in_thread(self):
+        buf = TextBuffer('x' * (buffer.LEAF_SIZE * 50))
+        snap = buf.snapshot()
+        result = []
+        worker = threading.Thread(target=lambda: result.append(str(snap)))
+        worker.start()
+        for _ in range(500):
+            buf.insert(0, 'y')
+        worker.join()
+        self.assertEqual(result[0], 'x' * (buffer.LEAF_SIZE * 50))
+
+    def test_get_ranges(self):
+        text = ''.join(chr(97 + i % 26) for i in range(50000))
+        buf = TextBuffer(text)
+        for start, end in ((0, 10), (4000, 4100), (2047, 2049), (100, 49999), (49990, 60000)):
+            self.assertEqual(buf.get(start, end), text[start:end])
+        self.assertEqual(''.join(buf.chunks()), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
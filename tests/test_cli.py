@@ -0,0 +1,142 @@
+"""
+Unit tests for the headless batch CLI.
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from src.pynote import cli
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+        self.write('a.txt', b'hello world\r\nfoo bar\r\n')
+        self.write('b.bin', b'x\x00y')
+        self.write('sub/c.md', 'hello caf\xe9\n'.encode('latin-1'))
+        self.write('.hidden', b'hello\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def read(self, name):
+        with open(os.path.join(self.dir, name), 'rb') as f:
+            return f.read()
+
+    def run_cli(self, *argv, jobs=1):
+        out = io.StringIO()
+        status = cli.main(['-j', str(jobs)] + list(argv) + [self.dir], out=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        return status, records
+
+    def test_stats(self):
+        failed, records = self.run_cli('stats')
+        self.assertEqual(failed, 0)
+        by_name = {os.path.basename(r['path']): r for r in records}
+        self.assertEqual(sorted(by_name), ['a.txt', 'b.bin', 'c.md'])
+        self.assertEqual(by_name['b.bin'], {'path': by_name['b.bin']['path'], 'skipped': 'binary'})
+        a = by_name['a.txt']
+        self.assertEqual((a['words'], a['chars'], a['newline']), (4, 19, 'CRLF'))
+        self.assertEqual(by_name['c.md']['encoding'], 'latin-1')
+
+    def test_find(self):
+        failed, records = self.run_cli('find', '-w', 'hello')
+        self.assertEqual(failed, 0)
+        matches = [r for r in records if 'line' in r]
+        self.assertEqual(len(matches), 2)
+        self.assertEqual(matches[0]['text'], 'hello world')
+        self.assertEqual((matches[0]['line'], matches[0]['col'], matches[0]['end_col']), (1, 0, 5))
+
+    def test_replace_keeps_encoding_and_newlines(self):
+        self.run_cli('replace', '-e', r'h(e)llo', r'j\1llo')
+        self.assertEqual(self.read('a.txt'), b'jello world\r\nfoo bar\r\n')
+        self.assertEqual(self.read('sub/c.md'), 'jello caf\xe9\n'.encode('latin-1'))
+        self.assertEqual(self.read('.hidden'), b'hello\n')
+
+    def test_replace_dry_run(self):
+        _, records = self.run_cli('replace', '-n', 'o', '0')
+        counts = {os.path.basename(r['path']): r.get('replaced') for r in records}
+        self.assertEqual(counts['a.txt'], 4)
+        self.assertEqual(self.read('a.txt'), b'hello world\r\nfoo bar\r\n')
+
+    def test_normalize(self):
+        _, records = self.run_cli('normalize', '--newline', 'lf')
+        self.assertTrue(all(r['changed'] for r in records if 'changed' in r))
+        self.assertEqual(self.read('a.txt'), b'hello world\nfoo bar\n')
+        self.assertEqual(self.read('sub/c.md'), 'hello caf\xe9\n'.encode('utf-8'))
+
+    def test_process_pool(self):
+        failed, records = self.run_cli('stats', jobs=2)
+        self.assertEqual(failed, 0)
+        self.assertEqual(len(records), 3)
+
+    def test_mmap_read(self):
+        path = self.write('big.txt', b'line\r\n' * 10)
+        old = cli.MMAP_THRESHOLD
+        cli.MMAP_THRESHOLD = 1
+        try:
+            result = cli.read_file(path)
+        finally:
+            cli.MMAP_THRESHOLD = old
+        self.assertEqual(result, ('line\n' * 10, 'utf-8', '\r\n', False))
+
+    def test_mixed_file_written_as_utf8(self):
+        # Valid UTF-8 past the sniffed sample, then one Latin-1 byte
+        data = 'foo caf\xe9\n'.encode('utf-8') * 8000 + b'foo \xff\n'
+        pattern = cli.search.compile_pattern('foo', False, True, False)
+        for threshold in (cli.MMAP_THRESHOLD, 1):
+            with self.subTest(threshold=threshold):
+                path = self.write('mixed.txt', data)
+                with mock.patch.object(cli, 'MMAP_THRESHOLD', threshold):
+                    text, encoding, _, fallback = cli.read_file(path)
+                    self.assertEqual((encoding, fallback), ('utf-8', True))
+                    self.assertTrue(text.endswith('caf\xe9\nfoo \xff\n'))
+                    records = cli.replace_task(path, pattern=pattern, replacement='baz',
+                                               literal=True, dry_run=False)
+                self.assertEqual(records, [{'path': path, 'replaced': 8001}])
+                self.assertEqual(self.read('mixed.txt'),
+                                 'baz caf\xe9\n'.encode('utf-8') * 8000 + 'baz \xff\n'.encode('utf-8'))
+
+    def test_utf16_is_text(self):
+        path = self.write('wide/u16.txt', 'hello caf\xe9\r\n'.encode('utf-16'))
+        out = io.StringIO()
+        self.assertEqual(cli.main(['-j', '1', 'encoding', path], out=out), 0)
+        self.assertEqual(json.loads(out.getvalue()),
+                         {'path': path, 'encoding': 'utf-16', 'newline': 'CRLF'})
+        out = io.StringIO()
+        self.assertEqual(cli.main(['-j', '1', 'normalize', path], out=out), 0)
+        self.assertTrue(json.loads(out.getvalue())['changed'])
+        self.assertEqual(self.read('wide/u16.txt'), 'hello caf\xe9\r\n'.encode('utf-8'))
+
+    def test_missing_file_and_bad_pattern(self):
+        out = io.StringIO()
+        self.assertEqual(cli.run(cli.stats_task, [os.path.join(self.dir, 'nope')], jobs=1, out=out), 1)
+        self.assertIn('error', json.loads(out.getvalue()))
+        with mock.patch('sys.stderr', io.StringIO()):
+            self.assertEqual(cli.main(['find', '-e', '(', self.dir]), 2)
+
+    def test_does_not_import_tkinter(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = ('import sys; from src.pynote import cli; '
+                f'cli.main(["-j", "1", "stats", {self.dir!r}]); '
+                'sys.stdout.flush(); sys.exit("tkinter" in sys.modules)')
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
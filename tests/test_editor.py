@@ -0,0 +1,68 @@
+"""
+Unit tests for the Text widget change hook.
+"""
+
+import tkinter as tk
+import unittest
+from src.pynote import editor
+
+
+class _Widget:
+    """Stands in for a Text widget: a Tcl command named like one."""
+
+    def __init__(self, interp):
+        self.tk = interp.tk
+        self._w = '.text'
+        interp.eval('''
+            proc .text {args} {
+                switch -- [lindex $args 0] {
+                    index { return 1.0 }
+                    get { error "text doesn't contain any characters tagged with \\"sel\\"" }
+                    edit { return 0 }
+                }
+                return ""
+            }
+        ''')
+
+
+class TestChangeHook(unittest.TestCase):
+    """Test cases for routing widget subcommands through ChangeHook."""
+
+    def setUp(self):
+        try:
+            self.interp = tk.Tcl()
+        except tk.TclError as e:
+            self.skipTest(f'Tcl not available: {e}')
+        self.hook = editor.ChangeHook(_Widget(self.interp))
+
+    def test_edits_are_reported(self):
+        """Test that inserts reach the listeners."""
+        calls = []
+        self.hook.add_listener(lambda *change: calls.append(change))
+        self.interp.eval('.text insert end x')
+        self.assertEqual(calls, [(1, 1, 1)])
+
+    def test_queries_raise(self):
+        """Test that a failing query raises in Tcl, as Tk's bindings expect."""
+        self.assertEqual(self.interp.eval('catch {.text get sel.first sel.last}'), '1')
+        with self.assertRaises(tk.TclError):
+            self.interp.call('.text', 'get', 'sel.first', 'sel.last')
+
+    def test_edit_subcommands(self):
+        """Test that undo queries go to edit_commands, not Tk's stack."""
+        self.hook.edit_commands.update(canundo=lambda: 1, canredo=lambda: 0, undo=lambda: 'undone')
+        self.assertEqual(self.interp.eval('.text edit canundo'), '1')
+        self.assertEqual(self.interp.eval('.text edit canredo'), '0')
+        self.assertEqual(self.interp.eval('.text edit undo'), 'undone')
+        # Subcommands without a handler still reach the widget
+        self.assertEqual(self.interp.eval('.text edit modified'), '0')
+
+    def test_close_restores_command(self):
+        """Test that closing the hook puts the widget's command back."""
+        self.hook.close()
+        self.assertEqual(self.interp.eval('.text edit canundo'), '0')
+        self.assertEqual(self.interp.eval('info commands .text*'), '.text')
+
+
+if __name__ == '__main__':
+    unittest.main()
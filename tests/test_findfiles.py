@@ -0,0 +1,108 @@
+"""
+Unit tests for Find in Files.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import tempfile
+import unittest
+from src.pynote import findfiles, search
+
+
+class TestIgnoreRules(unittest.TestCase):
+
+    def test_rules(self):
+        rules = findfiles.IgnoreRules()
+        for line in ('# comment', 'build/', '*.log', '!keep.log', '/top.txt', 'docs/**/*.tmp'):
+            rules.add(line)
+        rules.add('*.bak', base='sub')
+        self.assertTrue(rules.ignored('build', True))
+        self.assertFalse(rules.ignored('build', False))
+        self.assertTrue(rules.ignored('a/b/x.log', False))
+        self.assertFalse(rules.ignored('a/keep.log', False))
+        self.assertTrue(rules.ignored('top.txt', False))
+        self.assertFalse(rules.ignored('src/top.txt', False))
+        self.assertTrue(rules.ignored('docs/x.tmp', False))
+        self.assertTrue(rules.ignored('docs/a/b/x.tmp', False))
+        self.assertTrue(rules.ignored('sub/deep/x.bak', False))
+        self.assertFalse(rules.ignored('other/x.bak', False))
+
+
+class TestFindFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+        self.write('.gitignore', b'build/\n*.log\n')
+        self.write('src/a.py', b'needle = 1\n')
+        self.write('src/sub/b.txt', b'x\r\nneedle\r\nneedle needle\r\n')
+        self.write('src/sub/.gitignore', b'local.txt\n')
+        self.write('src/sub/local.txt', b'needle\n')
+        self.write('build/c.txt', b'needle\n')
+        self.write('run.log', b'needle\n')
+        self.write('.git/HEAD', b'needle\n')
+        self.write('data.bin', b'needle\x00')
+        self.pattern = search.compile_pattern('needle')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def rel(self, path):
+        return os.path.relpath(path, self.dir).replace(os.sep, '/')
+
+    def test_walk(self):
+        files = [self.rel(p) for p in findfiles.walk(self.dir)]
+        self.assertEqual(files, ['.gitignore', 'data.bin', 'src/a.py', 'src/sub/.gitignore', 'src/sub/b.txt'])
+
+    def test_search_file(self):
+        result = findfiles.search_file(os.path.join(self.dir, 'src/sub/b.txt'), self.pattern)
+        self.assertEqual(result['matches'],
+                         [(2, 0, 6, 'needle'), (3, 0, 6, 'needle needle'), (3, 7, 13, 'needle needle')])
+        result = findfiles.search_file(os.path.join(self.dir, 'data.bin'), self.pattern)
+        self.assertEqual(result['skipped'], 'binary')
+        result = findfiles.search_file(os.path.join(self.dir, 'missing'), self.pattern)
+        self.assertIn('error', result)
+
+    def test_search_wide_encodings(self):
+        for encoding in ('utf-16', 'utf-32'):
+            path = self.write(f'wide/{encoding}.txt', 'hay\nneedle\n'.encode(encoding))
+            result = findfiles.search_file(path, self.pattern)
+            self.assertEqual(result.get('matches'), [(2, 0, 6, 'needle')], encoding)
+
+    def run_search(self, cache, executor):
+        job = findfiles.FileSearch(self.dir, self.pattern, cache, executor)
+        job.start()
+        job.wait(10)
+        self.assertTrue(job.done)
+        self.assertIsNone(job.error)
+        found = {self.rel(r['path']): len(r['matches']) for r in job.results() if r.get('matches')}
+        return job, found
+
+    def test_cache_rescans_changed_files(self):
+        cache = findfiles.ResultCache()
+        with ThreadPoolExecutor(2) as executor:
+            job, found = self.run_search(cache, executor)
+            self.assertEqual(found, {'src/a.py': 1, 'src/sub/b.txt': 3})
+            self.assertEqual(job.cached, 0)
+            path = self.write('src/a.py', b'needle needle\n')
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+            job, found = self.run_search(cache, executor)
+            self.assertEqual(found, {'src/a.py': 2, 'src/sub/b.txt': 3})
+            self.assertEqual(job.cached, job.files - 1)
+
+    def test_process_pool(self):
+        with ProcessPoolExecutor(2) as executor:
+            _, found = self.run_search(None, executor)
+        self.assertEqual(found, {'src/a.py': 1, 'src/sub/b.txt': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Unit tests for the incremental syntax highlighter.
+"""
+
+import random
+import unittest
+from src.pynote import highlight
+
+
+def _full_lex(lexer, lines):
+    """Lex every line from scratch; return per-line tokens."""
+    state = None
+    out = []
+    for line in lines:
+        tokens, state = lexer(line, state)
+        out.append(tokens)
+    return out
+
+
+class _Buffer:
+    """Lines plus a SyntaxModel kept in sync, with the latest tokens per line."""
+
+    def __init__(self, lexer, lines):
+        self.lexer = lexer
+        self.lines = list(lines)
+        self.tokens = [None] * len(self.lines)
+        self.model = highlight.SyntaxModel(lexer, len(self.lines))
+
+    def replace(self, first, old_last, new_lines):
+        self.lines[first - 1:old_last] = new_lines
+        self.tokens[first - 1:old_last] = [None] * len(new_lines)
+        self.model.replace_lines(first, old_last, first + len(new_lines) - 1)
+
+    def settle(self):
+        get = lambda first, count: self.lines[first - 1:first - 1 + count]
+        while self.model.first_pending is not None:
+            for line, tokens in self.model.step(get, 7):
+                self.tokens[line - 1] = tokens
+
+
+class TestLexers(unittest.TestCase):
+    """Test cases for the line lexers."""
+
+    def test_python_tokens(self):
+        """Test keywords, names, strings, comments and numbers."""
+        tokens, state = highlight.lex_python("def foo(x=1): return len('a#b')  # done", None)
+        kinds = [kind for kind, start, end in tokens]
+        self.assertEqual(kinds, ['keyword', 'definition', 'number', 'keyword', 'builtin', 'string', 'comment'])
+        self.assertIsNone(state)
+
+    def test_python_triple_quotes(self):
+        """Test that triple-quoted strings carry state across lines."""
+        _, state = highlight.lex_python('x = """start', None)
+        self.assertEqual(state, '"""')
+        tokens, state = highlight.lex_python('still inside', state)
+        self.assertEqual(tokens, [('string', 0, 12)])
+        tokens, state = highlight.lex_python('end""" + 1', state)
+        self.assertIsNone(state)
+        self.assertEqual(tokens[0], ('string', 0, 6))
+        self.assertEqual(tokens[1][0], 'number')
+
+    def test_python_matrix_operator(self):
+        """Test that '@' mid-line is not a decorator."""
+        tokens, _ = highlight.lex_python('c = a @b', None)
+        self.assertNotIn('decorator', [kind for kind, _, _ in tokens])
+        tokens, _ = highlight.lex_python('    @property', None)
+        self.assertEqual(tokens, [('decorator', 4, 13)])
+
+    def test_markdown(self):
+        """Test headings, fences and inline markup."""
+        self.assertEqual(highlight.lex_markdown('# Title', None), ([('heading', 0, 7)], None))
+        _, state = highlight.lex_markdown('```python', None)
+        self.assertEqual(state, '```')
+        self.assertEqual(highlight.lex_markdown('# not a heading', state)[0], [('code', 0, 15)])
+        self.assertIsNone(highlight.lex_markdown('```', state)[1])
+        tokens, _ = highlight.lex_markdown('see `x` and **bold** [a](b)', None)
+        self.assertEqual([kind for kind, _, _ in tokens], ['code', 'emphasis', 'link'])
+
+    def test_lexer_for_path(self):
+        """Test choosing a lexer by extension."""
+        self.assertIs(highlight.lexer_for_path('a/b.PY'), highlight.lex_python)
+        self.assertIs(highlight.lexer_for_path('README.md'), highlight.lex_markdown)
+        self.assertIsNone(highlight.lexer_for_path('notes.txt'))
+        self.assertIsNone(highlight.lexer_for_path(None))
+
+
+class TestSyntaxModel(unittest.TestCase):
+    """Test cases for incremental re-lexing."""
+
+    def test_convergence_stops_early(self):
+        """Test that an edit inside one line re-lexes only that line."""
+        buf = _Buffer(highlight.lex_python, ['x = 1'] * 1000)
+        buf.settle()
+        before = buf.model.lexed_lines
+        buf.replace(500, 500, ['x = 2'])
+        buf.settle()
+        self.assertEqual(buf.model.lexed_lines - before, 1)
+
+    def test_open_string_propagates(self):
+        """Test that opening a triple quote re-lexes lines below it."""
+        buf = _Buffer(highlight.lex_python, ['x = 1'] * 50)
+        buf.settle()
+        buf.replace(10, 10, ['s = """'])
+        buf.settle()
+        self.assertEqual(buf.tokens[20], [('string', 0, 5)])
+        buf.replace(30, 30, ['"""'])
+        buf.settle()
+        self.assertEqual(buf.tokens, _full_lex(highlight.lex_python, buf.lines))
+
+    def test_random_edits(self):
+        """Test that incremental results match a full re-lex."""
+        rng = random.Random(99)
+        pieces = ['x = 1', 'def f():', '"""', "'''", 's = """a', 'b"""', '# c', '', '@dec', 'return "q"']
+        for lexer in (highlight.lex_python, highlight.lex_markdown):
+            md = ['# h', '```', 'code', '~~~', 'text *em*', '']
+            source = pieces if lexer is highlight.lex_python else md
+            buf = _Buffer(lexer, [rng.choice(source) for _ in range(60)])
+            buf.settle()
+            for _ in range(300):
+                first = rng.randint(1, len(buf.lines))
+                old_last = rng.randint(first, min(len(buf.lines), first + 3))
+                new_lines = [rng.choice(source) for _ in range(rng.randint(1, 4))]
+                buf.replace(first, old_last, new_lines)
+                # Several edits often arrive before the model catches up
+                if rng.random() < 0.5:
+                    buf.settle()
+            buf.settle()
+            self.assertEqual(buf.tokens, _full_lex(lexer, buf.lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Unit tests for the bounded undo history.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from src.pynote import history
+from src.pynote.buffer import TextBuffer
+
+
+class _Editor:
+    """Records edits to a TextBuffer and applies undo/redo like EditorWidget."""
+
+    def __init__(self, text='', **kwargs):
+        self.buffer = TextBuffer(text)
+        self.history = history.History(**kwargs)
+        self.now = 0.0
+
+    def edit(self, first, old_last, new, pause=0.0):
+        self.now += pause
+        self.history.record(first, self.buffer.lines(first, old_last), new, now=self.now)
+        self.buffer.replace_lines(first, old_last, new)
+
+    def _apply(self, first, current, replacement):
+        self.buffer.replace_lines(first, first + current.count('\n'), replacement)
+
+    def undo(self):
+        entry = self.history.undo()
+        if entry is not None:
+            self._apply(entry.first, entry.new, entry.old)
+        return entry is not None
+
+    def redo(self):
+        entry = self.history.redo()
+        if entry is not None:
+            self._apply(entry.first, entry.old, entry.new)
+        return entry is not None
+
+
+class TestHistory(unittest.TestCase):
+
+    def test_typing_burst_is_one_step(self):
+        ed = _Editor('one\ntwo')
+        ed.edit(1, 1, 'one!', pause=0.1)
+        ed.edit(1, 1, 'one!!', pause=0.1)
+        ed.edit(1, 1, 'one!!\n', pause=0.1)
+        ed.edit(2, 2, 'x', pause=0.1)
+        self.assertEqual(len(ed.history), 1)
+        self.assertTrue(ed.undo())
+        self.assertEqual(ed.buffer.text(), 'one\ntwo')
+        self.assertFalse(ed.undo())
+        self.assertTrue(ed.redo())
+        self.assertEqual(ed.buffer.text(), 'one!!\nx\ntwo')
+
+    def test_pause_and_separator_split_steps(self):
+        ed = _Editor('a')
+        ed.edit(1, 1, 'ab', pause=0.1)
+        ed.edit(1, 1, 'abc', pause=history.COALESCE_SECONDS + 1)
+        ed.history.separator()
+        ed.edit(1, 1, 'abcd', pause=0.1)
+        self.assertEqual(len(ed.history), 3)
+        ed.undo()
+        self.assertEqual(ed.buffer.text(), 'abc')
+        ed.undo()
+        self.assertEqual(ed.buffer.text(), 'ab')
+
+    def test_new_edit_clears_redo(self):
+        ed = _Editor('a')
+        ed.edit(1, 1, 'ab')
+        ed.undo()
+        ed.edit(1, 1, 'x', pause=5)
+        self.assertFalse(ed.history.can_redo)
+        self.assertFalse(ed.redo())
+
+    def test_random_edits_undo_to_start(self):
+        rng = random.Random(7)
+        start = '\n'.join(f'line {i}' for i in range(50))
+        ed = _Editor(start, max_bytes=1 << 30)
+        states = [start]
+        for _ in range(200):
+            count = ed.buffer.line_count
+            first = rng.randint(1, count)
+            last = rng.randint(first, min(count, first + 3))
+            ed.edit(first, last, rng.choice(['', 'x', 'y\nz', 'new\nlines\nhere']), pause=rng.choice([0.1, 3]))
+            states.append(ed.buffer.text())
+        while ed.undo():
+            pass
+        self.assertEqual(ed.buffer.text(), start)
+        while ed.redo():
+            pass
+        self.assertEqual(ed.buffer.text(), states[-1])
+
+    def test_memory_cap_compresses_then_evicts(self):
+        ed = _Editor('', max_bytes=40000)
+        for i in range(40):
+            ed.edit(1, 1, f'{i} ' + 'text ' * 200, pause=10)
+        self.assertLessEqual(ed.history.bytes, 40000)
+        self.assertEqual(ed.history.dropped, 0)
+        self.assertGreater(ed.history._compressed, 0)
+        for i in range(40):
+            ed.edit(1, 1, os.urandom(3000).hex(), pause=10)
+        self.assertLessEqual(ed.history.bytes, 40000)
+        self.assertGreater(ed.history.dropped, 0)
+        # What is left still undoes correctly, through compressed entries
+        steps = 0
+        while ed.undo():
+            steps += 1
+        self.assertEqual(steps, 80 - ed.history.dropped)
+
+    def test_persisted_history_loads_on_first_undo(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = history.store_path(tmp, os.path.join(tmp, 'file.txt'))
+            ed = _Editor('first', store=store)
+            ed.edit(1, 1, 'second')
+            ed.edit(1, 1, 'third', pause=10)
+            self.assertTrue(ed.history.persist((1, 5)))
+
+            reopened = _Editor('third', store=store)
+            reopened.history.base_stat = (1, 5)
+            self.assertFalse(reopened.history._stored_loaded)
+            reopened.edit(1, 1, 'fourth')
+            reopened.undo()
+            self.assertEqual(reopened.buffer.text(), 'third')
+            reopened.undo()
+            reopened.undo()
+            self.assertEqual(reopened.buffer.text(), 'first')
+
+            # Another version of the file: the stored history is dropped
+            changed = _Editor('other', store=store)
+            changed.history.base_stat = (2, 5)
+            self.assertFalse(changed.undo())
+            self.assertFalse(os.path.exists(store))
+
+    def test_clean_store(self):
+        """Test that old and surplus persisted histories are removed."""
+        with tempfile.TemporaryDirectory() as tmp:
+            now = 1_000_000.0
+            for i, age in enumerate((0, 10, 20, 30, history.STORE_MAX_AGE + 1)):
+                path = os.path.join(tmp, f'{i}.undo')
+                with open(path, 'wb') as f:
+                    f.write(b'x' * 100)
+                os.utime(path, (now - age, now - age))
+            self.assertEqual(history.clean_store(tmp, now=now), 1)
+            self.assertEqual(sorted(os.listdir(tmp)), ['0.undo', '1.undo', '2.undo', '3.undo'])
+            self.assertEqual(history.clean_store(tmp, max_files=3, now=now), 1)
+            self.assertEqual(history.clean_store(tmp, max_bytes=150, now=now), 2)
+            self.assertEqual(os.listdir(tmp), ['0.undo'])
+            self.assertEqual(history.clean_store(os.path.join(tmp, 'missing')), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Unit tests for the huge file line index.
+"""
+
+import mmap
+import os
+import random
+import tempfile
+import unittest
+from src.pynote import hugefile
+
+
+class TestLineIndex(unittest.TestCase):
+    """Test cases for LineIndex."""
+
+    def setUp(self):
+        rng = random.Random(42)
+        lines = [''.join(rng.choice('abc ') for _ in range(rng.randrange(0, 40)))
+                 for _ in range(3000)]
+        self.content = ('\n'.join(lines)).encode('utf-8')
+        self.lines = self.content.split(b'\n')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'big.log')
+        with open(self.path, 'wb') as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _build(self, cache_path=None):
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index = hugefile.LineIndex(mm, cache_path, (len(self.content), 1))
+        index.BLOCK = 64
+        index.READ_SIZE = 1000
+        index.build()
+        return index
+
+    def test_line_lookups(self):
+        """Test line starts, line numbers and line reads against split()."""
+        index = self._build()
+        self.assertTrue(index.complete.is_set())
+        self.assertEqual(index.line_count, len(self.lines))
+        offset = 0
+        for number, line in enumerate(self.lines, start=1):
+            self.assertEqual(index.line_start(number), offset)
+            self.assertEqual(index.line_of(offset), number)
+            offset += len(line) + 1
+        data, _ = index.read_lines(100, 3)
+        self.assertEqual(data, b'\n'.join(self.lines[99:102]) + b'\n')
+
+    def test_cache_roundtrip(self):
+        """Test that a saved index is reused."""
+        cache_path = os.path.join(self.tmpdir.name, 'big.idx')
+        first = self._build(cache_path)
+        self.assertTrue(os.path.exists(cache_path))
+        second = self._build(cache_path)
+        self.assertEqual(second.line_count, first.line_count)
+        self.assertEqual(second.line_start(2500), first.line_start(2500))
+
+    def test_wide_encodings_are_refused(self):
+        """Test that UTF-16 and UTF-32 files are not indexed by byte."""
+        for encoding in ('utf-8', 'utf-8-sig', 'latin-1'):
+            self.assertTrue(hugefile.supported(encoding))
+        for encoding in ('utf-16', 'UTF-16-LE', 'utf-32'):
+            self.assertFalse(hugefile.supported(encoding))
+        with self.assertRaises(ValueError):
+            hugefile.HugeFileView(None, self.path, 'utf-16')
+
+
+if __name__ == '__main__':
+    unittest.main()
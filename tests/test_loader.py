@@ -0,0 +1,145 @@
+"""
+Unit tests for background file loading, without a display.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from src.pynote import loader
+
+
+class _Widget:
+    """Records ``after`` callbacks so the test can run them in order."""
+
+    def __init__(self):
+        self.scheduled = {}
+        self._next = 0
+
+    def after(self, ms, callback, *args):
+        self._next += 1
+        self.scheduled[self._next] = (callback, args)
+        return self._next
+
+    def after_cancel(self, after_id):
+        self.scheduled.pop(after_id, None)
+
+    def run_next(self):
+        after_id = min(self.scheduled)
+        callback, args = self.scheduled.pop(after_id)
+        callback(*args)
+
+
+class _Text:
+    """The parts of a Text widget FileLoader uses."""
+
+    def __init__(self):
+        self.content = ''
+        self.inserts = []
+
+    def compare(self, first, op, second):
+        return self.content == ''
+
+    def insert(self, index, *args):
+        # Text and tag arguments alternate
+        piece = ''.join(args[::2])
+        self.inserts.append(piece)
+        self.content += piece
+
+    def mark_set(self, name, index):
+        pass
+
+
+class TestFileLoader(unittest.TestCase):
+    """Test cases for chunked loading, decoding and cancellation."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'file.txt')
+        self.widget = _Widget()
+        self.text = _Text()
+        self.done = []
+        self.progress = []
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def make_loader(self, chunk_size=None, slice_size=None):
+        ld = loader.FileLoader(self.widget, self.text, self.path,
+                               on_progress=self.progress.append,
+                               on_done=lambda error, cancelled: self.done.append((error, cancelled)))
+        if chunk_size:
+            ld.CHUNK_SIZE = chunk_size
+        if slice_size:
+            ld.SLICE_SIZE = slice_size
+        return ld
+
+    def run_loader(self, ld, timeout=10.0):
+        ld.start()
+        deadline = time.monotonic() + timeout
+        while not ld.finished:
+            self.assertLess(time.monotonic(), deadline, 'loader did not finish')
+            self.widget.run_next()
+            time.sleep(0.001)
+        return ld
+
+    def test_chunks_and_slices(self):
+        """Test that a file streams in slices of at most SLICE_SIZE characters."""
+        content = ''.join(f'line {i}\n' for i in range(5000))
+        self.write(content.encode('utf-8'))
+        ld = self.run_loader(self.make_loader(chunk_size=4096, slice_size=1000))
+        self.assertEqual(self.text.content, content)
+        self.assertEqual(self.done, [(None, False)])
+        self.assertGreater(len(self.text.inserts), len(content) // 1000)
+        self.assertLessEqual(max(len(piece) for piece in self.text.inserts), 1000)
+        self.assertEqual(self.progress, sorted(self.progress))
+        self.assertEqual(ld.progress, 1.0)
+        self.assertEqual((ld.encoding, ld.fallback), ('utf-8', False))
+        self.assertEqual(self.widget.scheduled, {})
+
+    def test_newline_detection(self):
+        """Test that CRLF is detected and translated to LF."""
+        self.write(b'one\r\ntwo\r\n')
+        ld = self.run_loader(self.make_loader())
+        self.assertEqual(self.text.content, 'one\ntwo\n')
+        self.assertEqual(ld.newline, '\r\n')
+
+    def test_latin1_fallback(self):
+        """Test that invalid UTF-8 past the sample is read as Latin-1."""
+        self.write('caf\xe9\n'.encode('utf-8') * 20000 + b'\xff\n')
+        ld = self.run_loader(self.make_loader(chunk_size=8192))
+        self.assertTrue(self.text.content.endswith('caf\xe9\n\xff\n'))
+        self.assertEqual((ld.encoding, ld.fallback), ('utf-8', True))
+
+    def test_cancel(self):
+        """Test that cancelling stops the worker and keeps what was inserted."""
+        self.write(b'x' * 200000)
+        ld = self.make_loader(chunk_size=1000, slice_size=1000)
+        ld.start()
+        while not self.text.content:
+            self.widget.run_next()
+            time.sleep(0.001)
+        ld.cancel()
+        ld._thread.join(5)
+        self.assertFalse(ld._thread.is_alive())
+        self.assertEqual(self.done, [(None, True)])
+        self.assertEqual(self.widget.scheduled, {})
+        self.assertLess(len(self.text.content), 200000)
+        ld.cancel()
+        self.assertEqual(len(self.done), 1)
+
+    def test_missing_file(self):
+        """Test that a read error is passed to on_done."""
+        ld = self.run_loader(self.make_loader())
+        error, cancelled = self.done[0]
+        self.assertIsInstance(error, OSError)
+        self.assertFalse(cancelled)
+        self.assertEqual(self.text.content, '')
+
+
+if __name__ == '__main__':
+    unittest.main()
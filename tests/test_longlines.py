@@ -0,0 +1,120 @@
+"""
+Unit tests for the long-line safe display.
+"""
+
+import random
+import unittest
+from src.pynote import longlines
+from src.pynote.buffer import TextBuffer
+
+
+def _display(text, limit):
+    """Segment text like the loader does; return (display text, soft lines)."""
+    segmenter = longlines.Segmenter(limit)
+    parts = segmenter.feed(text)
+    out = parts[0]
+    soft = []
+    for part in parts[1:]:
+        soft.append(out.count('\n') + 1)
+        out += '\n' + part
+    return out, soft
+
+
+class _FakeText:
+    """Answers tag queries from a list of soft break lines."""
+
+    def __init__(self, soft):
+        self.soft = soft
+
+    def tag_nextrange(self, tag, index, stop):
+        start = int(index.split('.')[0])
+        end = int(stop.split('.')[0])
+        for line in self.soft:
+            if start <= line <= end:
+                return (f'{line}.end', f'{line + 1}.0')
+        return ()
+
+    def tag_ranges(self, tag):
+        out = []
+        for line in self.soft:
+            out.extend((f'{line}.end', f'{line + 1}.0'))
+        return tuple(out)
+
+
+class TestSegmenter(unittest.TestCase):
+
+    def test_streamed_like_whole(self):
+        rnd = random.Random(5)
+        for _ in range(100):
+            text = ''.join(rnd.choice('abc ,\n' if rnd.random() < 0.5 else 'abcd,') for _ in range(3000))
+            whole = longlines.Segmenter(64).feed(text)
+            segmenter = longlines.Segmenter(64)
+            parts = []
+            pos = 0
+            while pos < len(text):
+                step = rnd.randint(1, 500)
+                piece = segmenter.feed(text[pos:pos + step])
+                pos += step
+                if parts:
+                    parts[-1] += piece[0]
+                    parts.extend(piece[1:])
+                else:
+                    parts = piece
+            self.assertEqual(''.join(parts), text)
+            self.assertEqual(''.join(whole), text)
+            self.assertTrue(all(len(line) <= 64 for line in '\n'.join(parts).split('\n')))
+            self.assertEqual(segmenter.breaks, len(parts) - 1)
+
+    def test_short_lines_untouched_and_break_after_punctuation(self):
+        self.assertEqual(longlines.Segmenter(10).feed('short\nlines\n'), ['short\nlines\n'])
+        self.assertEqual(longlines.Segmenter(10).feed('aaa,bbbbbbbbb'), ['aaa,', 'bbbbbbbbb'])
+        self.assertEqual(longlines.Segmenter(4).feed('abcdefghij'), ['abcd', 'efgh', 'ij'])
+
+    def test_insert_args(self):
+        self.assertEqual(longlines.insert_args(['ab', 'cd']), ['ab', (), '\n', (longlines.TAG,), 'cd', ()])
+
+
+class TestSoftBreaks(unittest.TestCase):
+
+    def setUp(self):
+        self.original = 'first\n' + 'x' * 10 + ',' + 'y' * 8 + '\nlast'
+        display, soft = _display(self.original, 8)
+        self.display = display
+        self.buffer = TextBuffer(display)
+        self.text = _FakeText(soft)
+        self.breaks = longlines.SoftBreaks(self.text, self.buffer)
+        self.breaks.active = True
+        self.breaks.lines = list(soft)
+
+    def test_mapping(self):
+        b = self.breaks
+        self.assertEqual(self.display.split('\n'), ['first', 'xxxxxxxx', 'xx,', 'yyyyyyyy', 'last'])
+        self.assertEqual(b.lines, [2, 3])
+        self.assertEqual(''.join(b.chunks()), self.original)
+        self.assertEqual([b.logical_line(n) for n in range(1, 6)], [1, 2, 2, 2, 3])
+        self.assertEqual([b.is_continuation(n) for n in range(1, 6)], [False, False, True, True, False])
+        self.assertEqual([b.widget_line(n) for n in (1, 2, 3)], [1, 2, 5])
+        self.assertEqual(b.widget_index(2, 12), '4.1')
+        self.assertEqual(b.logical_position(4, 1), (2, 12))
+        self.assertEqual(b.widget_range(3, 3), (2, 4))
+        self.assertEqual(b.plain(self.buffer.lines(2, 5), 2), self.original.split('\n', 1)[1])
+
+    def test_on_change(self):
+        b = self.breaks
+        # A hard newline typed on line 1 moves both breaks down by one
+        self.text.soft = [3, 4]
+        b.on_change(1, 1, 2)
+        self.assertEqual(b.lines, [3, 4])
+        self.assertEqual(b.edit, (1, 1))
+        # Deleting the first soft break joins two segments of file line 3
+        self.text.soft = [3]
+        b.on_change(3, 4, 3)
+        self.assertEqual(b.lines, [3])
+        self.assertEqual(b.edit, (3, 3))
+        # Many lines at once (e.g. undo) are rescanned with one tag_ranges call
+        self.text.soft = [2, 90]
+        b.on_change(1, 4, 100)
+        self.assertEqual(b.lines, [2, 90])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Unit tests for the minimap line summary.
+"""
+
+import random
+import unittest
+from src.pynote import minimap
+
+
+class TestLineSummary(unittest.TestCase):
+
+    def test_measure(self):
+        """Test indentation and length, with tabs counted as 4 columns."""
+        summary = minimap.LineSummary('abc\n    def\n\tx\n   \n')
+        self.assertEqual(list(summary.indents), [0, 4, 4, 3, 0])
+        self.assertEqual(list(summary.lengths), [3, 7, 5, 3, 0])
+
+    def test_incremental_matches_rebuild(self):
+        """Test that replaced line ranges give the same arrays as a rebuild."""
+        rnd = random.Random(5)
+        lines = ['  ' * rnd.randint(0, 4) + 'x' * rnd.randint(0, 30) for _ in range(300)]
+        summary = minimap.LineSummary('\n'.join(lines))
+        for _ in range(300):
+            first = rnd.randint(1, len(lines))
+            last = rnd.randint(first, min(len(lines), first + 5))
+            new = ['\t' * rnd.randint(0, 2) + 'y' * rnd.randint(0, 10) for _ in range(rnd.randint(1, 4))]
+            lines[first - 1:last] = new
+            summary.replace_lines(first, last, '\n'.join(new))
+        fresh = minimap.LineSummary('\n'.join(lines))
+        self.assertEqual(summary.indents, fresh.indents)
+        self.assertEqual(summary.lengths, fresh.lengths)
+        self.assertEqual(summary.line_count, len(lines))
+
+    def test_version_changes(self):
+        """Test that an edit gives the summary a new version."""
+        summary = minimap.LineSummary('a')
+        version = summary.version
+        summary.replace_lines(1, 1, 'b')
+        self.assertNotEqual(summary.version, version)
+
+    def test_rows(self):
+        """Test that rows are one per line when they fit, else bucketed."""
+        summary = minimap.LineSummary('\n'.join(['x' * n for n in range(10)]))
+        self.assertEqual(summary.rows(10), [(0, n) for n in range(10)])
+        self.assertEqual(summary.rows(100), summary.rows(10))
+        summary = minimap.LineSummary('\n'.join(['    ' + 'x' * (n % 50) for n in range(100000)]))
+        rows = summary.rows(500)
+        self.assertEqual(len(rows), 500)
+        self.assertTrue(all(indent == 4 and length <= 53 for indent, length in rows))
+        self.assertEqual(summary.rows(0), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Unit tests for the incremental Markdown preview.
+"""
+
+import random
+import unittest
+from src.pynote import preview
+
+
+DOCUMENT = '''# Title
+
+Some **bold** and *emphasis*
+on two lines.
+## Subheading
+- one
+- `two`
+
+```python
+x = 1
+
+y = 2
+```
+> quoted
+'''
+
+
+def _text(runs):
+    return ''.join(text for text, _ in runs)
+
+
+class TestBlocks(unittest.TestCase):
+
+    def test_split(self):
+        self.assertEqual([line for line, _ in preview.split_blocks(DOCUMENT)], [1, 3, 5, 6, 9, 14])
+        blocks = dict(preview.split_blocks(DOCUMENT))
+        # The blank line inside the fence does not end the block
+        self.assertEqual(blocks[9], '```python\nx = 1\n\ny = 2\n```')
+        self.assertEqual(preview.split_blocks('\n  \n'), [])
+
+    def test_render(self):
+        runs = preview.render_block('Some **bold** and *emphasis*\non two lines.')
+        self.assertEqual(_text(runs), 'Some bold and emphasis on two lines.\n\n')
+        self.assertIn(('bold', ('strong',)), runs)
+        self.assertEqual(preview.render_block('## Sub')[0], ('Sub', ('h2',)))
+        self.assertEqual(_text(preview.render_block('- one\n  - [two](x)')), '• one\n    • two\n\n')
+        self.assertEqual(preview.render_block('```\na\n```')[0], ('a', ('codeblock',)))
+        self.assertEqual(preview.height(preview.render_block('```\na\nb\n```')), 3)
+
+
+class TestBlockSplitter(unittest.TestCase):
+
+    def test_matches_full_split_after_edits(self):
+        rng = random.Random(1)
+        pieces = ['# Head\n', 'text\n', '\n', '\n\n', '```\n', '- item\n', '> quote\n', '*x*']
+        splitter = preview.BlockSplitter(preview.RenderCache())
+        text = DOCUMENT
+        for _ in range(500):
+            start = rng.randint(0, len(text))
+            end = min(len(text), start + rng.randint(0, 8))
+            text = text[:start] + ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 2))) + text[end:]
+            keys, lines, _ = splitter.update(text)
+            expected = preview.split_blocks(text)
+            self.assertEqual(keys, [preview.block_key(block) for _, block in expected])
+            self.assertEqual(lines, [line for line, _ in expected])
+
+    def test_renders_only_changed_blocks(self):
+        splitter = preview.BlockSplitter(preview.RenderCache())
+        text = '\n\n'.join(f'Paragraph {i}' for i in range(1000))
+        self.assertEqual(splitter.update(text)[2], 1000)
+        text = text.replace('Paragraph 500', 'Paragraph 500, edited')
+        keys, lines, rendered = splitter.update(text)
+        self.assertEqual((len(keys), rendered), (1000, 1))
+        # Undoing the edit finds the old rendering in the cache
+        self.assertEqual(splitter.update(text.replace(', edited', ''))[2], 0)
+
+
+class TestPreviewLayout(unittest.TestCase):
+
+    def test_replaces_changed_lines_only(self):
+        layout = preview.PreviewLayout()
+        heights = {'a': 2, 'b': 3, 'c': 2, 'B': 5}.get
+        self.assertEqual(layout.update(['a', 'b', 'c'], [1, 3, 6], heights), (1, 1, 0, 3))
+        self.assertEqual(layout.starts, [1, 3, 6, 8])
+        self.assertEqual(layout.update(['a', 'B', 'c'], [1, 3, 6], heights), (3, 6, 1, 2))
+        self.assertEqual(layout.starts, [1, 3, 8, 10])
+        # Source line 4 is a third of the way into block B
+        self.assertEqual(layout.preview_line(4), 4)
+        self.assertEqual(layout.preview_line(6), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
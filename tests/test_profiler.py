@@ -0,0 +1,110 @@
+"""
+Unit tests for the hot-path profiler.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.pynote import profiler
+
+
+class _FakeTk:
+    """Interpreter stand-in that records nothing but answers calls."""
+
+    def call(self, *args):
+        return ''
+
+    def eval(self, script):
+        return ''
+
+    def getvar(self, name):
+        return 1
+
+    def wantobjects(self):
+        return True
+
+
+class _FakeScheduler:
+
+    def __init__(self):
+        self.flushed = 0
+
+    def _flush(self):
+        self.flushed += 1
+
+
+class _FakeApp:
+
+    def __init__(self):
+        self.tk = _FakeTk()
+        self.refresh = _FakeScheduler()
+
+    def _update_status(self):
+        self.tk.call('index', 'insert')
+        self.tk.call('set', 'x')
+        return 'status'
+
+    def _update_gutter(self):
+        self.tk.eval('gutter')
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_enabled(self):
+        with mock.patch.dict(os.environ, {profiler.ENV_VAR: '1'}):
+            self.assertTrue(profiler.enabled())
+        with mock.patch.dict(os.environ, {profiler.ENV_VAR: '0'}):
+            self.assertFalse(profiler.enabled({'profile': True}))
+        with mock.patch.dict(os.environ, {profiler.ENV_VAR: ''}):
+            self.assertTrue(profiler.enabled({'profile': True}))
+            self.assertFalse(profiler.enabled({}))
+
+    def test_install_counts_calls_and_tcl(self):
+        app = _FakeApp()
+        prof = profiler.Profiler()
+        prof.install(app)
+        self.assertEqual(app._update_status(), 'status')
+        app._update_status()
+        app._update_gutter()
+        app.refresh._flush()
+        report = prof.report()
+        status = report['methods']['_update_status']
+        self.assertEqual(status['calls'], 2)
+        self.assertEqual(status['tcl_calls'], 4)
+        self.assertEqual(report['methods']['_update_gutter']['tcl_calls'], 1)
+        self.assertEqual(report['methods']['frame']['calls'], 1)
+        self.assertEqual(app.refresh.flushed, 1)
+        self.assertEqual(report['tcl_calls'], 5)
+        # Attributes that are not counted still reach the interpreter
+        self.assertTrue(app.tk.wantobjects())
+        self.assertEqual(app.tk.getvar('v'), 1)
+        self.assertEqual(prof.tcl_calls, 6)
+
+    def test_percentiles(self):
+        prof = profiler.Profiler()
+        for ms in range(1, 101):
+            prof.add('work', float(ms))
+        stats = prof.report()['methods']['work']
+        self.assertEqual(stats['calls'], 100)
+        self.assertEqual(stats['total_ms'], 5050.0)
+        self.assertEqual(stats['p50_ms'], 51.0)
+        self.assertEqual(stats['p99_ms'], 100.0)
+        self.assertEqual(stats['max_ms'], 100.0)
+
+    def test_dump(self):
+        prof = profiler.Profiler()
+        prof.add('frame', 2.5, tcl=3)
+        prof.last_frame = (2.5, 3)
+        self.assertIn('frame 2.5 ms, 3 Tcl', prof.summary_line())
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = prof.dump(tmpdir)
+            self.assertEqual(os.path.dirname(path), tmpdir)
+            with open(path) as f:
+                data = json.load(f)
+        self.assertEqual(data['methods']['frame']['tcl_calls'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
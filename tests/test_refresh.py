@@ -0,0 +1,89 @@
+"""
+Unit tests for the UI refresh scheduler.
+"""
+
+import unittest
+from src.pynote.main import RefreshScheduler
+
+
+class FakeWidget:
+    """Records after/after_idle callbacks so tests can fire them by hand."""
+
+    def __init__(self):
+        self.idle = {}
+        self.timers = {}
+        self._next = 0
+
+    def _id(self):
+        self._next += 1
+        return f'after#{self._next}'
+
+    def after_idle(self, callback):
+        key = self._id()
+        self.idle[key] = callback
+        return key
+
+    def after(self, ms, callback):
+        key = self._id()
+        self.timers[key] = callback
+        return key
+
+    def after_cancel(self, key):
+        self.idle.pop(key, None)
+        self.timers.pop(key, None)
+
+    def run_idle(self):
+        pending, self.idle = self.idle, {}
+        for callback in pending.values():
+            callback()
+
+    def run_timers(self):
+        pending, self.timers = self.timers, {}
+        for callback in pending.values():
+            callback()
+
+
+class TestRefreshScheduler(unittest.TestCase):
+    """Test cases for RefreshScheduler."""
+
+    def setUp(self):
+        self.widget = FakeWidget()
+        self.calls = []
+        self.scheduler = RefreshScheduler(self.widget)
+        self.scheduler.register('gutter', lambda: self.calls.append('gutter'))
+        self.scheduler.register('status', lambda: self.calls.append('status'),
+                                RefreshScheduler.DEBOUNCED)
+
+    def test_frame_requests_coalesce(self):
+        """Test that repeated requests run once per idle cycle."""
+        for _ in range(4):
+            self.scheduler.request('gutter')
+        self.assertEqual(len(self.widget.idle), 1)
+        self.widget.run_idle()
+        self.assertEqual(self.calls, ['gutter'])
+        self.assertEqual(self.scheduler.counters()['gutter'], (4, 1))
+
+    def test_debounced_waits_for_timer(self):
+        """Test that debounced tasks only run after the debounce expires."""
+        self.scheduler.request('status')
+        self.scheduler.request('gutter')
+        self.scheduler.request('status')
+        self.assertEqual(len(self.widget.timers), 1)
+        self.widget.run_idle()
+        self.assertEqual(self.calls, ['gutter'])
+        self.widget.run_timers()
+        self.widget.run_idle()
+        self.assertEqual(self.calls, ['gutter', 'status'])
+        self.assertEqual(self.scheduler.counters()['status'], (2, 1))
+
+    def test_flush(self):
+        """Test that flush runs everything dirty in priority order."""
+        self.scheduler.request('status')
+        self.scheduler.request('gutter')
+        self.scheduler.flush()
+        self.assertEqual(self.calls, ['gutter', 'status'])
+        self.assertEqual(self.widget.timers, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Unit tests for the save pipeline.
+"""
+
+import os
+import tempfile
+import unittest
+from src.pynote import saver, utils
+
+
+class TestSaver(unittest.TestCase):
+    """Test cases for atomic, change-aware saving."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'note.txt')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _save(self, chunks, previous=None):
+        job = saver.SaveJob(self.path, chunks, newline='\n', previous=previous)
+        job.start()
+        job.wait()
+        return job
+
+    def test_write_atomic(self):
+        """Test that chunks are written exactly, with no temp files left."""
+        written = saver.write_atomic(self.path, ['héllo\n', 'world'], newline='\r\n')
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(data, 'héllo\r\nworld'.encode('utf-8'))
+        self.assertEqual(written, len(data))
+        self.assertEqual(os.listdir(self.tmpdir.name), ['note.txt'])
+
+    def test_write_atomic_mode_and_symlink(self):
+        """Test that new files get the umask mode and symlinks are kept."""
+        saver.write_atomic(self.path, ['one'])
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o666 & ~utils.UMASK)
+        os.chmod(self.path, 0o640)
+        link = os.path.join(self.tmpdir.name, 'link.txt')
+        os.symlink(self.path, link)
+        saver.write_atomic(link, ['two'])
+        self.assertTrue(os.path.islink(link))
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'two')
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+
+    def test_unchanged_content_skips_write(self):
+        """Test that saving identical content does not rewrite the file."""
+        first = self._save(['one\n', 'two'])
+        self.assertEqual(first.status, 'saved')
+        second = self._save(['one\ntwo'], previous=(first.digest, first.stamp))
+        self.assertEqual(second.status, 'unchanged')
+        self.assertEqual(second.bytes_written, 0)
+        third = self._save(['one\nthree'], previous=(first.digest, first.stamp))
+        self.assertEqual(third.status, 'saved')
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'one\nthree')
+
+    def test_error_is_reported(self):
+        """Test that a failed save reports an error instead of raising."""
+        self.path = os.path.join(self.tmpdir.name, 'missing', 'note.txt')
+        job = self._save(['text'])
+        self.assertEqual(job.status, 'error')
+        self.assertIsInstance(job.error, OSError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Unit tests for the Find & Replace engine.
+"""
+
+import random
+import re
+import unittest
+from src.pynote import search
+from src.pynote.buffer import TextBuffer
+
+
+def _naive_matches(text, pattern):
+    """Match positions computed the slow, obvious way."""
+    out = []
+    for m in pattern.finditer(text):
+        if m.start() == m.end():
+            continue
+        before, inside = text[:m.start()], m.group()
+        line = before.count('\n') + 1
+        col = len(before) - (before.rfind('\n') + 1)
+        end_line = line + inside.count('\n')
+        end_col = (col + len(inside)) if '\n' not in inside else len(inside) - (inside.rfind('\n') + 1)
+        out.append((line, col, end_line, end_col))
+    return out
+
+
+def _apply(text, result):
+    """Apply a replace_all result the way the Text widget does."""
+    first, last, new_text, count = result
+    lines = text.split('\n')
+    lines[first - 1:last] = new_text.split('\n')
+    return '\n'.join(lines)
+
+
+class TestSearch(unittest.TestCase):
+    """Test cases for pattern compilation, matching and replacing."""
+
+    def test_compile_pattern(self):
+        """Test literal, case-insensitive and whole-word patterns."""
+        self.assertEqual(search.compile_pattern('a.b').findall('a.b axb'), ['a.b'])
+        self.assertEqual(search.compile_pattern('a.b', regex=True).findall('a.b axb'), ['a.b', 'axb'])
+        self.assertEqual(search.compile_pattern('Cat', case=False).findall('cat CAT'), ['cat', 'CAT'])
+        self.assertEqual(search.compile_pattern('cat', whole_word=True).findall('cat concat cats cat'), ['cat', 'cat'])
+        with self.assertRaises(re.error):
+            search.compile_pattern('(', regex=True)
+
+    def test_iter_matches(self):
+        """Test positions, multi-line matches and skipped empty matches."""
+        text = 'foo bar\nbar foo\n\nfoo'
+        pattern = search.compile_pattern('foo')
+        matches = [m for batch in search.iter_matches(text, pattern) for m in batch]
+        self.assertEqual(matches, [(1, 0, 1, 3), (2, 4, 2, 7), (4, 0, 4, 3)])
+        pattern = search.compile_pattern(r'bar\nbar|^', regex=True)
+        matches = [m for batch in search.iter_matches(text, pattern) for m in batch]
+        self.assertEqual(matches, [(1, 4, 2, 3)])
+
+    def test_iter_matches_random(self):
+        """Test batching against a naive position computation."""
+        rng = random.Random(7)
+        text = ''.join(rng.choice('ab \n') for _ in range(5000))
+        for source in ('a', 'ab', r'b\s+a', r'a\nb', '^b', 'a$'):
+            pattern = search.compile_pattern(source, regex=True)
+            matches = [m for batch in search.iter_matches(text, pattern, batch=7) for m in batch]
+            self.assertEqual(matches, _naive_matches(text, pattern))
+
+    def test_replace_all(self):
+        """Test that only the changed line span is returned."""
+        text = 'keep\none two\nkeep\ntwo one\nkeep'
+        result = search.replace_all(text, search.compile_pattern('one'), '1')
+        self.assertEqual(result, (2, 4, 'one two\nkeep\ntwo 1'.replace('one', '1'), 2))
+        self.assertEqual(_apply(text, result), text.replace('one', '1'))
+        self.assertIsNone(search.replace_all(text, search.compile_pattern('zzz'), 'x'))
+
+    def test_replace_all_groups(self):
+        """Test group references with regex replacements only."""
+        text = 'x=1\ny=2'
+        pattern = search.compile_pattern(r'(\w)=(\d)', regex=True)
+        result = search.replace_all(text, pattern, r'\2=\1', literal=False)
+        self.assertEqual(_apply(text, result), '1=x\n2=y')
+        result = search.replace_all(text, pattern, r'\2', literal=True)
+        self.assertEqual(_apply(text, result), '\\2\n\\2')
+
+    def test_replace_all_random(self):
+        """Test that applying the span equals a full substitution."""
+        rng = random.Random(11)
+        for _ in range(50):
+            text = ''.join(rng.choice('ab\n') for _ in range(rng.randint(0, 80)))
+            for source, repl in (('a', 'xy'), (r'b\n', ''), (r'a+', '\n'), ('^b', 'c')):
+                pattern = search.compile_pattern(source, regex=True)
+                result = search.replace_all(text, pattern, repl)
+                expected = pattern.sub(lambda m: repl if m.group() else '', text)
+                self.assertEqual(text if result is None else _apply(text, result), expected)
+
+    def test_search_job(self):
+        """Test that a job streams every match and a replace job returns a span."""
+        text = 'ab\n' * 5000
+        job = search.SearchJob(text, search.compile_pattern('b'))
+        job.BATCH = 100
+        job.start()
+        job.wait()
+        batches = job.batches()
+        self.assertTrue(job.done)
+        self.assertIsNone(job.error)
+        self.assertEqual(len(batches), 50)
+        self.assertEqual(batches[-1][-1], (5000, 1, 5000, 2))
+        job = search.SearchJob(text, search.compile_pattern('b'), replacement='c')
+        job.start()
+        job.wait()
+        self.assertEqual(job.result[:2], (1, 5000))
+        self.assertEqual(job.result[3], 5000)
+
+    def test_search_job_buffer_snapshot(self):
+        """Test that a job searches a buffer snapshot, not later edits."""
+        buf = TextBuffer('ab\n' * 5000)
+        job = search.SearchJob(buf.snapshot(), search.compile_pattern('b'))
+        buf.insert(0, 'b' * 100)
+        job.start()
+        job.wait()
+        matches = [m for batch in job.batches() for m in batch]
+        self.assertEqual(len(matches), 5000)
+        self.assertEqual(matches[0], (1, 1, 1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Unit tests for session snapshots.
+"""
+
+import os
+import tempfile
+import unittest
+from src.pynote import session
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'notes.md')
+        with open(self.path, 'wb') as f:
+            f.write(b'x' * (3 * session.SAMPLE_BYTES))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unchanged_changed_missing(self):
+        fingerprint = session.fingerprint(self.path)
+        self.assertEqual(session.check(self.path, fingerprint), session.UNCHANGED)
+        st = os.stat(self.path)
+        # Rewritten at the end with size and mtime kept: caught by the sample
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'y')
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(session.check(self.path, fingerprint), session.CHANGED)
+        self.assertEqual(session.check(self.path, None), session.CHANGED)
+        os.unlink(self.path)
+        self.assertEqual(session.check(self.path, fingerprint), session.MISSING)
+        self.assertIsNone(session.fingerprint(self.path))
+
+    def test_verifier(self):
+        gone = os.path.join(self.tmp.name, 'gone.txt')
+        verifier = session.Verifier([
+            {'path': self.path, 'fingerprint': session.fingerprint(self.path)},
+            {'path': gone},
+        ])
+        verifier.start()
+        verifier.wait(5)
+        self.assertTrue(verifier.done)
+        self.assertEqual(verifier.results, {self.path: session.UNCHANGED, gone: session.MISSING})
+
+
+class TestSessionFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        entries = [
+            {'path': '/a.md', 'encoding': 'utf-8', 'cursor': [12, 3], 'top': 5, 'fingerprint': [10, 1, 'ab']},
+            {'path': '/b.txt'},
+        ]
+        session.save(self.tmp.name, entries, active=1)
+        self.assertEqual(session.load(self.tmp.name), (entries, 1))
+        # Nothing open: the session is removed
+        session.save(self.tmp.name, [])
+        self.assertFalse(os.path.exists(session.session_path(self.tmp.name)))
+        self.assertEqual(session.load(self.tmp.name), ([], 0))
+
+    def test_unusable_file(self):
+        path = session.session_path(self.tmp.name)
+        for content in ('not json', '[]', '{"version": 99, "documents": [{"path": "/a"}]}'):
+            with open(path, 'w') as f:
+                f.write(content)
+            self.assertEqual(session.load(self.tmp.name), ([], 0))
+        with open(path, 'w') as f:
+            f.write('{"version": 1, "active": 7, "documents": [{"path": "/a"}, {"cursor": [1, 0]}]}')
+        self.assertEqual(session.load(self.tmp.name), ([{'path': '/a'}], 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Unit tests for viewport spell checking.
+"""
+
+import os
+import tempfile
+import unittest
+from src.pynote import spellcheck
+from src.pynote.buffer import TextBuffer
+
+
+class _FakeText:
+    """Shows lines first..last and records the misspelling tags."""
+
+    def __init__(self, first, last):
+        self.view = (first, last)
+        self.tagged = set()
+        self.callbacks = []
+
+    def index(self, index):
+        y = int(index.split(',')[1])
+        return f'{self.view[1] if y else self.view[0]}.0'
+
+    def winfo_height(self):
+        return 100
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+        return len(self.callbacks)
+
+    def after_cancel(self, after_id):
+        pass
+
+    def tag_add(self, tag, *indices):
+        for start, end in zip(indices[::2], indices[1::2]):
+            self.tagged.add((start, end))
+
+    def tag_remove(self, tag, first, last):
+        lo = int(first.split('.')[0])
+        hi = float('inf') if last == 'end' else int(last.split('.')[0])
+        self.tagged = {t for t in self.tagged if not lo <= int(t[0].split('.')[0]) <= hi}
+
+    def run_pending(self):
+        while self.callbacks:
+            callback = self.callbacks.pop(0)
+            future = getattr(callback.__self__, '_future', None)
+            if future is not None:
+                future.result(5)
+            callback()
+
+
+def _dictionary(words='the quick brown fox jump over lazy dog'):
+    return spellcheck.Dictionary(spellcheck.WordList(words.split()))
+
+
+class TestDictionary(unittest.TestCase):
+
+    def test_inflections_and_skipped_words(self):
+        d = _dictionary()
+        self.assertTrue(d.check('jumps'))
+        self.assertTrue(d.check('jumped'))
+        self.assertTrue(d.check('Dogs'))
+        self.assertFalse(d.check('quack'))
+        line = "The quikc fox_name jumps NASA x2y dgo's over"
+        self.assertEqual([line[a:b] for a, b in d.misspelled(line)], ['quikc', "dgo's"])
+
+    def test_lru_cache(self):
+        d = spellcheck.Dictionary(spellcheck.WordList(['word']), cache_size=2)
+        for word in ('word', 'word', 'other', 'third', 'word'):
+            d.check(word)
+        self.assertEqual((d.hits, d.misses), (1, 4))
+
+    def test_suggest_and_user_words(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            user = os.path.join(tmp, 'dictionary.txt')
+            d = spellcheck.Dictionary(spellcheck.WordList(['brown', 'crown', 'grown']), user)
+            self.assertEqual(d.suggest('Brwon'), ['Brown'])
+            self.assertFalse(d.check('pynote'))
+            d.add('pynote')
+            self.assertTrue(d.check('pynote'))
+            again = spellcheck.Dictionary(spellcheck.WordList(), user)
+            self.assertTrue(again.check('pynote'))
+
+    def test_bundled_word_list(self):
+        words = spellcheck.WordList.load(spellcheck.BUNDLED_WORDS)
+        d = spellcheck.Dictionary(words)
+        self.assertEqual(d.misspelled('Misspelled words are underlined while you are typing'), [])
+        self.assertEqual(len(d.misspelled('This sentense has a mistake')), 1)
+
+
+class TestSpellChecker(unittest.TestCase):
+
+    def test_checks_viewport_and_edited_lines(self):
+        lines = [f'line{i} fox' for i in range(1, 101)]
+        lines[4] = 'the fxo'
+        lines[59] = 'the dgo'
+        buffer = TextBuffer('\n'.join(lines))
+        text = _FakeText(1, 10)
+        dictionary = _dictionary()
+        checker = spellcheck.SpellChecker(text, buffer, lambda: dictionary)
+        checker.enable()
+        text.run_pending()
+        # Line 60 is out of view and not checked
+        self.assertEqual(text.tagged, {('5.4', '5.7')})
+
+        # An edit off screen is checked; the fixed line loses its tag
+        buffer.replace_lines(5, 5, 'the fox')
+        checker.on_change(5, 5, 5)
+        buffer.replace_lines(60, 60, 'the dgo brwn')
+        checker.on_change(60, 60, 60)
+        text.run_pending()
+        self.assertEqual(text.tagged, {('60.4', '60.7'), ('60.8', '60.12')})
+
+        # Checked lines that did not change are not sent again
+        checked = dictionary.misses + dictionary.hits
+        checker.on_scroll()
+        text.run_pending()
+        self.assertEqual(dictionary.misses + dictionary.hits, checked)
+
+        checker.enable(False)
+        self.assertFalse(checker.enabled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Unit tests for the incremental statistics engine.
+"""
+
+import random
+import unittest
+from src.pynote import stats, utils
+
+
+def _lines_text(content, first, last):
+    """Return lines first..last (1-based, inclusive) of content."""
+    return '\n'.join(content.split('\n')[first - 1:last])
+
+
+class TestTextStats(unittest.TestCase):
+    """Test cases for TextStats."""
+
+    def assertMatchesUtils(self, engine, content):
+        self.assertEqual(engine.words, utils.count_words(content))
+        self.assertEqual(engine.chars, utils.count_chars(content))
+        self.assertEqual(engine.line_count, content.count('\n') + 1)
+
+    def test_reset(self):
+        """Test counts after a full rebuild."""
+        for content in ('', 'one', 'hello world\n', 'a\n\n\n', '\n\n', ' x  y \n\tz'):
+            self.assertMatchesUtils(stats.TextStats(content), content)
+
+    def test_replace_lines(self):
+        """Test replacing a line range."""
+        engine = stats.TextStats('one two\nthree\nfour five six')
+        engine.replace_lines(2, 2, 'a b\nc')
+        self.assertMatchesUtils(engine, 'one two\na b\nc\nfour five six')
+        engine.replace_lines(1, 4, '')
+        self.assertMatchesUtils(engine, '')
+
+    def test_random_edits(self):
+        """Test that random edit sequences match utils counts."""
+        rng = random.Random(1234)
+        alphabet = 'ab c\n\t  \n'
+        content = ''
+        engine = stats.TextStats(content)
+        for _ in range(2000):
+            if content and rng.random() < 0.4:
+                start = rng.randrange(len(content))
+                end = min(len(content), start + rng.randrange(1, 20))
+                first = content.count('\n', 0, start) + 1
+                old_last = content.count('\n', 0, end) + 1
+                content = content[:start] + content[end:]
+                new_last = old_last + content.count('\n') + 1 - engine.line_count
+            else:
+                pos = rng.randrange(len(content) + 1)
+                chunk = ''.join(rng.choice(alphabet) for _ in range(rng.randrange(1, 12)))
+                first = old_last = content.count('\n', 0, pos) + 1
+                content = content[:pos] + chunk + content[pos:]
+                new_last = first + chunk.count('\n')
+            engine.replace_lines(first, old_last, _lines_text(content, first, new_last))
+            self.assertMatchesUtils(engine, content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Unit tests for tab documents and the memory budget.
+"""
+
+import os
+import tempfile
+import unittest
+from src.pynote import stats, tabs
+
+
+class FakeText:
+    """The parts of a Text widget a Document reads."""
+
+    def __init__(self, modified=False):
+        self.modified = modified
+
+    def edit_modified(self, value=None):
+        if value is None:
+            return self.modified
+        self.modified = bool(value)
+
+    def index(self, index):
+        return '3.4'
+
+    def yview(self):
+        return (0.25, 0.5)
+
+
+class FakeEditor:
+    def __init__(self, modified=False):
+        self.text = FakeText(modified)
+
+
+def _loaded(chars, modified=False):
+    """A loaded document holding roughly chars characters on one line."""
+    doc = tabs.Document('/tmp/file.txt')
+    doc.editor = FakeEditor(modified)
+    doc.stats = stats.TextStats('x' * chars)
+    doc.touch()
+    return doc
+
+
+class TestTabs(unittest.TestCase):
+    """Test cases for Document and pick_unload."""
+
+    def test_memory_estimate(self):
+        """Test that only loaded text buffers count against the budget."""
+        doc = _loaded(1000)
+        self.assertEqual(doc.memory_estimate(), tabs.estimate_memory(1000, 1))
+        self.assertEqual(tabs.Document().memory_estimate(), 0)
+        doc.huge = object()
+        self.assertEqual(doc.memory_estimate(), 0)
+
+    def test_detach_remembers_state(self):
+        """Test that the modified flag, cursor and scroll survive an unload."""
+        doc = _loaded(10, modified=True)
+        editor = doc.detach()
+        self.assertIsInstance(editor, FakeEditor)
+        self.assertFalse(doc.loaded)
+        self.assertIsNone(doc.stats)
+        self.assertTrue(doc.modified)
+        self.assertEqual((doc.cursor, doc.yview), ('3.4', 0.25))
+        doc.editor = FakeEditor()
+        doc.sync_modified()
+        self.assertTrue(doc.text.modified)
+
+    def test_pick_unload_lru(self):
+        """Test that the least recently used documents go first, just enough of them."""
+        docs = [_loaded(1000) for _ in range(4)]
+        size = docs[0].memory_estimate()
+        picked = tabs.pick_unload(docs, size * 2, active=docs[0])
+        self.assertEqual(picked, docs[1:3])
+        self.assertEqual(tabs.pick_unload(docs, size * 4, active=docs[0]), [])
+        self.assertEqual(tabs.pick_unload(docs, 0, active=docs[0]), [])
+
+    def test_pick_unload_prefers_unmodified(self):
+        """Test that modified documents are only unloaded after unmodified ones."""
+        modified = _loaded(1000, modified=True)
+        clean = _loaded(1000)
+        active = _loaded(1000)
+        size = active.memory_estimate()
+        self.assertEqual(tabs.pick_unload([modified, clean, active], size * 2, active), [clean])
+        self.assertEqual(tabs.pick_unload([modified, clean, active], size, active), [clean, modified])
+
+    def test_pick_unload_skips_busy(self):
+        """Test that the active, loading and saving documents are never picked."""
+        docs = [_loaded(1000) for _ in range(3)]
+        docs[1].loader = object()
+        docs[2].saving = 1
+        self.assertEqual(tabs.pick_unload(docs, 1, active=docs[0]), [])
+
+    def test_names(self):
+        """Test tab labels."""
+        self.assertEqual(tabs.Document('/a/b/notes.md').name, 'notes.md')
+        self.assertEqual(tabs.Document(number=1).name, 'Untitled')
+        self.assertEqual(tabs.Document(number=3).name, 'Untitled 3')
+
+    def test_clean_swap(self):
+        """Test that only swap directories of exited processes are removed."""
+        with tempfile.TemporaryDirectory() as config_dir:
+            mine = tabs.swap_dir(config_dir)
+            stale = os.path.join(config_dir, 'swap', '999999999')
+            os.makedirs(stale)
+            tabs.clean_swap(config_dir)
+            self.assertTrue(os.path.isdir(mine))
+            self.assertFalse(os.path.exists(stale))
+            tabs.remove_swap_dir(config_dir)
+            self.assertFalse(os.path.exists(mine))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,9 @@
 Unit tests for utility functions.
 """
 
+import os
+import tempfile
+import time
 import unittest
 from src.pynote import utils
 
@@ -38,6 +41,79 @@ class TestUtils(unittest.TestCase):
         self.assertIn('tab_size', settings)
         self.assertEqual(settings['theme'], 'light')
 
+    def _write(self, data):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        self.addCleanup(os.unlink, path)
+        return path
+
+    def test_detect_encoding(self):
+        """Test BOM, UTF-8 and Latin-1 detection."""
+        self.assertEqual(utils.detect_encoding(self._write(b'plain')), 'utf-8')
+        self.assertEqual(utils.detect_encoding(self._write('café'.encode('latin-1'))), 'latin-1')
+        self.assertEqual(utils.detect_encoding(self._write(b'\xef\xbb\xbfhi')), 'utf-8-sig')
+        self.assertEqual(utils.detect_encoding(self._write('hi'.encode('utf-16'))), 'utf-16')
+
+    def test_read_text(self):
+        """Test decoding with line-ending detection."""
+        text, encoding, newline = utils.read_text(self._write(b'one\r\ntwo\r\n'))
+        self.assertEqual((text, encoding, newline), ('one\ntwo\n', 'utf-8', '\r\n'))
+
+    def test_mixed_file_falls_back(self):
+        """Test that invalid UTF-8 after the sample is read as Latin-1."""
+        data = 'é'.encode('utf-8') * 40000 + 'é'.encode('latin-1')
+        with utils.open_decoded(self._write(data)) as f:
+            self.assertEqual(f.encoding, 'utf-8')
+            text = f.read_all()
+            self.assertTrue(f.fallback)
+        self.assertEqual(text, 'é' * 40001)
+
+
+class TestSettings(unittest.TestCase):
+    """Test cases for the Settings store."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'settings.json')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_rapid_changes_write_once(self):
+        """Test that a burst of changes produces a single write."""
+        settings = utils.Settings(self.path, debounce=0.05)
+        seen = []
+        settings.subscribe(seen.append)
+        for i in range(20):
+            settings['theme'] = 'dark' if i % 2 else 'light'
+        settings['theme'] = 'dark'
+        self.assertEqual(settings.writes, 0)
+        time.sleep(0.3)
+        self.assertEqual(settings.writes, 1)
+        self.assertEqual(len(seen), 19)  # unchanged values do not notify
+        self.assertEqual(utils.Settings(self.path).get('theme'), 'dark')
+        self.assertEqual(os.listdir(self.tmpdir.name), ['settings.json'])
+
+    def test_refresh_on_external_change(self):
+        """Test that refresh reloads only when the file changed."""
+        settings = utils.Settings(self.path, debounce=0.05)
+        settings['font_size'] = 14
+        settings.flush()
+        other = utils.Settings(self.path)
+        other['font_size'] = 16
+        other.flush()
+        # Make sure the mtime differs on coarse-grained filesystems
+        stamp = os.stat(self.path).st_mtime_ns + 10_000_000
+        os.utime(self.path, ns=(stamp, stamp))
+        seen = []
+        settings.subscribe(seen.append)
+        settings.refresh()
+        self.assertEqual(settings.get('font_size'), 16)
+        self.assertEqual(seen, [{'font_size': 16}])
+        settings.refresh()
+        self.assertEqual(len(seen), 1)
+
 
 if __name__ == '__main__':
     unittest.main()
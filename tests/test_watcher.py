@@ -0,0 +1,154 @@
+"""
+Unit tests for external change watching, tail following and recent files.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from src.pynote import recent, utils, watcher
+
+
+def _wait_for_change(w, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        changes = w.changes()
+        if changes:
+            return changes
+        time.sleep(0.02)
+    return []
+
+
+class TestFileWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'watched.txt')
+        with open(self.path, 'w') as f:
+            f.write('one\n')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _check_backend(self, use_inotify):
+        w = watcher.FileWatcher(interval=0.05, use_inotify=use_inotify)
+        w.watch(self.path)
+        w.start()
+        try:
+            self.assertEqual(w.changes(), [])
+            with open(self.path, 'a') as f:
+                f.write('two\n')
+            changes = _wait_for_change(w)
+            self.assertEqual([path for path, _ in changes], [os.path.abspath(self.path)])
+            self.assertEqual(changes[-1][1][0], 8)
+            os.unlink(self.path)
+            self.assertEqual(_wait_for_change(w)[-1][1], None)
+        finally:
+            w.stop()
+            w.wait()
+
+    def test_polling(self):
+        self._check_backend(use_inotify=False)
+
+    def test_inotify(self):
+        w = watcher.FileWatcher(use_inotify=True)
+        if w.backend != 'inotify':
+            self.skipTest('inotify not available')
+        self._check_backend(use_inotify=True)
+
+    def test_own_write_is_not_reported(self):
+        w = watcher.FileWatcher(interval=0.05, use_inotify=False)
+        w.watch(self.path)
+        with open(self.path, 'w') as f:
+            f.write('saved by the editor\n')
+        w.watch(self.path, watcher.file_stamp(self.path))
+        w.start()
+        try:
+            time.sleep(0.2)
+            self.assertEqual(w.changes(), [])
+        finally:
+            w.stop()
+
+    def test_queued_own_write_is_dropped(self):
+        w = watcher.FileWatcher(interval=0.05, use_inotify=False)
+        w.watch(self.path)
+        with open(self.path, 'w') as f:
+            f.write('saved by the editor\n')
+        stamp = watcher.file_stamp(self.path)
+        # Seen by the watcher before the save finished
+        w._check([os.path.abspath(self.path)])
+        w.watch(self.path, stamp)
+        self.assertEqual(w.changes(), [])
+
+
+class TestTail(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'log.txt')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _append(self, data):
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+    def test_follows_appends(self):
+        self._append(b'first\r\n')
+        tail = watcher.Tail(self.path, 'utf-8')
+        self.assertEqual(tail.read(), '')
+        # A CRLF pair and a character split over two appends
+        self._append(b'second\r')
+        self.assertEqual(tail.read(), 'second')
+        self._append(b'\n\xc3')
+        self.assertEqual(tail.read(), '\n')
+        self._append(b'\xa9\r\n')
+        self.assertEqual(tail.read(), 'é\n')
+
+    def test_rewrite_is_not_an_append(self):
+        self._append(b'abc\n' * 2000)
+        tail = watcher.Tail(self.path, 'utf-8')
+        with open(self.path, 'wb') as f:
+            f.write(b'xyz\n' * 2000 + b'more\n')
+        self.assertIsNone(tail.read())
+        # Shrinking is not an append either
+        tail = watcher.Tail(self.path, 'utf-8')
+        with open(self.path, 'wb') as f:
+            f.write(b'short\n')
+        self.assertIsNone(tail.read())
+
+
+class TestRecentFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings = utils.Settings(os.path.join(self.tmp.name, 'settings.json'), debounce=0.01)
+
+    def tearDown(self):
+        self.settings.flush()
+        self.tmp.cleanup()
+
+    def test_newest_first_with_cached_details(self):
+        files = recent.RecentFiles(self.settings, limit=3)
+        for name in 'abcd':
+            files.add(os.path.join(self.tmp.name, name), size=10, encoding='utf-8', lines=2)
+        files.add(os.path.join(self.tmp.name, 'c'), size=2048)
+        entries = files.entries()
+        self.assertEqual([os.path.basename(e['path']) for e in entries], ['c', 'd', 'b'])
+        # Details not given again are kept
+        self.assertEqual(entries[0], {'path': os.path.join(self.tmp.name, 'c'),
+                                      'size': 2048, 'encoding': 'utf-8', 'lines': 2})
+        self.assertEqual(recent.describe(entries[0]), 'c  (2.0 KB, 2 lines, utf-8)')
+
+    def test_plain_paths_and_removal(self):
+        self.settings['recent_files'] = ['/old/style.txt']
+        files = recent.RecentFiles(self.settings)
+        self.assertEqual(files.entries(), [{'path': '/old/style.txt'}])
+        self.assertEqual(recent.describe(files.entries()[0]), 'style.txt')
+        files.remove('/old/style.txt')
+        self.assertEqual(files.entries(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()